@@ -1,30 +1,89 @@
+import os
+import re
+import sys
+
 import streamlit as st
 import pandas as pd
 import plotly.graph_objects as go
 
-PROC = "Dataset/processed"
-FC = f"{PROC}/forecast"
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "..")))
+from src import config
+from src.data import storage
+from src.data.dates import month_codes, month_label
+from src.model.hierarchy import forecast_horizons
+
+PROC = config.PROC
+
+MONTH_COLS = ['state', 'district', 'month', 'month_index', 'movement_index', 'student_ratio', 'pop_adult']
+HIST_COLS = ['state', 'district', 'month_index', 'movement_index', 'student_ratio', 'pop_adult',
+             'pred_mov', 'pred_std']
+FUTURE_COLS = ['state', 'district', 'month', 'month_index', 'pop_adult', 'movement_index', 'student_ratio']
+
+
+def fan_values(df_fut, metric, horizons, suffix=""):
+    """
+    Latest actual value followed by the forecast (or interval bound, via
+    suffix '_lo' / '_hi') for every horizon; None if not saved
+    """
+    actual = 'movement_index' if metric == 'mov' else 'student_ratio'
+    cols = [f"pred_{metric}_{h}m{suffix}" for h in horizons]
+    if not set(cols) <= set(df_fut.columns):
+        return None
+    return df_fut[[actual] + cols].to_numpy(dtype=float).ravel()
+
+
+def add_band(fig, x, lower, upper, name):
+    """
+    Shaded prediction interval (upper edge first, lower fills up to it)
+    """
+    fig.add_trace(go.Scatter(x=x, y=upper, mode='lines', line=dict(width=0),
+                             showlegend=False, hoverinfo='skip'))
+    fig.add_trace(go.Scatter(x=x, y=lower, mode='lines', line=dict(width=0), fill='tonexty',
+                             fillcolor='rgba(99, 110, 250, 0.2)', name=name))
+
+
+@st.cache_data
+def load_states():
+    return storage.distinct('monthly', 'state', base=PROC)
 
 
 @st.cache_data
-def load_data():
-    df_month = pd.read_parquet(f"{PROC}/monthly.parquet")
-    df_hist = pd.read_parquet(f"{FC}/historical_predictions.parquet")
-    df_future = pd.read_parquet(f"{FC}/future_forecast.parquet")
+def load_data(state):
+    """
+    Only the selected state's rows and the plotted columns are read
+    (partition / row-group pruning on the state filter).
+    """
+    flt = [('state', '==', state)]
+    df_month = storage.read_table('monthly', columns=MONTH_COLS, filters=flt, base=PROC)
+    df_hist = storage.read_table('forecast/historical_predictions', columns=HIST_COLS, filters=flt, base=PROC)
+    # point forecasts and interval bounds for whatever horizons were saved
+    columns = storage.column_names('forecast/future_forecast', base=PROC)
+    pred_cols = [c for c in columns if re.fullmatch(r"pred_(mov|std)_\d+m(_lo|_hi)?", c)]
+    df_future = storage.read_table('forecast/future_forecast', columns=FUTURE_COLS + pred_cols,
+                                   filters=flt, base=PROC)
     return df_month, df_hist, df_future
 
 
+def month_axis(df_month):
+    """
+    month_index → 'YYYY-MM' label, built once for display
+    """
+    idx = df_month.groupby('month_index')['month'].first()
+    return pd.Series(month_label(month_codes(idx)), index=idx.index)
+
+
 def explorer():
     st.title("📍 District Mobility Explorer")
 
-    df_month, df_hist, df_future = load_data()
-
     # -------------------------
     # Sidebar controls
     # -------------------------
-    states = sorted(df_month['state'].unique())
+    states = load_states()
     state = st.selectbox("Select State:", states)
 
+    df_month, df_hist, df_future = load_data(state)
+    labels = month_axis(df_month)
+
     districts = sorted(df_month[df_month['state']==state]['district'].unique())
     district = st.selectbox("Select District:", districts)
 
@@ -43,6 +102,7 @@ def explorer():
     # -------------------------
     # Filter district + compute state mean
     # -------------------------
+    d0 = df_month[(df_month['state']==state) & (df_month['district']==district)].sort_values('month_index')
     d1 = df_hist[(df_hist['state']==state) & (df_hist['district']==district)]
     d2 = df_month[df_month['state']==state]
 
@@ -56,7 +116,21 @@ def explorer():
     # -------------------------
     # Future predictions for district
     # -------------------------
-    df_fut = df_future[(df_future['state']==state) & (df_future['district']==district)]
+    df_fut = df_future[(df_future['state']==state) & (df_future['district']==district)].head(1)
+    horizons = forecast_horizons(df_fut.columns)
+    if not horizons:
+        st.warning("future_forecast has no pred_mov_{h}m columns; re-run phase 4 (python -m src.model.forecast).")
+        return
+
+    # Readable month labels (x-axis); the forecast fan starts at the
+    # district's latest observed month and spans every saved horizon
+    x_actual = labels.reindex(d0['month_index']).values
+    x_hist = labels.reindex(d1['month_index']).values
+    x_state = labels.reindex(state_grp['month_index']).values
+    origin = month_codes(df_fut['month'])[:1]
+    x_future = month_label([*origin, *(origin[0] + h for h in horizons)]) if len(origin) else []
+    fan_name = f"{district} (Forecast +{horizons[0]}-{horizons[-1]}m)" if len(horizons) > 1 \
+        else f"{district} (Forecast +{horizons[0]}m)"
 
     # -------------------------
     # Build time series traces
@@ -65,65 +139,80 @@ def explorer():
 
     # District Actual + Predicted
     if metric == "Movement":
-        y_true = d1['movement_index']
+        y_true = d0['movement_index']
         y_pred = d1['pred_mov']
-        y_future = df_fut['pred_mov_3m']
-        title = "Movement Index (+3 month forecast)"
+        y_future = fan_values(df_fut, 'mov', horizons)
+        y_lo = fan_values(df_fut, 'mov', horizons, '_lo')
+        y_hi = fan_values(df_fut, 'mov', horizons, '_hi')
+        title = f"Movement Index (+{horizons[-1]} month forecast)"
 
         if scale == "Per Capita":
-            y_true = d1['movement_index'] / d1['pop_adult'].replace(0,1)
+            pop = df_fut['pop_adult'].replace(0,1).to_numpy()
+            y_true = d0['movement_index'] / d0['pop_adult'].replace(0,1)
             y_pred = d1['pred_mov'] / d1['pop_adult'].replace(0,1)
-            y_future = df_fut['pred_mov_3m'] / df_fut['pop_adult'].replace(0,1)
+            y_future = y_future / pop
+            if y_lo is not None and y_hi is not None:
+                y_lo, y_hi = y_lo / pop, y_hi / pop
 
         # actual
         fig.add_trace(go.Scatter(
-            x=d1['month_index'], y=y_true,
+            x=x_actual, y=y_true,
             mode='lines+markers',
             name=f"{district} (Actual)"
         ))
 
         # predicted (historical)
         fig.add_trace(go.Scatter(
-            x=d1['month_index'], y=y_pred,
+            x=x_hist, y=y_pred,
             mode='lines+markers',
             name=f"{district} (Predicted)"
         ))
 
-        # forecast future
+        # forecast fan (latest actual → +h months) with its interval
+        if y_lo is not None and y_hi is not None:
+            add_band(fig, x_future, y_lo, y_hi, f"{district} (Prediction interval)")
+
         fig.add_trace(go.Scatter(
-            x=df_fut['month_index'] + 3,
+            x=x_future,
             y=y_future,
-            mode='markers',
-            marker=dict(size=10, symbol='diamond'),
-            name=f"{district} (Forecast +3m)"
+            mode='lines+markers',
+            line=dict(dash='dot'),
+            marker=dict(size=9, symbol='diamond'),
+            name=fan_name
         ))
 
     else:  # Student Mobility
-        y_true = d1['student_ratio']
+        y_true = d0['student_ratio']
         y_pred = d1['pred_std']
-        y_future = df_fut['pred_std_3m']
-        title = "Student Mobility Ratio (+3 month forecast)"
+        y_future = fan_values(df_fut, 'std', horizons)
+        y_lo = fan_values(df_fut, 'std', horizons, '_lo')
+        y_hi = fan_values(df_fut, 'std', horizons, '_hi')
+        title = f"Student Mobility Ratio (+{horizons[-1]} month forecast)"
 
         # absolute vs per-capita irrelevant for ratio, so no transformation
 
         fig.add_trace(go.Scatter(
-            x=d1['month_index'], y=y_true,
+            x=x_actual, y=y_true,
             mode='lines+markers',
             name=f"{district} (Actual)"
         ))
 
         fig.add_trace(go.Scatter(
-            x=d1['month_index'], y=y_pred,
+            x=x_hist, y=y_pred,
             mode='lines+markers',
             name=f"{district} (Predicted)"
         ))
 
+        if y_lo is not None and y_hi is not None:
+            add_band(fig, x_future, y_lo, y_hi, f"{district} (Prediction interval)")
+
         fig.add_trace(go.Scatter(
-            x=df_fut['month_index'] + 3,
+            x=x_future,
             y=y_future,
-            mode='markers',
-            marker=dict(size=10, symbol='diamond'),
-            name=f"{district} (Forecast +3m)"
+            mode='lines+markers',
+            line=dict(dash='dot'),
+            marker=dict(size=9, symbol='diamond'),
+            name=fan_name
         ))
 
     # -------------------------
@@ -135,14 +224,14 @@ def explorer():
             y_state = y_state / state_grp['pop_adult'].replace(0,1)
 
         fig.add_trace(go.Scatter(
-            x=state_grp['month_index'], y=y_state,
+            x=x_state, y=y_state,
             mode='lines',
             line=dict(dash='dash'),
             name=f"{state} (State Mean)"
         ))
     else:
         fig.add_trace(go.Scatter(
-            x=state_grp['month_index'], y=state_grp['student_ratio'],
+            x=x_state, y=state_grp['student_ratio'],
             mode='lines',
             line=dict(dash='dash'),
             name=f"{state} (State Mean)"
@@ -150,7 +239,7 @@ def explorer():
 
     fig.update_layout(
         title=title,
-        xaxis_title="Month Index (2025)",
+        xaxis_title="Month",
         height=550,
         template="plotly_white",
         legend=dict(orientation="h")
@@ -1,13 +1,23 @@
+import os
+import sys
+
 import streamlit as st
-import pandas as pd
 
-PROC = "Dataset/processed"
-FC = f"{PROC}/forecast"
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "..")))
+from src import config
+from src.data import storage
+
+PROC = config.PROC
+COLS = ['state', 'district', 'pop_adult', 'pred_mov_3m', 'pred_std_3m']
+BOUNDS = ['pred_mov_3m_lo', 'pred_mov_3m_hi', 'pred_std_3m_lo', 'pred_std_3m_hi']
 
 
 @st.cache_data
 def load_forecast():
-    df_future = pd.read_parquet(f"{FC}/future_forecast.parquet")
+    # interval bounds are only saved by the rf backend
+    columns = storage.column_names('forecast/future_forecast', base=PROC)
+    cols = COLS + [c for c in BOUNDS if c in columns]
+    df_future = storage.read_table('forecast/future_forecast', columns=cols, base=PROC)
     return df_future
 
 
@@ -28,6 +38,15 @@ def ranking_page():
         horizontal=True
     )
 
+    has_bounds = set(BOUNDS) <= set(df.columns)
+    rank_by = st.radio(
+        "Rank by:",
+        ["Lower bound", "Point forecast"] if has_bounds else ["Point forecast"],
+        horizontal=True,
+        help="Lower bound of the 80% prediction interval: districts that stay hotspots even "
+             "in the pessimistic case rank first."
+    )
+
     # Filter by state if selected
     if sel_state != "All India":
         df = df[df['state'] == sel_state]
@@ -35,12 +54,13 @@ def ranking_page():
     # -------------------------
     # Prepare metrics
     # -------------------------
+    suffix = "_lo" if rank_by == "Lower bound" else ""
     if scale == "Absolute":
-        df['metric_mov'] = df['pred_mov_3m']
-        df['metric_std'] = df['pred_std_3m']
+        df['metric_mov'] = df[f'pred_mov_3m{suffix}']
+        df['metric_std'] = df[f'pred_std_3m{suffix}']
     else:
-        df['metric_mov'] = df['pred_mov_3m'] / df['pop_adult'].replace(0,1)
-        df['metric_std'] = df['pred_std_3m'] / df['pop_adult'].replace(0,1)
+        df['metric_mov'] = df[f'pred_mov_3m{suffix}'] / df['pop_adult'].replace(0,1)
+        df['metric_std'] = df[f'pred_std_3m{suffix}'] / df['pop_adult'].replace(0,1)
 
     # -------------------------
     # Ranking logic
@@ -48,6 +68,12 @@ def ranking_page():
     df_mov = df.sort_values('metric_mov', ascending=False).head(10)
     df_std = df.sort_values('metric_std', ascending=False).head(10)
 
+    cols_mov = ['state','district','metric_mov','pred_mov_3m','pop_adult']
+    cols_std = ['state','district','metric_std','pred_std_3m','pop_adult']
+    if has_bounds:
+        cols_mov[4:4] = ['pred_mov_3m_lo', 'pred_mov_3m_hi']
+        cols_std[4:4] = ['pred_std_3m_lo', 'pred_std_3m_hi']
+
     # -------------------------
     # Display Tabs
     # -------------------------
@@ -59,13 +85,13 @@ def ranking_page():
     with tabs[0]:
         st.subheader("Top Districts Forecasted for Movement Growth (+3m)")
         st.dataframe(
-            df_mov[['state','district','metric_mov','pred_mov_3m','pop_adult']].reset_index(drop=True)
+            df_mov[cols_mov].reset_index(drop=True)
         )
 
     with tabs[1]:
         st.subheader("Top Districts Forecasted for Student Mobility (+3m)")
         st.dataframe(
-            df_std[['state','district','metric_std','pred_std_3m','pop_adult']].reset_index(drop=True)
+            df_std[cols_std].reset_index(drop=True)
         )
 
 
@@ -1,23 +1,41 @@
+import os
+import sys
+
 import streamlit as st
 import pandas as pd
 import plotly.graph_objects as go
 
-PROC = "Dataset/processed"
-FC = f"{PROC}/forecast"
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "..")))
+from src import config
+from src.data import storage
+from src.data.dates import month_codes, month_label
+from src.model.hierarchy import forecast_horizons
+
+PROC = config.PROC
+HORIZON = 3
+
+HISTORY_COLS = ['state', 'month', 'month_index', 'movement_index', 'student_ratio', 'pop_adult']
 
 
 @st.cache_data
-def load_data():
-    df_month = pd.read_parquet(f"{PROC}/monthly.parquet")
-    df_future = pd.read_parquet(f"{FC}/future_forecast.parquet")
-    return df_month, df_future
+def load_states():
+    return storage.distinct('monthly', 'state', base=PROC)
+
+
+@st.cache_data
+def load_data(states):
+    # reconciled phase-4 state aggregates: state values add up to the
+    # district forecasts and to the national total
+    flt = [('level', '==', 'state'), ('state', 'in', list(states))]
+    df_hist = storage.read_table('forecast/hierarchy_history', columns=HISTORY_COLS, filters=flt, base=PROC)
+    df_fcst = storage.read_table('forecast/hierarchy_forecast', filters=flt, base=PROC)
+    df_nat = storage.read_table('forecast/hierarchy_forecast', filters=[('level', '==', 'national')], base=PROC)
+    return df_hist, df_fcst, df_nat
 
 
 def states_page():
     st.title("🌍 State-Level Mobility Comparison")
 
-    df_month, df_future = load_data()
-
     # -------------------------
     # User controls
     # -------------------------
@@ -33,7 +51,7 @@ def states_page():
         horizontal=True
     )
 
-    states = sorted(df_month['state'].unique())
+    states = load_states()
     selected_states = st.multiselect(
         "Select States for Comparison:",
         states,
@@ -44,33 +62,44 @@ def states_page():
         st.warning("Please select at least one state.")
         return
 
+    if not storage.exists('forecast/hierarchy_forecast', base=PROC):
+        st.error("No state-level forecasts yet; run phase 4 (python -m src.model.forecast).")
+        return
+
+    df_hist, df_fcst, df_nat = load_data(tuple(selected_states))
+
+    horizons = forecast_horizons(df_fcst.columns)
+    if not horizons:
+        st.warning("hierarchy_forecast has no pred_mov_{h}m columns; re-run phase 4 (python -m src.model.forecast).")
+        return
+    horizon = HORIZON if HORIZON in horizons else horizons[0]
+    if len(horizons) > 1:
+        horizon = st.select_slider("Forecast horizon (months):", horizons, value=horizon)
+
     # -------------------------
-    # State mean time-series
+    # State aggregate time-series
     # -------------------------
-    df_series = df_month[df_month['state'].isin(selected_states)]
-    grp = df_series.groupby(['state','month_index']).agg({
-        'movement_index':'mean',
-        'student_ratio':'mean',
-        'pop_adult':'mean'
-    }).reset_index()
+    grp = df_hist.sort_values(['state', 'month_index']).copy()
+    grp['month_label'] = month_label(month_codes(grp['month']))
 
     # -------------------------
     # Future forecast snapshot
     # -------------------------
-    df_snap = df_future[df_future['state'].isin(selected_states)].copy()
+    df_snap = pd.concat([df_fcst, df_nat], ignore_index=True)
+    df_snap['state'] = df_snap['node']
 
     if scale == "Absolute":
-        df_snap['metric_mov'] = df_snap['pred_mov_3m']
-        df_snap['metric_std'] = df_snap['pred_std_3m']
+        df_snap['metric_mov'] = df_snap[f'pred_mov_{horizon}m']
+        df_snap['metric_std'] = df_snap[f'pred_std_{horizon}m']
     else:
-        df_snap['metric_mov'] = df_snap['pred_mov_3m'] / df_snap['pop_adult'].replace(0,1)
-        df_snap['metric_std'] = df_snap['pred_std_3m'] / df_snap['pop_adult'].replace(0,1)
+        df_snap['metric_mov'] = df_snap[f'pred_mov_{horizon}m'] / df_snap['pop_adult'].replace(0,1)
+        df_snap['metric_std'] = df_snap[f'pred_std_{horizon}m'] / df_snap['pop_adult'].replace(0,1)
 
     # -------------------------
     # Tabs
     # -------------------------
     tab1, tab2 = st.tabs([
-        "📈 Time-Series (State Mean)",
+        "📈 Time-Series (State Aggregate)",
         "📊 Future Snapshot (Ranking)"
     ])
 
@@ -78,7 +107,7 @@ def states_page():
     # Tab-1 Time Series Plot
     # -------------------------
     with tab1:
-        title = "State Mean Movement" if metric=="Movement" else "State Mean Student Mobility"
+        title = "State Movement" if metric=="Movement" else "State Student Mobility"
         fig = go.Figure()
 
         for stt in selected_states:
@@ -91,7 +120,7 @@ def states_page():
                 y = d['student_ratio']
 
             fig.add_trace(go.Scatter(
-                x=d['month_index'],
+                x=d['month_label'],
                 y=y,
                 mode='lines+markers',
                 name=stt
@@ -99,7 +128,7 @@ def states_page():
 
         fig.update_layout(
             title=title,
-            xaxis_title="Month Index (2025)",
+            xaxis_title="Month",
             height=550,
             template="plotly_white",
             legend=dict(orientation="h")
@@ -111,19 +140,16 @@ def states_page():
     # Tab-2 Snapshot Ranking
     # -------------------------
     with tab2:
-        st.subheader("State-Level Snapshot (+3 month forecast)")
+        st.subheader(f"State-Level Snapshot (+{horizon} month forecast)")
+        st.caption("State forecasts are the reconciled sums of their district forecasts; "
+                   "the national row adds up the states.")
 
-        if metric=="Movement":
-            df_rank = df_snap.groupby('state')['metric_mov'].mean().reset_index()
-            df_rank = df_rank.sort_values('metric_mov', ascending=False)
-            df_rank.columns = ['State','Movement Forecast (+3m)']
-        else:
-            df_rank = df_snap.groupby('state')['metric_std'].mean().reset_index()
-            df_rank = df_rank.sort_values('metric_std', ascending=False)
-            df_rank.columns = ['State','Student Mobility Forecast (+3m)']
+        col, label = ('metric_mov', 'Movement') if metric=="Movement" else ('metric_std', 'Student Mobility')
+        df_rank = df_snap[df_snap['level']=='state'][['state', col]].sort_values(col, ascending=False)
+        df_rank = pd.concat([df_rank, df_snap[df_snap['level']=='national'][['state', col]]])
+        df_rank.columns = ['State', f'{label} Forecast (+{horizon}m)']
 
         st.dataframe(df_rank.reset_index(drop=True))
 
-
 if __name__ == "__main__":
     states_page()
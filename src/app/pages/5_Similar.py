@@ -0,0 +1,77 @@
+import os
+import sys
+
+import streamlit as st
+import plotly.graph_objects as go
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "..")))
+from src.model.neighbors import INDEX, NeighborIndex
+
+
+@st.cache_resource
+def load_index():
+    # loaded once per server; queries then take milliseconds
+    return NeighborIndex.load(INDEX)
+
+
+def similar_page():
+    st.title("🧭 Similar Districts")
+    st.caption("Nearest districts by standardized structure, volatility and trend features (phase-3 index).")
+
+    if not os.path.exists(INDEX):
+        st.warning("Neighbour index not found; run phase 3 (python -m src.model.clustering).")
+        return
+
+    index = load_index()
+    meta = index.meta
+
+    # -------------------------
+    # Controls
+    # -------------------------
+    states = sorted(meta['state'].unique())
+    state = st.selectbox("Select State:", states)
+
+    districts = meta[meta['state'] == state].sort_values('district')
+    district = st.selectbox("Select District:", districts['district'])
+    row = districts[districts['district'] == district].iloc[0]
+
+    scope = st.radio(
+        "Search within:",
+        ["All India", "Same State", "Same Cluster"],
+        horizontal=True
+    )
+    k = st.slider("Number of similar districts:", 5, 25, 10)
+
+    result = index.query(
+        row['district_key'],
+        k=k,
+        state=state if scope == "Same State" else None,
+        cluster=row['cluster_label'] if scope == "Same Cluster" else None,
+    )
+
+    st.markdown(f"**{district}, {state}** — archetype: *{row['cluster_label']}*")
+
+    if result.empty:
+        st.info("No other districts in this scope.")
+        return
+
+    # -------------------------
+    # Results
+    # -------------------------
+    st.dataframe(result[['rank', 'district', 'state', 'cluster_label', 'distance']], hide_index=True)
+
+    fig = go.Figure(go.Bar(
+        x=result['distance'],
+        y=result['district'] + ", " + result['state'],
+        orientation='h',
+    ))
+    fig.update_layout(
+        title="Feature-space distance (lower = more similar)",
+        yaxis=dict(autorange="reversed"),
+        height=max(300, 28 * len(result)),
+    )
+    st.plotly_chart(fig, width='stretch')
+
+
+if __name__ == "__main__":
+    similar_page()
@@ -0,0 +1,78 @@
+import os
+import sys
+
+import streamlit as st
+import plotly.graph_objects as go
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "..")))
+from src.data import storage
+from src.model.corridors import EDGES, PROC, load_corridors, state_corridors
+
+SHOW_COLS = ['origin', 'destination', 'lag', 'kind', 'corr', 'strength']
+
+
+@st.cache_data
+def load_edges():
+    return load_corridors()
+
+
+def corridors_page():
+    st.title("🛤️ Migration Corridors")
+    st.caption("District pairs in different states whose demographic-update surges follow each other "
+               "with a 1-3 month lag (origin surge or drop → destination surge).")
+
+    if not os.path.exists(storage.table_path(EDGES, base=PROC)):
+        st.warning("Corridor table not found; run python -m src.model.corridors.")
+        return
+
+    edges = load_edges()
+    if edges.empty:
+        st.info("No corridors above the correlation threshold.")
+        return
+
+    # -------------------------
+    # State → state ranking
+    # -------------------------
+    st.subheader("Strongest state corridors")
+    n = st.slider("Number of state pairs:", 5, 30, 15)
+    ranked = state_corridors(edges).head(n)
+
+    fig = go.Figure(go.Bar(
+        x=ranked['corridors'],
+        y=ranked['origin_state'] + " → " + ranked['destination_state'],
+        orientation='h',
+        customdata=ranked['mean_strength'],
+        hovertemplate="%{y}<br>%{x} district corridors<br>mean |corr| %{customdata:.2f}<extra></extra>",
+    ))
+    fig.update_layout(
+        title="District corridors per state pair",
+        yaxis=dict(autorange="reversed"),
+        height=max(300, 28 * len(ranked)),
+    )
+    st.plotly_chart(fig, width='stretch')
+
+    # -------------------------
+    # District drill-down
+    # -------------------------
+    st.subheader("District corridors")
+    states = sorted(set(edges['origin_state']) | set(edges['destination_state']))
+    state = st.selectbox("Select State:", states)
+
+    keys = edges.loc[edges['origin_state'] == state, 'origin']
+    keys = sorted(set(keys) | set(edges.loc[edges['destination_state'] == state, 'destination']))
+    district = st.selectbox("Select District:", keys)
+
+    outgoing = edges[edges['origin'] == district].sort_values('rank')
+    incoming = edges[edges['destination'] == district].sort_values('strength', ascending=False)
+
+    col1, col2 = st.columns(2)
+    with col1:
+        st.markdown("**Outgoing (destinations)**")
+        st.dataframe(outgoing[SHOW_COLS].drop(columns='origin'), hide_index=True)
+    with col2:
+        st.markdown("**Incoming (origins)**")
+        st.dataframe(incoming[SHOW_COLS].drop(columns='destination'), hide_index=True)
+
+
+if __name__ == "__main__":
+    corridors_page()
@@ -0,0 +1,111 @@
+import json
+import os
+import sys
+
+import streamlit as st
+import plotly.graph_objects as go
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "..")))
+from src.model import registry
+from src.model.forecast import HORIZON, MODEL
+from src.model.hierarchy import NATIONAL, forecast_horizons
+from src.model.scenarios import OPS, ScenarioEngine, describe_rule, make_rule, summarize
+
+MAX_SCENARIOS = 4
+# latest-month signals a planner can perturb
+COLUMNS = ['pop_adult', 'total_demo', 'bio_adult', 'bio_student', 'movement_index', 'student_ratio']
+METRICS = {"Movement": ('movement', 'pred_mov'), "Student Mobility": ('student_ratio', 'pred_std')}
+
+
+@st.cache_resource
+def load_engine(version):
+    # model and latest feature rows are loaded once per model version
+    return ScenarioEngine(version=version)
+
+
+@st.cache_data
+def run_scenarios(version, spec):
+    return load_engine(version).run(json.loads(spec))
+
+
+def scenario_rule(i, states, keys, default_state):
+    with st.expander(f"Scenario {i + 1}", expanded=i == 0):
+        c1, c2, c3 = st.columns([2, 1, 1])
+        column = c1.selectbox("Feature:", COLUMNS, key=f"col{i}")
+        op = c2.radio("Change:", OPS, horizontal=True, key=f"op{i}")
+        value = c3.number_input("By:", value=1.2 if op == 'scale' else 0.0, step=0.05, key=f"val{i}",
+                                help="factor for scale, amount for shift")
+        sel_states = st.multiselect("States:", states, default=[default_state] if i == 0 else [], key=f"st{i}")
+        sel_keys = st.multiselect("Districts (optional):", keys, key=f"dk{i}")
+    return make_rule(column, op, value, sel_states, sel_keys)
+
+
+def scenarios_page():
+    st.title("🧪 What-if Scenarios")
+    st.caption("Perturb the latest month's features for some states or districts and compare the saved "
+               "phase-4 model's forecasts against the baseline. All scenarios are scored in one batch.")
+
+    versions = registry.list_versions(MODEL)
+    if not versions:
+        st.warning("No saved forecast model; run phase 4 (python -m src.model.forecast).")
+        return
+    version = versions[-1]
+    engine = load_engine(version)
+    if engine.local:
+        st.caption(f"+{HORIZON}m forecasts of {len(engine.local)} group(s) come from the local models phase 4 "
+                   f"selected ({', '.join(g for g, _, _ in engine.local)}), as in future_forecast.")
+
+    # -------------------------
+    # Scenario builder
+    # -------------------------
+    states = sorted(set(engine.states))
+    n = st.slider("Number of scenarios:", 1, MAX_SCENARIOS, 2)
+    largest = engine.states.value_counts().index[0]
+    rules = [scenario_rule(i, states, list(engine.keys), largest) for i in range(n)]
+    scenarios = {f"{i + 1}: {describe_rule(r)}": [r] for i, r in enumerate(rules)}
+
+    result = run_scenarios(version, json.dumps(scenarios))
+    horizons = forecast_horizons(result.columns)
+
+    c1, c2 = st.columns(2)
+    metric = c1.radio("Metric:", list(METRICS), horizontal=True)
+    horizon = c2.selectbox("Forecast horizon (months):", horizons, index=horizons.index(3) if 3 in horizons else 0)
+    agg_col, pred_col = METRICS[metric]
+    pred_col = f"{pred_col}_{horizon}m"
+
+    # -------------------------
+    # State / national effect
+    # -------------------------
+    summary = summarize(result, horizon)
+    shown = summary[(summary['districts_affected'] > 0) | (summary['state'] == NATIONAL)]
+
+    fig = go.Figure()
+    for name, d in shown.groupby('scenario', sort=False):
+        fig.add_trace(go.Bar(x=d['state'], y=d[f'{agg_col}_pct'], name=name))
+    fig.update_layout(
+        title=f"{metric} forecast change vs baseline (+{horizon}m, affected states and national)",
+        yaxis_title="% change",
+        barmode="group",
+        height=450,
+        template="plotly_white",
+        legend=dict(orientation="h"),
+    )
+    st.plotly_chart(fig, width='stretch')
+
+    table = shown[['scenario', 'state', 'districts_affected', f'{agg_col}_base', agg_col,
+                   f'{agg_col}_delta', f'{agg_col}_pct']]
+    st.dataframe(table.reset_index(drop=True))
+
+    # -------------------------
+    # District drill-down
+    # -------------------------
+    st.subheader("Largest district changes")
+    name = st.selectbox("Scenario:", list(scenarios))
+    d = result[(result['scenario'] == name) & result['affected']]
+    d = d.reindex(d[f'{pred_col}_delta'].abs().sort_values(ascending=False).index).head(25)
+    st.dataframe(d[['district_key', 'state', f'{pred_col}_base', pred_col, f'{pred_col}_delta']]
+                 .reset_index(drop=True))
+
+
+if __name__ == "__main__":
+    scenarios_page()
@@ -0,0 +1,79 @@
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.data.accumulator import MonthlyAccumulator
+
+N_CHUNKS = 100
+ROWS = 100_000
+N_DISTRICTS = 1_000
+N_MONTHS = 24
+VALUE_COLS = ['demo_age_5_17', 'demo_age_17_']
+KEYS = ['district_key', 'state', 'district', 'month']
+
+
+def make_chunk(rng, i):
+    """
+    Synthetic raw chunk; later chunks drift into new months so the
+    key space keeps growing like successive UIDAI drops do.
+    """
+    d = rng.integers(0, N_DISTRICTS, ROWS)
+    m = rng.integers(0, N_MONTHS, ROWS) + i // 2
+    state = pd.Series(d % 36).map(lambda s: f"STATE {s}")
+    district = pd.Series(d).map(lambda s: f"DISTRICT {s}")
+
+    return pd.DataFrame({
+        'state': state,
+        'district': district,
+        'district_key': state + "_" + district,
+        'month': pd.PeriodIndex.from_ordinals(m + 660, freq='M'),
+        'demo_age_5_17': rng.integers(0, 20, ROWS),
+        'demo_age_17_': rng.integers(0, 50, ROWS),
+    })
+
+
+def run_legacy(chunks):
+    agg, times = None, []
+    for chunk in chunks:
+        start = time.perf_counter()
+        grouped = chunk.groupby(KEYS)[VALUE_COLS].sum()
+        agg = grouped if agg is None else agg.add(grouped, fill_value=0)
+        times.append(time.perf_counter() - start)
+    return agg.reset_index(), times
+
+
+def run_accumulator(chunks):
+    acc, times = MonthlyAccumulator('district_key', VALUE_COLS, attr_cols=['state', 'district']), []
+    for chunk in chunks:
+        start = time.perf_counter()
+        acc.add(chunk)
+        times.append(time.perf_counter() - start)
+    return acc.to_frame(), times
+
+
+def report(name, times):
+    ms = np.asarray(times) * 1000
+    print(f"{name:12s} first10={ms[:10].mean():7.1f}ms  last10={ms[-10:].mean():7.1f}ms  total={ms.sum() / 1000:6.2f}s")
+
+
+def main():
+    rng = np.random.default_rng(42)
+    chunks = [make_chunk(rng, i) for i in range(N_CHUNKS)]
+
+    print(f"[BENCH] {N_CHUNKS} chunks × {ROWS:,} rows, {N_DISTRICTS} districts")
+
+    df_old, t_old = run_legacy(chunks)
+    df_new, t_new = run_accumulator(chunks)
+
+    report("agg.add", t_old)
+    report("accumulator", t_new)
+
+    # same totals either way
+    df_old = df_old.sort_values(KEYS).reset_index(drop=True)
+    df_new = df_new.sort_values(KEYS).reset_index(drop=True)
+    assert (df_old[VALUE_COLS].to_numpy() == df_new[VALUE_COLS].to_numpy()).all()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+import os
+import tempfile
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from src.model.backtest import backtest, summarize
+from src.model.forecast import BACKENDS, FEATURE_COLS, TARGETS, load_pairs, make_forecaster, make_forest
+
+N_SINGLE = 50   # single-row predictions timed for the latency percentile
+
+
+def model_size_mb(model):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "model.joblib")
+        joblib.dump(model, path)
+        return os.path.getsize(path) / (1 << 20)
+
+
+def time_predict(predict, X):
+    """
+    Batch latency over X and median single-row latency, in ms
+    """
+    start = time.perf_counter()
+    predict(X)
+    batch = (time.perf_counter() - start) * 1000
+
+    single = []
+    for i in range(min(N_SINGLE, len(X))):
+        start = time.perf_counter()
+        predict(X.iloc[i:i + 1])
+        single.append((time.perf_counter() - start) * 1000)
+    return batch, float(np.median(single))
+
+
+def bench_backend(backend, X, Y, X_latest):
+    start = time.perf_counter()
+    model = make_forecaster(backend).fit(X, Y)
+    fit_s = time.perf_counter() - start
+
+    batch_ms, single_ms = time_predict(model.predict, X_latest)
+    return dict(backend=backend, fit_s=fit_s, batch_ms=batch_ms, single_ms=single_ms,
+                size_mb=model_size_mb(model))
+
+
+def bench_legacy(X, Y, X_latest):
+    """
+    The former phase-4 setup: one 400-tree forest per target
+    """
+    start = time.perf_counter()
+    models = [make_forest().fit(X, Y[t]) for t in TARGETS]
+    fit_s = time.perf_counter() - start
+
+    batch_ms, single_ms = time_predict(lambda x: [m.predict(x) for m in models], X_latest)
+    return dict(backend='rf x2 (legacy)', fit_s=fit_s, batch_ms=batch_ms, single_ms=single_ms,
+                size_mb=model_size_mb(models))
+
+
+def main(backends=tuple(BACKENDS), min_train_months=2, workers=None):
+    pairs = load_pairs()
+    X, Y = pairs[FEATURE_COLS], pairs[TARGETS]
+    X_latest = pairs.groupby('district_key').tail(1)[FEATURE_COLS]
+
+    print(f"[BENCH] {len(pairs):,} training pairs × {len(FEATURE_COLS)} features, "
+          f"{len(X_latest):,} districts to predict")
+
+    rows = [bench_legacy(X, Y, X_latest)] + [bench_backend(b, X, Y, X_latest) for b in backends]
+    table = pd.DataFrame(rows).set_index('backend')
+
+    # out-of-sample error from the walk-forward harness
+    timings, preds = backtest(pairs, {b: dict(backend=b) for b in backends}, min_train_months, workers)
+    errors = summarize(timings, preds).pivot(index='config', columns='target', values='rmse')
+    table = table.join(errors.add_prefix('rmse_'))
+
+    with pd.option_context('display.width', 160, 'display.max_columns', 20, 'display.float_format', '{:,.4f}'.format):
+        print(table)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Fit/predict cost, size and backtest error per forecast backend")
+    parser.add_argument("--backends", nargs="+", choices=list(BACKENDS), default=list(BACKENDS))
+    parser.add_argument("--min-train-months", type=int, default=2)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    main(args.backends, args.min_train_months, args.workers)
@@ -0,0 +1,65 @@
+import time
+
+import numpy as np
+
+from src.model.forecast import (FEATURE_COLS, HORIZON, INTERVAL, TARGETS, fit_forecaster, forest_quantiles,
+                                load_pairs, make_forecaster)
+
+
+def dense_quantiles(model, X, X_train, quantiles):
+    """
+    Reference: the (rows × training rows) quantile-forest weight matrix
+    built tree by tree, then a weighted quantile per row
+    """
+    forest, y = model.regressor_, model.leaves_['y']
+    leaves, train_leaves = forest.apply(X), forest.apply(X_train)
+    W = np.zeros((len(X), len(X_train)))
+    for t in range(leaves.shape[1]):
+        same = leaves[:, t, None] == train_leaves[None, :, t]
+        W += same / same.sum(axis=1, keepdims=True)
+    W /= leaves.shape[1]
+
+    out = np.empty((len(quantiles), len(X), y.shape[1]))
+    for k in range(y.shape[1]):
+        order = np.argsort(y[:, k], kind='stable')
+        cum = np.cumsum(W[:, order], axis=1)
+        for i, q in enumerate(quantiles):
+            out[i, :, k] = y[order[np.argmax(cum >= q * cum[:, -1:], axis=1)], k]
+    return out
+
+
+def main():
+    pairs = load_pairs()
+    # latest forecast origin; training targets must be observed by then
+    last = pairs['month_index'].max()
+    train, test = pairs[pairs['month_index'] <= last - HORIZON], pairs[pairs['month_index'] == last]
+    q = [(1 - INTERVAL) / 2, (1 + INTERVAL) / 2]
+
+    model = fit_forecaster(make_forecaster('rf'), train[FEATURE_COLS], train[TARGETS])
+    X = test[FEATURE_COLS]
+    n_trees = len(model.regressor_.estimators_)
+    print(f"[BENCH] {len(X):,} rows × {n_trees} trees × {len(train):,} training rows × {len(TARGETS)} outputs")
+
+    start = time.perf_counter()
+    ref = dense_quantiles(model, X, train[FEATURE_COLS], q)
+    t_dense = time.perf_counter() - start
+
+    start = time.perf_counter()
+    new = forest_quantiles(model, X, q)
+    t_new = time.perf_counter() - start
+
+    print(f"{'dense weights':15s} {t_dense * 1000:9.1f}ms")
+    print(f"{'leaf gather':15s} {t_new * 1000:9.1f}ms  ({t_dense / t_new:,.1f}x)")
+    assert np.allclose(ref, new)
+
+    # held-out coverage on the latest month with targets
+    y = test[TARGETS].to_numpy()
+    inside = (y >= new[0]) & (y <= new[1])
+    for i, target in enumerate(TARGETS):
+        width = np.median(new[1][:, i] - new[0][:, i])
+        print(f"[COVERAGE] {target}: {inside[:, i].mean():.1%} inside the nominal {INTERVAL:.0%} interval "
+              f"(median width {width:,.4g})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+import time
+
+import numpy as np
+
+from src.model.scenarios import ScenarioEngine, make_rule
+
+N_SCENARIOS = 50
+COLUMNS = ['pop_adult', 'total_demo', 'bio_adult', 'student_ratio']
+
+
+def random_scenarios(engine, n, rng):
+    """
+    One or two scale rules per scenario on random states
+    """
+    states = sorted(set(engine.states))
+    out = {}
+    for i in range(n):
+        rules = [make_rule(rng.choice(COLUMNS), 'scale', rng.uniform(0.7, 1.3), list(rng.choice(states, 2)))
+                 for _ in range(rng.integers(1, 3))]
+        out[f"s{i}"] = rules
+    return out
+
+
+def main(n=N_SCENARIOS, intervals=False):
+    rng = np.random.default_rng(0)
+    engine = ScenarioEngine(intervals=intervals)
+    scenarios = random_scenarios(engine, n, rng)
+    print(f"[BENCH] {engine.service.meta['backend']} model v{engine.service.meta['version']}, "
+          f"{n} scenarios × {len(engine.keys):,} districts, intervals={intervals}")
+
+    # one stacked predict call for the baseline and every scenario
+    start = time.perf_counter()
+    result = engine.run(scenarios)
+    t_stacked = time.perf_counter() - start
+
+    # reference: perturb and predict scenario by scenario
+    start = time.perf_counter()
+    base = engine.predict(engine.base[None])[0]
+    deltas = []
+    for rules in scenarios.values():
+        X = engine.base.copy()
+        for rule in rules:
+            engine.apply(X, rule)
+        deltas.append(engine.predict(X[None])[0] - base)
+    t_loop = time.perf_counter() - start
+
+    col = engine.service.columns[0]
+    assert np.allclose(np.concatenate(deltas)[:, 0], result[f"{col}_delta"].to_numpy())
+
+    print(f"{'per scenario':14s} {t_loop * 1000:9.1f}ms")
+    print(f"{'stacked batch':14s} {t_stacked * 1000:9.1f}ms  ({t_loop / t_stacked:,.1f}x)")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Stacked vs per-scenario what-if scoring")
+    parser.add_argument("--scenarios", type=int, default=N_SCENARIOS)
+    parser.add_argument("--intervals", action="store_true", help="also score the prediction intervals (_lo/_hi)")
+    args = parser.parse_args()
+
+    main(args.scenarios, args.intervals)
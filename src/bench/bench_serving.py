@@ -0,0 +1,104 @@
+import json
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote
+
+import numpy as np
+import pandas as pd
+
+from src.model.serving import ForecastService, make_server
+
+N_REQUESTS = 400
+CLIENTS = 16      # concurrent stand-in clients
+BATCH = 100       # districts per batch request
+
+
+def run_clients(call, args, clients=CLIENTS):
+    """
+    Issues call(arg) for every arg from `clients` threads; returns wall
+    time and per-request latencies (ms)
+    """
+    def timed(arg):
+        start = time.perf_counter()
+        call(arg)
+        return (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        latencies = list(pool.map(timed, args))
+    return time.perf_counter() - start, np.array(latencies)
+
+
+def report(name, wall, latencies, rows_per_request=1, service=None, batches_before=0):
+    row = dict(scenario=name, requests=len(latencies), req_per_s=len(latencies) / wall,
+               rows_per_s=len(latencies) * rows_per_request / wall,
+               p50_ms=np.percentile(latencies, 50), p95_ms=np.percentile(latencies, 95),
+               p99_ms=np.percentile(latencies, 99))
+    if service is not None and service.batcher.batches > batches_before:
+        row['mean_batch'] = (service.batcher.rows / service.batcher.batches)
+    return row
+
+
+def http_get(base, key):
+    with urllib.request.urlopen(f"{base}/predict?district={quote(key)}") as r:
+        return json.load(r)
+
+
+def http_post(base, keys):
+    req = urllib.request.Request(f"{base}/predict", data=json.dumps({'districts': keys}).encode(),
+                                 headers={'Content-Type': 'application/json'})
+    with urllib.request.urlopen(req) as r:
+        return json.load(r)
+
+
+def main():
+    rng = np.random.default_rng(0)
+    rows = []
+
+    # cache disabled: every request reaches the model
+    service = ForecastService(cache_size=0)
+    keys = list(service.features.index)
+    sample = list(rng.choice(keys, N_REQUESTS))
+    print(f"[BENCH] {service.meta['backend']} model v{service.meta['version']}, {len(keys):,} districts, "
+          f"{N_REQUESTS} requests, {CLIENTS} clients")
+
+    # baseline: one model call per request, no batching
+    wall, lat = run_clients(lambda k: service.predict_districts([k]), sample)
+    rows.append(report("in-process, unbatched", wall, lat))
+
+    service.batcher.batches = service.batcher.rows = 0
+    wall, lat = run_clients(service.predict_district, sample)
+    rows.append(report("in-process, micro-batched", wall, lat, service=service))
+
+    server = make_server(service, port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_port}"
+
+    service.batcher.batches = service.batcher.rows = 0
+    wall, lat = run_clients(lambda k: http_get(base, k), sample)
+    rows.append(report("http, micro-batched", wall, lat, service=service))
+
+    batches = [list(rng.choice(keys, BATCH)) for _ in range(N_REQUESTS // 20)]
+    wall, lat = run_clients(lambda b: http_post(base, b), batches)
+    rows.append(report(f"http, batch of {BATCH}", wall, lat, rows_per_request=BATCH))
+    server.shutdown()
+
+    # warm LRU cache: repeated districts skip the model entirely
+    cached = ForecastService()
+    server = make_server(cached, port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_port}"
+    run_clients(lambda k: http_get(base, k), sorted(set(sample)))
+    wall, lat = run_clients(lambda k: http_get(base, k), sample)
+    rows.append(report("http, cached", wall, lat))
+    server.shutdown()
+    print(f"[CACHE] {cached.cache.stats()}")
+
+    with pd.option_context('display.width', 160, 'display.max_columns', 20, 'display.float_format', '{:,.1f}'.format):
+        print(pd.DataFrame(rows).set_index('scenario'))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,11 @@
+import os
+
+# Data root holding raw/ and processed/. Read once at import, so set
+# AADHAAR_DATA_ROOT (or pass --data-root to src.pipeline) before running.
+DATA_ROOT = os.environ.get("AADHAAR_DATA_ROOT", "Dataset")
+
+RAW = os.path.join(DATA_ROOT, "raw")
+PROC = os.path.join(DATA_ROOT, "processed")
+
+# Phase-4 forecasting model: rf, hgb or linear (see src.model.forecast.BACKENDS)
+FORECAST_BACKEND = os.environ.get("AADHAAR_FORECAST_BACKEND", "rf")
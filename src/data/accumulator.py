@@ -0,0 +1,174 @@
+import numpy as np
+import pandas as pd
+
+
+class MonthlyAccumulator:
+    """
+    Streaming group-by-sum over (key, month).
+
+    Keys and months are mapped to dense integer codes through persistent
+    dictionaries and counts are summed into a (keys × months × values)
+    NumPy array, so adding a chunk costs O(chunk rows) no matter how many
+    chunks were added before. The DataFrame is only built in to_frame().
+
+    key_col may be one column or a list (e.g. ['district_key', 'pincode']);
+    composite keys are combined from per-column integer codes.
+    attr_cols are carried along with the key (e.g. state/district for a
+    district_key) and taken from the first row a key is seen on.
+    """
+
+    def __init__(self, key_col, value_cols, attr_cols=(), dtype=np.int64):
+        self.key_col = key_col
+        self.key_cols = [key_col] if isinstance(key_col, str) else list(key_col)
+        self.value_cols = list(value_cols)
+        self.attr_cols = list(attr_cols)
+        self.dtype = dtype
+
+        self._key_codes = {}
+        self._keys = []
+        self._attrs = {c: [] for c in self.attr_cols}
+        self._month_codes = {}
+        self._months = []
+
+        self._sums = np.zeros((64, 16, len(self.value_cols)), dtype=dtype)
+        self._seen = np.zeros((64, 16), dtype=bool)
+
+    # ----------------------------
+    # code dictionaries
+    # ----------------------------
+
+    def _encode(self, values, codes, labels, factorized=None):
+        """
+        Maps a chunk's unique values to persistent codes (Python work is
+        per unique value only) and broadcasts them back to rows.
+        Returns (row codes, local codes, positions of newly seen values).
+        """
+        local, uniques = factorized if factorized is not None else pd.factorize(values)
+        lut = np.empty(len(uniques), dtype=np.int64)
+        new = []
+
+        for i, u in enumerate(uniques):
+            code = codes.get(u)
+            if code is None:
+                code = codes[u] = len(labels)
+                labels.append(u)
+                new.append(i)
+            lut[i] = code
+
+        out = np.full(len(local), -1, dtype=np.int64)
+        valid = local >= 0
+        out[valid] = lut[local[valid]]
+        return out, local, new
+
+    def _factorize_keys(self, df):
+        """
+        (local codes, unique keys) for the key column(s). A composite key is
+        packed into one int64 from per-column codes, factorized, and only its
+        distinct values are unpacked into tuples.
+        """
+        if len(self.key_cols) == 1:
+            return pd.factorize(df[self.key_col])
+
+        packed = np.zeros(len(df), dtype=np.int64)
+        valid = np.ones(len(df), dtype=bool)
+        levels = []
+
+        for c in self.key_cols:
+            codes, uniques = pd.factorize(df[c])
+            packed = packed * len(uniques) + codes.clip(0)
+            valid &= codes >= 0
+            levels.append(uniques)
+
+        local = np.full(len(df), -1, dtype=np.int64)
+        local[valid], uniques = pd.factorize(packed[valid])
+
+        parts = []
+        for lvl in reversed(levels):
+            uniques, code = np.divmod(uniques, len(lvl))
+            parts.append(np.asarray(lvl)[code].tolist())
+
+        return local, list(zip(*reversed(parts)))
+
+    def _add_attrs(self, df, local, new):
+        # first row of every local code: reversed fancy assignment keeps the
+        # first write (rows with a missing key, code -1, are skipped)
+        first = np.empty(local.max() + 1, dtype=np.int64)
+        rows = np.flatnonzero(local >= 0)
+        first[local[rows[::-1]]] = rows[::-1]
+
+        idx = first[new]
+        for c in self.attr_cols:
+            self._attrs[c].extend(df[c].to_numpy()[idx])
+
+    def _grow(self):
+        k, m = len(self._keys), len(self._months)
+        cap_k, cap_m, _ = self._sums.shape
+
+        if k <= cap_k and m <= cap_m:
+            return
+
+        new_k = max(cap_k, 1 << int(np.ceil(np.log2(max(k, 1)))))
+        new_m = max(cap_m, 1 << int(np.ceil(np.log2(max(m, 1)))))
+
+        sums = np.zeros((new_k, new_m, len(self.value_cols)), dtype=self.dtype)
+        seen = np.zeros((new_k, new_m), dtype=bool)
+        sums[:cap_k, :cap_m] = self._sums
+        seen[:cap_k, :cap_m] = self._seen
+
+        self._sums, self._seen = sums, seen
+
+    # ----------------------------
+    # public API
+    # ----------------------------
+
+    def add(self, df, month_col='month'):
+        """
+        Adds one chunk; rows with a missing key or month are dropped,
+        matching groupby's default dropna behaviour.
+        """
+        if len(df) == 0:
+            return self
+
+        kc, local, new = self._encode(None, self._key_codes, self._keys,
+                                      factorized=self._factorize_keys(df))
+        if new and self.attr_cols:
+            self._add_attrs(df, local, new)
+
+        mc, _, _ = self._encode(df[month_col], self._month_codes, self._months)
+        self._grow()
+
+        valid = (kc >= 0) & (mc >= 0)
+        kc, mc = kc[valid], mc[valid]
+        values = df[self.value_cols].to_numpy(dtype=np.float64)[valid]
+        values = np.nan_to_num(values)
+
+        cap_k, cap_m, _ = self._sums.shape
+        flat = kc * cap_m + mc
+        sums = self._sums.reshape(cap_k * cap_m, -1)
+
+        for j in range(len(self.value_cols)):
+            sums[:, j] += np.bincount(flat, weights=values[:, j], minlength=cap_k * cap_m) \
+                .astype(self.dtype)
+
+        self._seen.reshape(-1)[flat] = True
+        return self
+
+    def to_frame(self, month_col='month'):
+        """
+        Key + attribute columns, month and summed values for every observed cell
+        """
+        k, m = len(self._keys), len(self._months)
+        kc, mc = np.nonzero(self._seen[:k, :m])
+
+        if len(self.key_cols) == 1:
+            out = pd.DataFrame({self.key_col: pd.Index(self._keys).take(kc)})
+        else:
+            keys = pd.MultiIndex.from_tuples(self._keys, names=self.key_cols)
+            out = keys.take(kc).to_frame(index=False)
+        for c in self.attr_cols:
+            out[c] = pd.Index(self._attrs[c]).take(kc)
+
+        out[month_col] = pd.Index(self._months).take(mc)
+        values = pd.DataFrame(self._sums[kc, mc], columns=self.value_cols)
+
+        return pd.concat([out, values], axis=1)
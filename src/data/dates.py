@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+
+DATE_FORMAT = "%d-%m-%Y"
+MISSING = -1
+
+# raw date string → (day code, month code); shared by every chunk in the process
+_CACHE = {}
+
+
+def _lookup(uniques):
+    """
+    Parses only the strings not seen before and returns codes for all uniques
+    """
+    new = [u for u in uniques if u not in _CACHE]
+    if new:
+        parsed = pd.to_datetime(pd.Index(new, dtype=object), format=DATE_FORMAT, errors='coerce')
+        days = np.where(parsed.isna(), MISSING, parsed.values.astype('datetime64[D]').astype(np.int64))
+        months = np.where(parsed.isna(), MISSING, (parsed.year - 1970) * 12 + parsed.month - 1)
+        _CACHE.update(zip(new, zip(days.tolist(), months.tolist())))
+
+    codes = np.array([_CACHE[u] for u in uniques], dtype=np.int32).reshape(-1, 2)
+    return codes[:, 0], codes[:, 1]
+
+
+def date_codes(values):
+    """
+    Compact int32 codes for a raw date column, parsing each distinct string once.
+    Returns (day code = days since 1970-01-01, month code = months since 1970-01);
+    unparseable or missing dates are -1.
+    """
+    local, uniques = pd.factorize(pd.Series(values))
+    days, months = _lookup(list(uniques))
+
+    day_code = np.full(len(local), MISSING, dtype=np.int32)
+    month_code = np.full(len(local), MISSING, dtype=np.int32)
+    valid = local >= 0
+    day_code[valid] = days[local[valid]]
+    month_code[valid] = months[local[valid]]
+    return day_code, month_code
+
+
+def parse_dates(values):
+    """
+    datetime64 column from raw date strings, parsed once per distinct value
+    """
+    day_code, _ = date_codes(values)
+    out = pd.to_datetime(day_code.astype(np.int64), unit='D')
+    out = out.where(day_code != MISSING)
+    return pd.Series(out, index=getattr(values, 'index', None), name=getattr(values, 'name', None))
+
+
+def month_codes(values):
+    """
+    int32 month codes from month codes, Periods or datetimes
+    """
+    s = pd.Series(values)
+    if isinstance(s.dtype, pd.PeriodDtype):
+        return s.array.asi8.astype(np.int32)
+    if pd.api.types.is_datetime64_any_dtype(s):
+        return ((s.dt.year - 1970) * 12 + s.dt.month - 1).fillna(MISSING).to_numpy(dtype=np.int32)
+    return s.to_numpy(dtype=np.int32)
+
+
+def month_num(codes):
+    return np.asarray(codes) % 12 + 1
+
+
+def quarter(codes):
+    return (np.asarray(codes) % 12) // 3 + 1
+
+
+def month_label(codes):
+    """
+    Readable 'YYYY-MM' labels; only built at display time
+    """
+    codes = np.asarray(codes, dtype=np.int64)
+    return pd.PeriodIndex.from_ordinals(codes, freq='M').strftime('%Y-%m')
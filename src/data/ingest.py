@@ -0,0 +1,133 @@
+import glob
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pv
+
+from src import config
+from src.data.dates import parse_dates
+
+RAW_BASE = config.RAW
+
+# Cohort count columns per raw dataset folder
+COUNT_COLS = {
+    "api_data_aadhar_enrolment": ['age_0_5', 'age_5_17', 'age_18_greater'],
+    "api_data_aadhar_demographic": ['demo_age_5_17', 'demo_age_17_'],
+    "api_data_aadhar_biometric": ['bio_age_5_17', 'bio_age_17_'],
+}
+
+CATEGORY = pa.dictionary(pa.int32(), pa.string())
+
+
+def dataset_schema(subfolder):
+    """
+    Explicit column types for one raw dataset: dictionary-encoded
+    date/state/district, int32 pincode and int32 cohort counts.
+    The date stays a dictionary so each distinct string is parsed once.
+    """
+    types = {
+        'date': CATEGORY,
+        'state': CATEGORY,
+        'district': CATEGORY,
+        'pincode': pa.int32(),
+    }
+    for col in COUNT_COLS[subfolder]:
+        types[col] = pa.int32()
+    return types
+
+
+def list_chunks(subfolder, base=RAW_BASE):
+    path = os.path.join(base, subfolder)
+    return sorted(glob.glob(os.path.join(path, "*.csv")))
+
+
+def read_chunk(path, subfolder, columns=None):
+    """
+    Reads one raw CSV chunk into an Arrow table using the dataset schema.
+    Falls back to a coercing pandas read when a value does not fit the schema.
+    """
+    types = dataset_schema(subfolder)
+    convert = pv.ConvertOptions(column_types=types, include_columns=columns)
+
+    try:
+        return pv.read_csv(path, convert_options=convert)
+    except pa.ArrowInvalid as e:
+        print(f"[WARN] {os.path.basename(path)}: {e} → coercing with pandas")
+
+    df = pd.read_csv(path, usecols=columns, low_memory=False)
+    for col in df.columns:
+        if types[col] == pa.int32():
+            df[col] = pd.to_numeric(df[col], errors='coerce')
+        else:
+            df[col] = df[col].astype(str)
+
+    fields = [pa.field(c, types[c]) for c in df.columns]
+    return pa.Table.from_pandas(df, schema=pa.schema(fields), preserve_index=False)
+
+
+def iter_batches(path, subfolder, columns=None, block_size=None):
+    """
+    Streams one raw chunk as typed pandas batches of about block_size bytes.
+    """
+    read = pv.ReadOptions(block_size=block_size) if block_size else pv.ReadOptions()
+    convert = pv.ConvertOptions(column_types=dataset_schema(subfolder), include_columns=columns)
+    yielded = False
+
+    try:
+        with pv.open_csv(path, read_options=read, convert_options=convert) as reader:
+            for batch in reader:
+                yielded = True
+                yield batch.to_pandas()
+    except pa.ArrowInvalid:
+        if yielded:
+            raise
+        # nothing consumed yet: take the coercing whole-file path instead
+        yield read_chunk(path, subfolder, columns).to_pandas()
+
+
+def _timed_read(args):
+    path, subfolder, columns = args
+    start = time.perf_counter()
+    table = read_chunk(path, subfolder, columns)
+    return table, time.perf_counter() - start
+
+
+def read_chunks(subfolder, base=RAW_BASE, columns=None, workers=None, executor="thread"):
+    """
+    Reads every chunk of a raw dataset in parallel and concatenates the
+    Arrow tables. Use executor="process" to spread parsing over processes.
+    """
+    files = list_chunks(subfolder, base)
+
+    if len(files) == 0:
+        raise ValueError(f"No files found in {os.path.join(base, subfolder)}")
+
+    print(f"[INFO] Found {len(files)} chunks in {subfolder}")
+
+    pool = ProcessPoolExecutor if executor == "process" else ThreadPoolExecutor
+    jobs = [(f, subfolder, columns) for f in files]
+
+    tables = []
+    with pool(max_workers=workers) as ex:
+        for f, (table, secs) in zip(files, ex.map(_timed_read, jobs)):
+            rate = table.num_rows / secs if secs > 0 else float('inf')
+            print(f"[LOAD] {os.path.basename(f)} → {table.num_rows:,} rows ({rate:,.0f} rows/s)")
+            tables.append(table)
+
+    return pa.concat_tables(tables).unify_dictionaries()
+
+
+def load_chunks(subfolder, base=RAW_BASE, columns=None, workers=None, executor="thread"):
+    """
+    Parallel, schema-typed load of a raw dataset as a pandas DataFrame
+    """
+    table = read_chunks(subfolder, base, columns, workers, executor)
+    df = table.to_pandas(self_destruct=True)
+
+    if 'date' in df.columns:
+        df['date'] = parse_dates(df['date'])
+
+    return df
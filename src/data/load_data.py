@@ -1,23 +1,4 @@
-import pandas as pd
-import glob
-import os
-
-BASE_DIR = "Dataset/raw"
-
-def load_chunks(subfolder):
-    path = os.path.join(BASE_DIR, subfolder)
-    files = glob.glob(os.path.join(path, "*.csv"))
-
-    print(f"[INFO] Found {len(files)} chunks for {subfolder}")
-
-    dfs = []
-    for f in files:
-        print(f"[LOAD] → {os.path.basename(f)}")
-        df = pd.read_csv(f, low_memory=False)
-        dfs.append(df)
-
-    df = pd.concat(dfs, ignore_index=True)
-    return df
+from src.data.ingest import load_chunks
 
 
 def load_all():
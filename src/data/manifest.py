@@ -0,0 +1,46 @@
+import hashlib
+import json
+import os
+
+
+def file_hash(path, block=1 << 20):
+    """
+    SHA-1 of a file's content, read in 1MB blocks
+    """
+    h = hashlib.sha1()
+    with open(path, "rb") as fh:
+        for buf in iter(lambda: fh.read(block), b""):
+            h.update(buf)
+    return h.hexdigest()
+
+
+def load_manifest(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as fh:
+        return json.load(fh)
+
+
+def save_manifest(manifest, path):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as fh:
+        json.dump(manifest, fh, indent=2, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def fingerprint(path, entry=None):
+    """
+    Returns (fingerprint, changed) for a file against its manifest entry.
+    The content hash is only recomputed when size or mtime differ.
+    """
+    stat = os.stat(path)
+    fp = {'size': stat.st_size, 'mtime': stat.st_mtime}
+
+    if entry and entry.get('size') == fp['size'] and entry.get('mtime') == fp['mtime']:
+        fp['sha1'] = entry['sha1']
+        return fp, False
+
+    fp['sha1'] = file_hash(path)
+    changed = not entry or entry.get('sha1') != fp['sha1']
+    return fp, changed
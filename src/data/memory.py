@@ -0,0 +1,96 @@
+import os
+import re
+
+from src.data.ingest import iter_batches
+from src import utils
+
+UNITS = {'': 1, 'K': 1 << 10, 'M': 1 << 20, 'G': 1 << 30, 'T': 1 << 40}
+
+PROBE_BYTES = 1 << 20   # raw CSV bytes read to measure row sizes
+BATCH_SHARE = 0.1       # share of the budget one in-flight batch may use
+OVERHEAD = 3.0          # working copies while a batch is converted/normalized
+
+
+def parse_size(text):
+    """
+    '2G', '512M', '1.5g', '800MB' or plain bytes → int bytes
+    """
+    m = re.fullmatch(r"\s*([\d.]+)\s*([KMGT]?)I?B?\s*", str(text).upper())
+    if not m:
+        raise ValueError(f"Invalid memory size: {text!r}")
+    return int(float(m.group(1)) * UNITS[m.group(2)])
+
+
+class MemoryBudget:
+    """
+    Sizes streaming batches to a memory budget.
+
+    The first batch of a dataset is read small and measured (in-memory
+    bytes per row, raw CSV bytes per row); later batches are sized so one
+    batch stays within BATCH_SHARE of the budget. Without a budget the
+    fixed default_rows is used.
+    """
+
+    def __init__(self, max_memory=None, default_rows=300_000):
+        self.max_bytes = parse_size(max_memory) if max_memory else None
+        self.default_rows = default_rows
+        self.row_bytes = None
+        self.raw_row_bytes = None
+
+    def observe(self, df, raw_bytes=None):
+        if len(df) == 0:
+            return
+        self.row_bytes = df.memory_usage(deep=True).sum() / len(df)
+        if raw_bytes:
+            self.raw_row_bytes = raw_bytes / len(df)
+
+    def probe(self, path, subfolder, columns=None, transform=None):
+        """
+        Measures row sizes on the first block of a raw CSV chunk, after
+        transform (e.g. preprocessing) when the batch is kept in that form
+        """
+        batch = next(iter_batches(path, subfolder, columns, block_size=PROBE_BYTES), None)
+        if batch is not None:
+            if transform is not None:
+                batch = transform(batch)
+            raw = min(PROBE_BYTES, os.path.getsize(path))
+            self.observe(batch, raw_bytes=raw)
+            print(f"[MEM] {os.path.basename(path)}: {self.row_bytes:.0f} B/row in memory, "
+                  f"{self.raw_row_bytes:.0f} B/row raw → {self.rows:,} rows per batch")
+
+    @property
+    def rows(self):
+        if self.max_bytes is None or self.row_bytes is None:
+            return self.default_rows
+        rows = self.max_bytes * BATCH_SHARE / (self.row_bytes * OVERHEAD)
+        return max(10_000, int(rows))
+
+    @property
+    def block_size(self):
+        """
+        CSV reader block size (bytes) that yields about self.rows rows
+        """
+        raw = self.raw_row_bytes or 64
+        return max(PROBE_BYTES, int(self.rows * raw))
+
+    def fits(self, raw_bytes):
+        """
+        Whether raw CSV input of this size can be held in memory at once
+        """
+        if self.max_bytes is None:
+            return True
+        if self.row_bytes is None or self.raw_row_bytes is None:
+            return False
+        est_rows = raw_bytes / self.raw_row_bytes
+        return est_rows * self.row_bytes * OVERHEAD <= self.max_bytes
+
+    def report(self, phase):
+        if self.max_bytes is None:
+            return
+        peak, budget = utils.peak_rss_mb(), self.max_bytes / (1 << 20)
+        if not utils.PEAK_IS_PHASE:
+            # the peak may belong to an earlier phase of this worker
+            print(f"[MEM] {phase}: {utils.peak_label()} {peak:,.0f} MB (budget {budget:,.0f} MB not checked)")
+            return
+        status = "within" if peak <= budget else "OVER"
+        print(f"[MEM] {phase}: peak RSS {peak:,.0f} MB {status} budget {budget:,.0f} MB")
@@ -0,0 +1,193 @@
+import hashlib
+import json
+import os
+import re
+import threading
+
+import numpy as np
+import pandas as pd
+
+from src import config
+
+ALIAS_TABLE = os.path.join(os.path.dirname(__file__), "name_aliases.csv")
+CACHE = os.path.join(config.PROC, "name_cache.json")
+RULES = 2   # bump when resolution rules change (2: smallest primed spelling is canonical)
+
+
+def clean_name(name):
+    """
+    Upper-cases and tidies one raw state/district name:
+    '&' → 'AND', drops '*'/'?' artifacts and normalizes spacing.
+    """
+    s = str(name).upper().replace('&', ' AND ')
+    s = re.sub(r'[*?]', ' ', s)
+    s = re.sub(r'\s*\(\s*', ' (', s)
+    s = re.sub(r'\s*\)', ')', s)
+    s = re.sub(r'\s*-\s*', '-', s)
+    return re.sub(r'\s+', ' ', s).strip()
+
+
+def match_key(name):
+    """
+    Spacing/punctuation-insensitive key used to merge spelling variants
+    """
+    return re.sub(r'[^A-Z0-9]', '', name)
+
+
+class NameNormalizer:
+    """
+    Resolves raw state/district strings to canonical names.
+
+    Work is done once per distinct raw value: cleaning, the canonical
+    alias table (renames, misspellings) and merging of spacing variants
+    within a state. Resolutions are memoized and persisted to CACHE so
+    later runs and chunks reuse them; editing the alias table invalidates
+    the cache. One instance is shared by the phase-2 dataset threads, so
+    updates of the memo dicts take a lock.
+    """
+
+    def __init__(self, alias_path=ALIAS_TABLE, cache_path=CACHE):
+        self.cache_path = cache_path
+        self.lock = threading.Lock()
+
+        with open(alias_path, "rb") as fh:
+            self.signature = hashlib.sha1(fh.read() + f"rules={RULES}".encode()).hexdigest()[:12]
+
+        aliases = pd.read_csv(alias_path, keep_default_na=False)
+        states = aliases[aliases['level'] == 'state']
+        districts = aliases[aliases['level'] == 'district']
+
+        self.state_alias = {
+            clean_name(a): clean_name(c) for a, c in zip(states['alias'], states['canonical'])
+        }
+        self.district_alias = {
+            (clean_name(s), clean_name(a)): clean_name(c)
+            for s, a, c in zip(districts['state'], districts['alias'], districts['canonical'])
+        }
+
+        self.states = {}
+        self.districts = {}
+        self.variants = {}
+        self._load_cache()
+
+    def _load_cache(self):
+        if not os.path.exists(self.cache_path):
+            return
+        with open(self.cache_path) as fh:
+            cache = json.load(fh)
+        if cache.get('signature') != self.signature:
+            print("[INFO] Alias table changed → rebuilding name cache")
+            return
+        self.states = cache['states']
+        self.districts = cache['districts']
+        self.variants = cache['variants']
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.cache_path) or ".", exist_ok=True)
+        with self.lock, open(self.cache_path, "w") as fh:
+            json.dump({
+                'signature': self.signature,
+                'states': self.states,
+                'districts': self.districts,
+                'variants': self.variants,
+            }, fh, indent=1, sort_keys=True)
+
+    # ----------------------------
+    # per-unique resolution
+    # ----------------------------
+
+    def state(self, raw):
+        out = self.states.get(raw)
+        if out is None:
+            name = clean_name(raw)
+            out = self.state_alias.get(name, name)
+            with self.lock:
+                self.states[raw] = out
+        return out
+
+    def spelling(self, state, raw):
+        """
+        Cleaned, aliased district name before variant merging
+        """
+        name = clean_name(raw)
+        return self.district_alias.get((state, name), name)
+
+    def district(self, state, raw):
+        memo = f"{state}|{raw}"
+        out = self.districts.get(memo)
+        if out is None:
+            name = self.spelling(state, raw)
+            with self.lock:
+                # primed variants already have their canonical spelling;
+                # otherwise the first spelling seen becomes the canonical one
+                out = self.variants.setdefault(f"{state}|{match_key(name)}", name)
+                self.districts[memo] = out
+        return out
+
+    def prime(self, frames):
+        """
+        Fixes the canonical spelling of every new variant in frames (raw
+        state/district columns) before normalize() runs concurrently: the
+        lexicographically smallest spelling wins, whatever order threads or
+        chunks meet them in. Variants already cached keep their name.
+        """
+        spellings = {}
+        for df in frames:
+            for s, d in df[['state', 'district']].drop_duplicates().itertuples(index=False):
+                state = self.state('NAN' if pd.isna(s) else str(s))
+                name = self.spelling(state, 'NAN' if pd.isna(d) else str(d))
+                spellings.setdefault(f"{state}|{match_key(name)}", set()).add(name)
+
+        with self.lock:
+            for variant, names in spellings.items():
+                self.variants.setdefault(variant, min(names))
+        return len(spellings)
+
+    # ----------------------------
+    # column-level API
+    # ----------------------------
+
+    def normalize(self, df):
+        """
+        Replaces state/district with canonical categoricals and builds
+        district_key. Row-level work is integer code lookups only.
+        """
+        state = df['state'].astype('category')
+        district = df['district'].astype('category')
+
+        # canonical state per raw category (missing → 'NAN', as str() did)
+        s_raw = list(state.cat.categories.astype(str)) + ['NAN']
+        s_names = pd.Index([self.state(v) for v in s_raw])
+        s_canon_codes, s_uniques = s_names.factorize()
+        s_codes = s_canon_codes[state.cat.codes.to_numpy()]
+
+        d_raw = list(district.cat.categories.astype(str)) + ['NAN']
+        d_codes = district.cat.codes.to_numpy()
+        d_codes = np.where(d_codes < 0, len(d_raw) - 1, d_codes)
+
+        # resolve each distinct (state, district) pair once
+        pair = s_codes.astype(np.int64) * len(d_raw) + d_codes
+        pair_codes, pairs = pd.factorize(pair)
+        p_state = pairs // len(d_raw)
+        p_dist = pairs % len(d_raw)
+
+        p_names = [self.district(s_uniques[s], d_raw[d]) for s, d in zip(p_state, p_dist)]
+        p_keys = [f"{s_uniques[s]}_{n}" for s, n in zip(p_state, p_names)]
+
+        dist_codes, dist_uniques = pd.Index(p_names).factorize()
+        key_codes, key_uniques = pd.Index(p_keys).factorize()
+
+        df['state'] = pd.Categorical.from_codes(s_codes, categories=s_uniques)
+        df['district'] = pd.Categorical.from_codes(dist_codes[pair_codes], categories=dist_uniques)
+        df['district_key'] = pd.Categorical.from_codes(key_codes[pair_codes], categories=key_uniques)
+        return df
+
+
+_NORMALIZER = None
+
+
+def get_normalizer():
+    global _NORMALIZER
+    if _NORMALIZER is None:
+        _NORMALIZER = NameNormalizer()
+    return _NORMALIZER
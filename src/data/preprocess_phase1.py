@@ -1,104 +1,155 @@
 import pandas as pd
-import glob
 import os
+import time
+
+from src import config
+from src.data.dates import month_codes, parse_dates
+from src.data.ingest import iter_batches, list_chunks, load_chunks
+from src.data.manifest import load_manifest, save_manifest
+from src.data.memory import MemoryBudget
+from src.data.normalize import get_normalizer
+from src.data.storage import TableWriter, write_table
+from src.utils import report_phase
+
+PROC_BASE = config.PROC
+MANIFEST = f"{PROC_BASE}/phase1_manifest.json"   # table → name-resolution signature it was written with
+
+# phase-1 table → (raw folder, cohort column prefix, label for sanity output)
+TABLES = {
+    'enrolment': ("api_data_aadhar_enrolment", "age", "Enrol"),
+    'demographic': ("api_data_aadhar_demographic", "demo", "Demo"),
+    'biometric': ("api_data_aadhar_biometric", "bio", "Bio"),
+}
+
+
+def preprocess(df, prefix, downcast=True):
+    # Date conversion (already parsed per unique value at load time)
+    if not pd.api.types.is_datetime64_any_dtype(df['date']):
+        df['date'] = parse_dates(df['date'])
+    df['month'] = month_codes(df['date'])
+
+    # Normalize identifiers + composite key (per unique value, canonical aliases)
+    df = get_normalizer().normalize(df)
+
+    # Pincode as nullable int32 (6 digits fit; 4 bytes instead of a Python string)
+    df['pincode'] = pd.to_numeric(df['pincode'], errors='coerce').astype('Int32')
+
+    # Downcast numeric cohort fields (streamed batches keep the int32 schema
+    # so every batch writes with the same column types)
+    for col in df.columns:
+        if col.lower().startswith(prefix):
+            df[col] = pd.to_numeric(df[col], errors='coerce', downcast='integer' if downcast else None)
 
-RAW_BASE = "Dataset/raw"
-PROC_BASE = "Dataset/processed"
+    return df
 
 
-def load_chunks(subfolder):
-    path = os.path.join(RAW_BASE, subfolder)
-    files = sorted(glob.glob(os.path.join(path, "*.csv")))
-    
-    if len(files) == 0:
-        raise ValueError(f"No files found in {path}")
+def save_parquet(df, name, partitioned=None):
+    out_path = write_table(df, name, base=PROC_BASE, partitioned=partitioned)
+    print(f"[SAVED] {name} → {out_path}")
 
-    dfs = []
 
-    print(f"[INFO] Found {len(files)} chunks in {subfolder}")
-    for f in files:
-        print(f"[LOAD] {os.path.basename(f)}")
-        df = pd.read_csv(f, low_memory=False)
-        dfs.append(df)
+def summarize(df, stats=None):
+    """
+    Running sanity stats, so streamed tables report like in-memory ones
+    """
+    stats = stats or {'rows': 0, 'cols': 0, 'min': None, 'max': None, 'districts': set(), 'states': set()}
+    stats['rows'] += len(df)
+    stats['cols'] = df.shape[1]
+    lo, hi = df['date'].min(), df['date'].max()
+    stats['min'] = lo if stats['min'] is None or lo < stats['min'] else stats['min']
+    stats['max'] = hi if stats['max'] is None or hi > stats['max'] else stats['max']
+    stats['districts'].update(df['district_key'].unique())
+    stats['states'].update(df['state'].unique())
+    return stats
 
-    df = pd.concat(dfs, ignore_index=True)
-    return df
 
+def stream_table(name, folder, prefix, budget, partitioned=None):
+    """
+    Batch-wise load → preprocess → append, for data that does not fit the budget
+    """
+    stats = None
 
-def preprocess(df, prefix):
-    # Date conversion
-    df['date'] = pd.to_datetime(df['date'], format="%d-%m-%Y", errors='coerce')
+    with TableWriter(name, base=PROC_BASE, partitioned=partitioned) as writer:
+        for f in list_chunks(folder):
+            print(f"[STREAM] {os.path.basename(f)} ({budget.rows:,} rows per batch)")
+            for batch in iter_batches(f, folder, block_size=budget.block_size):
+                batch = preprocess(batch, prefix, downcast=False)
+                writer.write(batch)
+                stats = summarize(batch, stats)
 
-    # Normalize identifiers
-    df['state'] = df['state'].astype(str).str.upper().str.strip()
-    df['district'] = df['district'].astype(str).str.upper().str.strip()
+    print(f"[SAVED] {name} → {writer.path}")
+    return stats
 
-    # Composite key
-    df['district_key'] = df['state'] + "_" + df['district']
 
-    # Pincode as string
-    df['pincode'] = df['pincode'].astype(str)
+def process_table(name, budget, partitioned=None):
+    folder, prefix, _ = TABLES[name]
+    files = list_chunks(folder)
 
-    # Downcast numeric cohort fields
-    for col in df.columns:
-        if col.lower().startswith(prefix):
-            df[col] = pd.to_numeric(df[col], errors='coerce', downcast='integer')
-
-    # Convert to category for memory efficiency
-    df['state'] = df['state'].astype('category')
-    df['district'] = df['district'].astype('category')
-    df['district_key'] = df['district_key'].astype('category')
+    if len(files) == 0:
+        raise ValueError(f"No files found in {folder}")
 
-    return df
+    if budget.max_bytes is not None:
+        budget.probe(files[0], folder, transform=lambda b: preprocess(b, prefix, downcast=False))
 
+    raw_bytes = sum(os.path.getsize(f) for f in files)
+    if not budget.fits(raw_bytes):
+        print(f"[MEM] {name}: {raw_bytes / (1 << 20):,.0f} MB raw exceeds the budget → streaming writes")
+        return stream_table(name, folder, prefix, budget, partitioned)
 
-def save_parquet(df, name):
-    os.makedirs(PROC_BASE, exist_ok=True)
-    out_path = os.path.join(PROC_BASE, f"{name}.parquet")
-    df.to_parquet(out_path, index=False)
-    print(f"[SAVED] {name} → {out_path}")
+    df = load_chunks(folder)
+    df = preprocess(df, prefix)
+    save_parquet(df, name, partitioned)
+    return summarize(df)
 
 
-def run_phase1():
+def run_phase1(partitioned=None, max_memory=None):
 
-    print("\n=== PHASE-1: LOADING DATA ===")
-    df_enrol = load_chunks("api_data_aadhar_enrolment")
-    df_demo = load_chunks("api_data_aadhar_demographic")
-    df_bio = load_chunks("api_data_aadhar_biometric")
+    print("\n=== PHASE-1: LOADING, PREPROCESSING & SAVING ===")
+    start = time.perf_counter()
+    budget = MemoryBudget(max_memory)
 
-    print("\n=== PREPROCESSING ===")
-    df_enrol = preprocess(df_enrol, prefix="age")
-    df_demo = preprocess(df_demo, prefix="demo")
-    df_bio = preprocess(df_bio, prefix="bio")
+    # one table at a time keeps at most one dataset in memory
+    stats = {name: process_table(name, budget, partitioned) for name in TABLES}
+    normalizer = get_normalizer()
+    normalizer.save()
 
-    print("\n=== SAVING TO PROCESSED ===")
-    save_parquet(df_enrol, "enrolment")
-    save_parquet(df_demo, "demographic")
-    save_parquet(df_bio, "biometric")
+    # phase 2 only scans tables whose names match its own resolution
+    manifest = load_manifest(MANIFEST)
+    manifest.update({name: dict(names=normalizer.signature) for name in TABLES})
+    save_manifest(manifest, MANIFEST)
 
     print("\n=== SANITY CHECKS ===")
 
-    print(f"Enrol Rows: {df_enrol.shape}")
-    print(f"Demo Rows:  {df_demo.shape}")
-    print(f"Bio Rows:   {df_bio.shape}")
+    labels = {name: f"{TABLES[name][2]}:".ljust(6) for name in TABLES}
+
+    for name, s in stats.items():
+        print(f"{TABLES[name][2]} Rows:".ljust(11), (s['rows'], s['cols']))
 
     print("\nDate Ranges:")
-    print("Enrol:", df_enrol['date'].min(), "→", df_enrol['date'].max())
-    print("Demo: ", df_demo['date'].min(),  "→", df_demo['date'].max())
-    print("Bio:  ", df_bio['date'].min(),   "→", df_bio['date'].max())
+    for name, s in stats.items():
+        print(labels[name], s['min'], "→", s['max'])
 
     print("\nDistrict Counts:")
-    print("Enrol:", df_enrol['district_key'].nunique())
-    print("Demo: ", df_demo['district_key'].nunique())
-    print("Bio:  ", df_bio['district_key'].nunique())
+    for name, s in stats.items():
+        print(labels[name], len(s['districts']))
 
     print("\nStates:")
-    print("Enrol:", df_enrol['state'].nunique())
-    print("Demo: ", df_demo['state'].nunique())
-    print("Bio:  ", df_bio['state'].nunique())
+    for name, s in stats.items():
+        print(labels[name], len(s['states']))
 
+    report_phase("phase-1", start)
+    budget.report("phase-1")
     print("\nPHASE-1 completed successfully!\n")
 
 
 if __name__ == "__main__":
-    run_phase1()
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Phase-1 ingestion & cleaning")
+    parser.add_argument("--partitioned", action="store_true",
+                        help="write hive-partitioned (state/month) parquet datasets")
+    parser.add_argument("--max-memory", default=None,
+                        help="memory budget, e.g. 2G; streams batches when data would not fit")
+    args = parser.parse_args()
+
+    run_phase1(partitioned=args.partitioned or None, max_memory=args.max_memory)
@@ -1,96 +1,328 @@
+import numpy as np
 import pandas as pd
 import glob
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 
-RAW = "Dataset/raw"
-PROC = "Dataset/processed"
-CHUNK = 300_000   # safe for 16GB
+from src import config
+from src.data.accumulator import MonthlyAccumulator
+from src.data.dates import MISSING, date_codes, month_label, month_num, quarter
+from src.data.ingest import iter_batches
+from src.data.memory import MemoryBudget
+from src.data.manifest import fingerprint, load_manifest, save_manifest
+from src.data.normalize import get_normalizer
+from src.data.preprocess_phase1 import MANIFEST as PHASE1_MANIFEST
+from src.data import storage
+from src.utils import report_phase
 
+RAW = config.RAW
+PROC = config.PROC
+CHUNK = 300_000   # default rows per batch (safe for 16GB) when no --max-memory is given
+MANIFEST = f"{PROC}/monthly_manifest.json"
+PARTIALS = f"{PROC}/partials"
+PARTIAL_VERSION = 3   # bump when the partial aggregate format changes
 
-def stream_monthly(path, value_cols, rename_map=None):
-    files = glob.glob(os.path.join(path, "*.csv"))
-    agg = None
+KEYS = ['district_key', 'state', 'district', 'month']
+PIN_KEYS = ['district_key', 'state', 'district', 'pincode', 'month']
+
+# aggregation level → accumulator key columns, sum dtype and manifest/partials prefix
+LEVELS = {
+    'district': dict(keys='district_key', dtype=np.int64, prefix=""),
+    'pincode': dict(keys=['district_key', 'pincode'], dtype=np.int32, prefix="pincode/"),
+}
+
+# phase-1 table name → raw folder, cohort columns and output names
+DATASETS = {
+    'demographic': dict(
+        folder="api_data_aadhar_demographic",
+        value_cols=['demo_age_5_17', 'demo_age_17_'],
+        rename_map={'demo_age_5_17': 'student_updates', 'demo_age_17_': 'adult_updates'},
+    ),
+    'biometric': dict(
+        folder="api_data_aadhar_biometric",
+        value_cols=['bio_age_5_17', 'bio_age_17_'],
+        rename_map={'bio_age_5_17': 'bio_student', 'bio_age_17_': 'bio_adult'},
+    ),
+    'enrolment': dict(
+        folder="api_data_aadhar_enrolment",
+        value_cols=['age_0_5', 'age_5_17', 'age_18_greater'],
+        rename_map={'age_18_greater': 'pop_adult'},
+    ),
+}
+
+
+def new_accumulator(value_cols, level='district'):
+    spec = LEVELS[level]
+    return MonthlyAccumulator(spec['keys'], value_cols, attr_cols=['state', 'district'], dtype=spec['dtype'])
+
+
+def raw_columns(value_cols, levels=('district',)):
+    extra = ['pincode'] if 'pincode' in levels else []
+    return ['date', 'state', 'district'] + extra + value_cols
+
+
+def aggregate_file(f, value_cols, budget, levels=('district',)):
+    """
+    {level: district-month (or pincode-month) sums} for a single raw chunk
+    file, read once through the shared typed pyarrow reader with only the
+    needed columns; each batch feeds every level's accumulator
+    """
+    accs = {level: new_accumulator(value_cols, level) for level in levels}
+    folder = os.path.basename(os.path.dirname(f))
+    columns = raw_columns(value_cols, levels)
+
+    for chunk in iter_batches(f, folder, columns, block_size=budget.block_size):
+        # Date → int32 month code (each distinct date string parsed once)
+        _, chunk['month'] = date_codes(chunk['date'])
+        chunk = chunk[chunk['month'] != MISSING]
+
+        # Normalize identifiers (per unique value, canonical aliases)
+        chunk = get_normalizer().normalize(chunk)
+
+        # Monthly aggregation on district and/or district × pincode
+        for acc in accs.values():
+            acc.add(chunk)
+
+    return {level: acc.to_frame() for level, acc in accs.items()}
+
+
+def partial_path(name, base):
+    return os.path.join(PARTIALS, name, base.replace(".csv", ".parquet"))
+
+
+def stale_levels(f, folder, manifest, levels):
+    """
+    Levels whose saved partial aggregate of raw chunk f is missing or out
+    of date, with the chunk's fingerprint per level
+    """
+    base = os.path.basename(f)
+    fps, stale = {}, []
+    for level in levels:
+        name = LEVELS[level]['prefix'] + folder
+        fps[level], changed = fingerprint(f, manifest.get(name, {}).get(base))
+        if changed or not os.path.exists(partial_path(name, base)):
+            stale.append(level)
+    return stale, fps
+
+
+def prime_names(source, manifest, levels=('district',)):
+    """
+    Resolves the state/district spellings of every raw chunk the dataset
+    threads are about to normalize (new or changed files, missing
+    partials) before they start, so canonical names and district_key do
+    not depend on which thread meets a spelling first
+    """
+    frames = []
+    for name, spec in DATASETS.items():
+        if source == "parquet" or (source == "auto" and phase1_table(name, spec['folder'])):
+            continue
+
+        for f in sorted(glob.glob(os.path.join(RAW, spec['folder'], "*.csv"))):
+            if not stale_levels(f, spec['folder'], manifest, levels)[0]:
+                continue
+            for batch in iter_batches(f, spec['folder'], ['date', 'state', 'district']):
+                _, month = date_codes(batch['date'])
+                frames.append(batch.loc[month != MISSING, ['state', 'district']].drop_duplicates())
+
+    if frames:
+        n = get_normalizer().prime(frames)
+        print(f"[NAMES] {n:,} district spellings resolved before aggregation")
+
+
+def phase1_table(name, folder):
+    """
+    True if the phase-1 parquet for a dataset is usable for phase 2:
+    it has month codes, its names were resolved with the current alias
+    table and rules, and it is newer than every raw chunk.
+    """
+    if not storage.exists(name, PROC) or 'month' not in storage.column_names(name, PROC):
+        return False
+
+    written = load_manifest(PHASE1_MANIFEST).get(name, {}).get('names')
+    if written != get_normalizer().signature:
+        return False
+
+    raw = glob.glob(os.path.join(RAW, folder, "*.csv"))
+    path = storage.table_path(name, PROC)
+    return not raw or max(os.path.getmtime(f) for f in raw) <= os.path.getmtime(path)
+
+
+def scan_parquet(name, value_cols, rename_map=None, budget=None, levels=('district',)):
+    """
+    {level: district-month (or pincode-month) sums} from a phase-1 parquet
+    table (file or partitioned dataset): one columnar scan that projects
+    only key/month/count columns and feeds every level's accumulator
+    """
+    accs = {level: new_accumulator(value_cols, level) for level in levels}
+    columns = (PIN_KEYS if 'pincode' in levels else KEYS) + value_cols
+
+    budget = budget or MemoryBudget(default_rows=CHUNK)
+
+    if budget.max_bytes is not None:
+        budget.observe(storage.head(name, columns, base=PROC))
+
+    print(f"[SCAN] {storage.table_path(name, PROC)} ({budget.rows:,} rows per batch)")
+
+    for chunk in storage.scan_batches(name, columns, budget.rows, base=PROC):
+        if 'pincode' in chunk and not pd.api.types.is_numeric_dtype(chunk['pincode']):
+            # older phase-1 outputs stored pincode as text
+            chunk['pincode'] = pd.to_numeric(chunk['pincode'], errors='coerce')
+        chunk = chunk[chunk['month'] != MISSING]
+        for acc in accs.values():
+            acc.add(chunk)
+
+    return {level: acc.to_frame().rename(columns=rename_map or {}) for level, acc in accs.items()}
+
+
+def stream_monthly(path, value_cols, rename_map=None, manifest=None, budget=None, levels=('district',)):
+    """
+    Aggregates a raw dataset folder to {level: district-month sums}
+    (pincode-month sums for 'pincode'). Files already recorded in the
+    manifest (same size/hash) reuse their saved partial aggregates; new
+    or changed files are read once for every level they are stale in.
+    """
+    files = sorted(glob.glob(os.path.join(path, "*.csv")))
+    folder = os.path.basename(os.path.normpath(path))
+    names = {level: LEVELS[level]['prefix'] + folder for level in levels}
+
+    if len(files) == 0:
+        raise ValueError(f"No files found in {path}")
+
+    manifest = {} if manifest is None else manifest
+    budget = budget or MemoryBudget(default_rows=CHUNK)
+    seen = {level: manifest.get(name, {}) for level, name in names.items()}
+    entries = {level: {} for level in levels}
+    accs = {level: new_accumulator(value_cols, level) for level in levels}
 
     print(f"[STREAM] {path} ({len(files)} chunks)")
 
     for f in files:
-        print(f"[CHUNK] {os.path.basename(f)}")
-        for chunk in pd.read_csv(f, chunksize=CHUNK, low_memory=False):
-            # Date → month
-            chunk['date'] = pd.to_datetime(chunk['date'], format="%d-%m-%Y", errors='coerce')
-            chunk['month'] = chunk['date'].dt.to_period("M")
+        base = os.path.basename(f)
+        stale, fps = stale_levels(f, folder, manifest, levels)
 
-            # Normalize identifiers
-            chunk['state'] = chunk['state'].astype(str).str.upper().str.strip()
-            chunk['district'] = chunk['district'].astype(str).str.upper().str.strip()
-            chunk['district_key'] = chunk['state'] + "_" + chunk['district']
+        parts = {}
+        if stale:
+            print(f"[CHUNK] {base}" + (f" ({', '.join(stale)})" if len(levels) > 1 else ""))
+            if budget.max_bytes is not None and budget.row_bytes is None:
+                budget.probe(f, folder, raw_columns(value_cols, levels))
+            parts = aggregate_file(f, value_cols, budget, stale)
+        else:
+            print(f"[CACHED] {base}")
 
-            # Monthly aggregation on district
-            grouped = chunk.groupby(
-                ['district_key', 'state', 'district', 'month']
-            )[value_cols].sum()
+        for level in levels:
+            part_path = partial_path(names[level], base)
+            if level in parts:
+                os.makedirs(os.path.dirname(part_path), exist_ok=True)
+                parts[level].to_parquet(part_path, index=False)
+            else:
+                parts[level] = pd.read_parquet(part_path)
+            entries[level][base] = dict(fps[level], partial=part_path, rows=len(parts[level]))
+            accs[level].add(parts[level])
 
-            agg = grouped if agg is None else agg.add(grouped, fill_value=0)
+    for level, name in names.items():
+        # Drop partials of chunk files that no longer exist
+        for base, entry in seen[level].items():
+            if base not in entries[level] and os.path.exists(entry.get('partial', '')):
+                os.remove(entry['partial'])
+        manifest[name] = entries[level]
+
+    # Merge partial sums into district-month totals
+    return {level: acc.to_frame().rename(columns=rename_map or {}) for level, acc in accs.items()}
+
+
+def aggregate_dataset(name, source, manifest, max_memory=None, levels=('district',)):
+    """
+    {level: district-month (or pincode-month) sums} for one dataset, from
+    the phase-1 parquet when it is current (source="auto"/"parquet") or
+    from the raw chunks otherwise; all levels come from the same pass.
+    """
+    spec = DATASETS[name]
+    budget = MemoryBudget(max_memory, default_rows=CHUNK)
+
+    if source != "raw" and phase1_table(name, spec['folder']):
+        return scan_parquet(name, spec['value_cols'], spec['rename_map'], budget, levels)
+
+    if source == "parquet":
+        raise ValueError(f"No current phase-1 parquet for {name}; run phase 1 or use source='raw'")
+
+    return stream_monthly(
+        f"{RAW}/{spec['folder']}",
+        value_cols=spec['value_cols'],
+        rename_map=spec['rename_map'],
+        manifest=manifest,
+        budget=budget,
+        levels=levels
+    )
 
-    df = agg.reset_index()
 
-    if rename_map:
-        df = df.rename(columns=rename_map)
+def save_pincodes(df_demo, df_bio, df_enrol, partitioned=None):
+    """
+    Optional pincode × month table from the (district_key, pincode) sums of
+    the district pass. Pincodes and counts are int32 and rows are sorted
+    by district_key, so one district's pincodes sit in a few adjacent row
+    groups.
+    """
+    df_pin = df_demo \
+        .merge(df_bio,   on=PIN_KEYS, how='left') \
+        .merge(df_enrol, on=PIN_KEYS, how='left')
 
-    return df
+    counts = [c for c in df_pin.columns if c not in PIN_KEYS]
+    df_pin[counts] = df_pin[counts].fillna(0).astype('int32')
+    df_pin['pincode'] = df_pin['pincode'].astype('int32')
+    df_pin['month'] = df_pin['month'].astype('int32')
 
+    out_path = storage.write_table(df_pin, 'pincode_monthly', base=PROC, partitioned=partitioned)
+    print(f"[SAVED] pincodes → {out_path} "
+          f"({len(df_pin):,} rows, {df_pin['pincode'].nunique():,} pincodes)")
+    return df_pin
 
-def run_phase2():
+
+def run_phase2(source="auto", partitioned=None, max_memory=None, pincode=False):
 
     print("\n=== PHASE-2: MONTHLY AGGREGATION + MIGRATION SIGNALS ===")
+    start = time.perf_counter()
+
+    # Partials depend on name resolution too: a new alias table re-aggregates all chunks
+    normalizer = get_normalizer()
+    version = f"{PARTIAL_VERSION}:{normalizer.signature}"
+    manifest = load_manifest(MANIFEST)
+    if manifest.get('version') != version:
+        manifest = {'version': version}
 
-    # DEMOGRAPHIC (primary migration signal)
-    df_demo = stream_monthly(
-        f"{RAW}/api_data_aadhar_demographic",
-        value_cols=['demo_age_5_17','demo_age_17_'],
-        rename_map={
-            'demo_age_5_17': 'student_updates',
-            'demo_age_17_': 'adult_updates'
+    # DEMOGRAPHIC (primary migration signal), BIOMETRIC (lifecycle signal),
+    # ENROLMENT (population proxy) — aggregated concurrently, each in one
+    # pass that also fills the pincode sums when requested
+    levels = ['district', 'pincode'] if pincode else ['district']
+    prime_names(source, manifest, levels)
+    with ThreadPoolExecutor(max_workers=len(DATASETS)) as ex:
+        futures = {
+            name: ex.submit(aggregate_dataset, name, source, manifest, max_memory, levels)
+            for name in DATASETS
         }
-    )
+        sums = {name: futures[name].result() for name in DATASETS}
+    df_demo, df_bio, df_enrol = (sums[name]['district'] for name in DATASETS)
 
     df_demo['total_demo'] = df_demo['student_updates'] + df_demo['adult_updates']
     df_demo['student_ratio'] = df_demo['student_updates'] / df_demo['total_demo']
     df_demo['adult_ratio']   = df_demo['adult_updates']   / df_demo['total_demo']
 
-
-    # BIOMETRIC (lifecycle signal)
-    df_bio = stream_monthly(
-        f"{RAW}/api_data_aadhar_biometric",
-        value_cols=['bio_age_5_17','bio_age_17_'],
-        rename_map={
-            'bio_age_5_17': 'bio_student',
-            'bio_age_17_': 'bio_adult'
-        }
-    )
-
-    # ENROLMENT (population proxy)
-    df_enrol = stream_monthly(
-        f"{RAW}/api_data_aadhar_enrolment",
-        value_cols=['age_0_5','age_5_17','age_18_greater'],
-        rename_map={'age_18_greater': 'pop_adult'}
-    )
-
     # MERGE (small table, cheap)
     df_month = df_demo \
-        .merge(df_bio,   on=['district_key','state','district','month'], how='left') \
-        .merge(df_enrol, on=['district_key','state','district','month'], how='left')
+        .merge(df_bio,   on=KEYS, how='left') \
+        .merge(df_enrol, on=KEYS, how='left')
 
     # MIGRATION PROXY
     df_month['movement_index'] = df_month['total_demo'] / df_month['pop_adult'].replace(0, pd.NA)
     df_month['movement_index'] = df_month['movement_index'].fillna(df_month['total_demo'])
 
     # TIME FEATURES
-    df_month['month_num'] = df_month['month'].dt.month
-    df_month['quarter'] = df_month['month'].dt.quarter
+    df_month['month'] = df_month['month'].astype('int32')
+    df_month['month_num'] = month_num(df_month['month'])
+    df_month['quarter'] = quarter(df_month['month'])
 
     df_month['month_index'] = (
-        df_month['month'].dt.to_timestamp()
+        df_month['month']
         .rank(method="dense")
         .astype(int) - 1
     )
@@ -99,18 +331,40 @@ def run_phase2():
     df_month = df_month.sort_values(['state','district','month'])
 
     # SAVE OUTPUT
-    out_path = f"{PROC}/monthly.parquet"
-    df_month.to_parquet(out_path, index=False)
+    out_path = storage.write_table(df_month, 'monthly', base=PROC, partitioned=partitioned)
     print(f"[SAVED] → {out_path}")
 
+    if pincode:
+        save_pincodes(*(sums[name]['pincode'] for name in DATASETS), partitioned=partitioned)
+
+    save_manifest(manifest, MANIFEST)
+    normalizer.save()
+    print(f"[SAVED] manifest → {MANIFEST}")
+
     # SANITY OUTPUT
     print("\n=== SANITY ===")
-    print("Date Range:", df_month['month'].min(), "→", df_month['month'].max())
+    print("Date Range:", *month_label([df_month['month'].min()]), "→", *month_label([df_month['month'].max()]))
     print("Districts:", df_month['district_key'].nunique())
     print("States:", df_month['state'].nunique())
     print(df_month.head(10))
+    report_phase("phase-2", start)
+    MemoryBudget(max_memory).report("phase-2")
     print("\nPHASE-2 completed successfully!\n")
 
 
 if __name__ == "__main__":
-    run_phase2()
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Phase-2 monthly aggregation")
+    parser.add_argument("--source", choices=["auto", "parquet", "raw"], default="auto",
+                        help="phase-1 parquet scan, raw CSV chunks, or parquet when current (default)")
+    parser.add_argument("--partitioned", action="store_true",
+                        help="write monthly as a hive-partitioned (state) parquet dataset")
+    parser.add_argument("--max-memory", default=None,
+                        help="memory budget, e.g. 2G; batch sizes are fitted to it")
+    parser.add_argument("--pincode", action="store_true",
+                        help="also write the pincode × month table (pincode_monthly)")
+    args = parser.parse_args()
+
+    run_phase2(source=args.source, partitioned=args.partitioned or None,
+               max_memory=args.max_memory, pincode=args.pincode)
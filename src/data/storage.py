@@ -0,0 +1,276 @@
+import os
+import shutil
+import uuid
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from src import config
+
+PROC = config.PROC
+ROW_GROUP = 50_000
+
+# Write processed tables as hive-partitioned directories instead of single files
+PARTITIONED = os.environ.get("AADHAAR_PARTITIONED", "0") == "1"
+
+# Per-table layout: hive partition keys and the sort order inside each file.
+# Sorting keeps row groups narrow so min/max statistics can prune them.
+LAYOUTS = {
+    'enrolment': dict(partition_cols=['state', 'month'], sort_by=['district_key', 'date']),
+    'demographic': dict(partition_cols=['state', 'month'], sort_by=['district_key', 'date']),
+    'biometric': dict(partition_cols=['state', 'month'], sort_by=['district_key', 'date']),
+    'monthly': dict(partition_cols=['state'], sort_by=['state', 'district', 'month']),
+    # small row groups: a district lookup reads only the groups its key range covers
+    'pincode_monthly': dict(partition_cols=['state'], sort_by=['district_key', 'pincode', 'month'],
+                            row_group=10_000),
+    'clustering/district_features': dict(partition_cols=['state'], sort_by=['district_key']),
+    'features/panel': dict(partition_cols=['state'], sort_by=['district_key', 'month_index']),
+    'features/district': dict(partition_cols=['state'], sort_by=['district_key']),
+    'trajectories/district_edges': dict(partition_cols=['signal'], sort_by=['signal', 'lag', 'source', 'rank']),
+    'trajectories/pincode_edges': dict(partition_cols=['signal'], sort_by=['signal', 'lag', 'source', 'rank']),
+    'corridors/edges': dict(partition_cols=['origin_state'], sort_by=['origin', 'rank']),
+    'forecast/historical_predictions': dict(partition_cols=['state'], sort_by=['district_key', 'month_index']),
+    'forecast/future_forecast': dict(partition_cols=['state'], sort_by=['district_key']),
+    'forecast/hierarchy_forecast': dict(partition_cols=['level'], sort_by=['state', 'node']),
+    'forecast/hierarchy_history': dict(partition_cols=['level'], sort_by=['node', 'month_index']),
+}
+
+
+def table_path(name, base=PROC):
+    return os.path.join(base, f"{name}.parquet")
+
+
+def _dataset(path, infer_dictionary=False):
+    hive = ds.HivePartitioning.discover(infer_dictionary=infer_dictionary) if os.path.isdir(path) else None
+    return ds.dataset(path, format="parquet", partitioning=hive)
+
+
+def _partitions(path):
+    """
+    Hive partition keys of a dataset directory ([] for a single file)
+    """
+    if not os.path.isdir(path):
+        return []
+    return _dataset(path).partitioning.schema.names
+
+
+def exists(name, base=PROC):
+    return os.path.exists(table_path(name, base))
+
+
+def column_names(name, base=PROC):
+    """
+    Column names of a processed table without reading any data
+    """
+    return _dataset(table_path(name, base)).schema.names
+
+
+def _remove(path):
+    if os.path.isdir(path):
+        shutil.rmtree(path, ignore_errors=True)
+    elif os.path.exists(path):
+        os.remove(path)
+
+
+def _publish(tmp, path):
+    """
+    Moves a fully written table from tmp to path. A file replaces the old
+    table atomically; an existing directory (partitioned dataset, or a
+    layout switch) is moved aside first, retrying if another writer
+    publishes in between. Readers never see a partly written table.
+    """
+    old = f"{tmp}.old"
+    while True:
+        try:
+            os.replace(tmp, path)
+            break
+        except OSError:
+            if not os.path.exists(path):
+                raise
+        _remove(old)
+        try:
+            os.rename(path, old)
+        except FileNotFoundError:
+            pass
+    _remove(old)
+
+
+def write_table(df, name, base=PROC, partitioned=None):
+    """
+    Writes a processed table as one parquet file, or as a hive-partitioned
+    dataset directory (same path) when partitioned. Either way rows are
+    sorted per LAYOUTS and written in ROW_GROUP-sized groups with statistics.
+    The table is written to a temporary sibling and renamed into place, so
+    concurrent writers (e.g. two processes rebuilding the feature store)
+    each publish a complete table.
+    """
+    partitioned = PARTITIONED if partitioned is None else partitioned
+    layout = LAYOUTS.get(name, {})
+    path = table_path(name, base)
+    tmp = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+    row_group = layout.get('row_group', ROW_GROUP)
+
+    sort_by = [c for c in layout.get('sort_by', []) if c in df.columns]
+    if sort_by:
+        df = df.sort_values(sort_by)
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    partition_cols = layout.get('partition_cols') if partitioned else None
+
+    try:
+        if not partition_cols:
+            df.to_parquet(tmp, index=False, row_group_size=row_group)
+        else:
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            ds.write_dataset(
+                table, tmp,
+                format="parquet",
+                partitioning=partition_cols,
+                partitioning_flavor="hive",
+                max_rows_per_group=row_group,
+                min_rows_per_group=min(row_group, 1024),
+                existing_data_behavior="delete_matching",
+            )
+    except BaseException:
+        _remove(tmp)
+        raise
+
+    # a table may switch layouts between runs; _publish replaces either kind
+    _publish(tmp, path)
+    return path
+
+
+def writer_schema(schema):
+    """
+    Schema with every dictionary column indexed by int32: pandas picks the
+    smallest index type per batch (int8 up to 127 categories)
+    """
+    fields = [
+        f.with_type(pa.dictionary(pa.int32(), f.type.value_type)) if pa.types.is_dictionary(f.type) else f
+        for f in schema
+    ]
+    return pa.schema(fields, metadata=schema.metadata)
+
+
+class TableWriter:
+    """
+    Streams batches into a processed table without holding it in memory:
+    appends row groups to one parquet file, or adds files to a partitioned
+    dataset. Rows are only sorted within each batch. Every batch is cast to
+    the first batch's schema, with categorical (dictionary) columns widened
+    to int32 indices so later batches may have more categories.
+    """
+
+    def __init__(self, name, base=PROC, partitioned=None):
+        partitioned = PARTITIONED if partitioned is None else partitioned
+        self.layout = LAYOUTS.get(name, {})
+        self.path = table_path(name, base)
+        self.partition_cols = self.layout.get('partition_cols') if partitioned else None
+        self.schema = None
+        self._writer = None
+        self._part = 0
+
+        if os.path.isdir(self.path):
+            shutil.rmtree(self.path)
+        elif os.path.exists(self.path):
+            os.remove(self.path)
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+
+    def write(self, df):
+        sort_by = [c for c in self.layout.get('sort_by', []) if c in df.columns]
+        if sort_by:
+            df = df.sort_values(sort_by)
+
+        table = pa.Table.from_pandas(df, schema=self.schema, preserve_index=False)
+        if self.schema is None:
+            self.schema = writer_schema(table.schema)
+            table = table.cast(self.schema)
+
+        if self.partition_cols:
+            ds.write_dataset(
+                table, self.path,
+                format="parquet",
+                partitioning=self.partition_cols,
+                partitioning_flavor="hive",
+                basename_template=f"part-{self._part}-{{i}}.parquet",
+                max_rows_per_group=ROW_GROUP,
+                existing_data_behavior="overwrite_or_ignore",
+            )
+            self._part += 1
+            return
+
+        if self._writer is None:
+            self._writer = pq.ParquetWriter(self.path, self.schema)
+        self._writer.write_table(table, row_group_size=ROW_GROUP)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+        return self.path
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def read_table(name, columns=None, filters=None, base=PROC):
+    """
+    Reads a processed table (file or partitioned directory) with column
+    projection and filter pushdown, e.g. filters=[('state', '==', 'BIHAR')].
+    Partition keys come back as plain strings/ints, as in the file layout.
+    """
+    path = table_path(name, base)
+    df = pd.read_parquet(path, columns=columns, filters=filters)
+
+    for col in _partitions(path):
+        if col in df.columns and isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype(df[col].cat.categories.dtype)
+
+    return df
+
+
+def distinct(name, col, base=PROC):
+    """
+    Sorted distinct values of one column; only that column is read
+    (or just the directory names when it is a partition key).
+    """
+    path = table_path(name, base)
+
+    if col in _partitions(path):
+        part = _dataset(path, infer_dictionary=True).partitioning
+        return sorted(part.dictionaries[part.schema.names.index(col)].to_pylist())
+
+    return sorted(read_table(name, columns=[col], base=base)[col].dropna().unique())
+
+
+def district_pincodes(district_key, state=None, columns=None, base=PROC):
+    """
+    Every pincode-month row of one district from pincode_monthly. The
+    district_key row-group statistics (and the state partition, when the
+    state is given) limit the read to that district's rows.
+    """
+    filters = [('district_key', '==', district_key)]
+    if state is not None:
+        filters.insert(0, ('state', '==', state))
+    return read_table('pincode_monthly', columns=columns, filters=filters, base=base)
+
+
+def head(name, columns=None, n=10_000, base=PROC):
+    """
+    First n rows of a processed table (used to measure row sizes)
+    """
+    return _dataset(table_path(name, base)).head(n, columns=columns).to_pandas()
+
+
+def scan_batches(name, columns, batch_size, base=PROC):
+    """
+    Streams a processed table as pandas batches with only the given columns
+    """
+    dataset = _dataset(table_path(name, base))
+
+    for batch in dataset.to_batches(columns=columns, batch_size=batch_size):
+        yield batch.to_pandas()
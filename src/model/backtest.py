@@ -0,0 +1,185 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+from src import config
+from src.model.forecast import FEATURE_COLS, HORIZON, TARGETS, load_pairs, make_forecaster
+from src.utils import report_phase
+
+PROC = config.PROC
+OUT = f"{PROC}/forecast/backtest"
+MIN_TRAIN_MONTHS = 2   # months of training pairs the first fold needs
+MAPE_EPS = 1e-9        # targets this close to 0 are left out of MAPE
+
+# model configurations compared by the backtest: a forecasting backend
+# plus params over its defaults
+CONFIGS = {
+    'rf400_d12': dict(backend='rf', n_estimators=400, max_depth=12),   # phase-4 model
+    'rf100_d12': dict(backend='rf', n_estimators=100, max_depth=12),
+    'rf50_d8': dict(backend='rf', n_estimators=50, max_depth=8),
+    'hgb': dict(backend='hgb'),
+    'linear': dict(backend='linear'),
+}
+
+KEY_COLS = ['district_key', 'state', 'month_index']
+FRAME_COLS = list(dict.fromkeys(KEY_COLS + FEATURE_COLS + TARGETS))
+
+
+def walk_forward_folds(month_index, min_train_months=MIN_TRAIN_MONTHS, horizon=HORIZON):
+    """
+    Expanding-window folds as (train_end, test_month). A forecast made at
+    test_month may only train on pairs whose target (t + horizon) is
+    already observed, i.e. t <= test_month - horizon.
+    """
+    months = np.unique(month_index)
+    return [(int(m - horizon), int(m)) for m in months
+            if np.sum(months <= m - horizon) >= min_train_months]
+
+
+# ----------------------------
+# fold workers
+# ----------------------------
+
+_PAIRS = None
+
+
+def _init_worker(pairs):
+    # each worker process receives the pairs frame once, not per task
+    global _PAIRS
+    _PAIRS = pairs
+
+
+def run_fold(name, params, fold, train_end, test_month):
+    """
+    Fits one configuration (both targets) on a fold's training window and
+    predicts its test month. Returns (timing row, predictions frame).
+    """
+    train = _PAIRS[_PAIRS['month_index'] <= train_end]
+    test = _PAIRS[_PAIRS['month_index'] == test_month]
+
+    model = make_forecaster(n_jobs=1, **params)
+
+    t0 = time.perf_counter()
+    model.fit(train[FEATURE_COLS], train[TARGETS])
+    fit_s = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    pred = model.predict(test[FEATURE_COLS])
+    predict_s = time.perf_counter() - t0
+
+    row = dict(config=name, fold=fold, train_end=train_end, test_month=test_month,
+               n_train=len(train), n_test=len(test), fit_s=fit_s, predict_s=predict_s)
+    preds = pd.concat([
+        test[KEY_COLS].assign(config=name, fold=fold, target=target, y=test[target].to_numpy(), pred=pred[:, i])
+        for i, target in enumerate(TARGETS)
+    ], ignore_index=True)
+    return row, preds
+
+
+# ----------------------------
+# error tables
+# ----------------------------
+
+def error_table(preds, by):
+    """
+    RMSE, MAE and MAPE (%) of backtest predictions per group
+    """
+    err = preds['pred'] - preds['y']
+    ape = (err.abs() / preds['y'].abs()).where(preds['y'].abs() > MAPE_EPS)
+
+    out = (preds.assign(se=err ** 2, ae=err.abs(), ape=ape * 100)
+           .groupby(by, observed=True)
+           .agg(n=('se', 'size'), mse=('se', 'mean'), mae=('ae', 'mean'), mape=('ape', 'mean'))
+           .reset_index())
+    out.insert(len(by) + 1, 'rmse', np.sqrt(out.pop('mse')))
+    return out
+
+
+def backtest(pairs, configs=CONFIGS, min_train_months=MIN_TRAIN_MONTHS, workers=None):
+    """
+    Walk-forward backtest of every configuration; (config, fold) tasks run
+    in parallel processes. Returns (fold timings, predictions).
+    """
+    folds = walk_forward_folds(pairs['month_index'], min_train_months)
+    if not folds:
+        raise ValueError(f"Not enough months for a walk-forward fold "
+                         f"(need {min_train_months} training months + {HORIZON}-month horizon)")
+
+    pairs = pairs[FRAME_COLS].reset_index(drop=True)
+    tasks = [(name, params, i, train_end, test_month)
+             for name, params in configs.items()
+             for i, (train_end, test_month) in enumerate(folds)]
+    workers = workers or os.cpu_count() or 1
+
+    print(f"[BACKTEST] {len(configs)} configs × {len(folds)} folds on {workers} workers")
+    if workers == 1:
+        _init_worker(pairs)
+        results = [run_fold(*task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(pairs,)) as pool:
+            futures = [pool.submit(run_fold, *task) for task in tasks]
+            results = [f.result() for f in as_completed(futures)]
+
+    timings = pd.DataFrame([row for row, _ in results])
+    preds = pd.concat([p for _, p in results], ignore_index=True)
+    return timings.sort_values(['config', 'fold']).reset_index(drop=True), preds
+
+
+def summarize(timings, preds):
+    """
+    Per-configuration accuracy against training/prediction cost
+    """
+    cost = (timings.groupby('config')
+            .agg(folds=('fold', 'nunique'), fit_s=('fit_s', 'sum'), predict_s=('predict_s', 'sum'))
+            .reset_index())
+    out = error_table(preds, ['config', 'target']).merge(cost, on='config')
+    return out.sort_values(['target', 'rmse']).reset_index(drop=True)
+
+
+def run_backtest(configs=CONFIGS, min_train_months=MIN_TRAIN_MONTHS, workers=None, partitioned=None):
+    print("\n=== PHASE-4 BACKTEST (WALK-FORWARD, EXPANDING WINDOW) ===")
+    start = time.perf_counter()
+
+    pairs = load_pairs(partitioned)
+    timings, preds = backtest(pairs, configs, min_train_months, workers)
+
+    folds = error_table(preds, ['config', 'target', 'fold']).merge(
+        timings.drop(columns='n_test'), on=['config', 'fold'])
+    tables = {
+        'folds': folds,
+        'states': error_table(preds, ['config', 'target', 'state']),
+        'districts': error_table(preds, ['config', 'target', 'district_key', 'state']),
+        'summary': summarize(timings, preds),
+    }
+
+    os.makedirs(OUT, exist_ok=True)
+    for name, table in tables.items():
+        table.to_parquet(f"{OUT}/{name}.parquet", index=False)
+    print(f"[SAVED] backtest tables ({', '.join(tables)}) → {OUT}")
+
+    with pd.option_context('display.width', 160, 'display.max_columns', 20):
+        print(tables['summary'])
+    report_phase("backtest", start)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Walk-forward backtest of the phase-4 forecaster")
+    parser.add_argument("--configs", nargs="+", default=list(CONFIGS),
+                        help=f"model configurations to compare (default: all of {', '.join(CONFIGS)})")
+    parser.add_argument("--min-train-months", type=int, default=MIN_TRAIN_MONTHS)
+    parser.add_argument("--workers", type=int, default=None, help="fold processes (default: CPU count)")
+    parser.add_argument("--partitioned", action="store_true",
+                        help="read/rebuild the feature store as hive-partitioned datasets")
+    args = parser.parse_args()
+
+    unknown = sorted(set(args.configs) - set(CONFIGS))
+    if unknown:
+        parser.error(f"unknown configs: {', '.join(unknown)} (choose from {', '.join(CONFIGS)})")
+
+    run_backtest(configs={c: CONFIGS[c] for c in args.configs}, min_train_months=args.min_train_months,
+                 workers=args.workers, partitioned=args.partitioned or None)
@@ -1,27 +1,156 @@
 import os
+import time
+
+import numpy as np
 import pandas as pd
 from sklearn.cluster import KMeans
 
-from .feature_engineering import engineer_features
 from .utils_filters import filter_features
 from .utils_pca import compute_pca
-from .utils_labels import semantic_label
-
-PROC = "Dataset/processed"
+from .utils_labels import label_clusters
+from .utils_sweep import KS, sweep_kmeans
+from src import config
+from src.data import storage
+from src.model import registry
+from src.model.feature_store import DISTRICT, load_features
+from src.model.neighbors import NeighborIndex
+from src.utils import report_phase
+
+PROC = config.PROC
 OUT = f"{PROC}/clustering"
+ASSIGNMENTS = f"{OUT}/assignments.parquet"   # per-district feature hash, cluster and PCA coords
+MODEL = "clustering"
 
+DRIFT_THRESHOLD = 0.5   # centroid shift, in units of the cluster's training RMS radius
+
+
+def row_hashes(feats, feature_cols):
+    return pd.util.hash_pandas_object(feats[feature_cols], index=False).to_numpy()
+
+
+def cluster_space(X, scaler, space):
+    """
+    Matrix KMeans was fitted on: raw features (k=4 mode) or standardized (sweep)
+    """
+    return scaler.transform(X) if space == 'scaled' else X.to_numpy(dtype=np.float64)
 
-def run_phase3():
-    print("\n=== PHASE-3: CLUSTERING & ARCHETYPES ===")
 
-    # Load monthly table
-    df_month = pd.read_parquet(f"{PROC}/monthly.parquet")
+def cluster_spread(Z, labels, centers):
+    """
+    RMS distance of members to their centroid, per cluster
+    """
+    d2 = ((Z - centers[labels]) ** 2).sum(axis=1)
+    sums = np.bincount(labels, weights=d2, minlength=len(centers))
+    counts = np.bincount(labels, minlength=len(centers)).clip(1)
+    return np.sqrt(sums / counts)
 
-    # Feature Engineering (district-level)
-    feats = engineer_features(df_month)
+
+def centroid_drift(Z, labels, centers, spread):
+    """
+    Largest shift of a cluster's current member mean from its fitted
+    centroid, relative to the cluster's training radius (inf if a cluster
+    lost all members)
+    """
+    drift = np.zeros(len(centers))
+    for c in range(len(centers)):
+        members = Z[labels == c]
+        if len(members) == 0:
+            return float('inf')
+        drift[c] = np.linalg.norm(members.mean(axis=0) - centers[c]) / max(spread[c], 1e-12)
+    return float(drift.max())
+
+
+def fit_clusters(feats, feature_cols, sweep=False, ks=KS):
+    """
+    Full fit: scaler + PCA embedding + KMeans, labels from centroid
+    characteristics. Returns (model artifacts, meta, embedding).
+    """
+    # PCA Embedding (2D)
+    emb, scaler, pca = compute_pca(feats, feature_cols)
+
+    # Clustering: fixed k=4, or a parallel (k, seed) sweep on standardized
+    # features scored by sampled silhouette + Davies-Bouldin
+    if sweep:
+        space = 'scaled'
+        kmeans, scores = sweep_kmeans(scaler.transform(feats[feature_cols]), ks=ks)
+        scores.to_parquet(f"{OUT}/sweep_scores.parquet", index=False)
+        best = scores[scores['selected']].iloc[0]
+        print(f"[SWEEP] {len(scores)} fits → k={best['k']} (seed {best['seed']}, "
+              f"silhouette {best['silhouette']:.3f}, Davies-Bouldin {best['davies_bouldin']:.3f})")
+    else:
+        space = 'raw'
+        kmeans = KMeans(n_clusters=4, random_state=42, n_init='auto')
+        kmeans.fit(cluster_space(feats[feature_cols], scaler, space))
+
+    feats['cluster'] = kmeans.labels_
+
+    # Semantic labeling from centroid characteristics (stable across refits)
+    labels = label_clusters(feats, feature_cols)
+
+    Z = cluster_space(feats[feature_cols], scaler, space)
+    spread = cluster_spread(Z, kmeans.labels_, kmeans.cluster_centers_)
+
+    artifacts = dict(scaler=scaler, pca=pca, kmeans=kmeans, spread=spread)
+    meta = dict(
+        feature_cols=feature_cols,
+        space=space,
+        k=int(kmeans.n_clusters),
+        labels={str(c): name for c, name in labels.items()},
+        n_districts=len(feats),
+    )
+    return artifacts, meta, emb
+
+
+def assign_incremental(feats, feature_cols, artifacts, meta):
+    """
+    Re-uses the previous assignment of districts whose features did not
+    change; only new or changed districts are projected into the saved
+    PCA space and assigned to the saved centroids.
+
+    The hashed features summarize each district's whole history, so a new
+    month changes every district and all of them are re-assigned: the
+    mode saves the refit (scaler, PCA, KMeans or the k sweep), not
+    per-district work. Districts are skipped only when a rerun leaves
+    their history untouched (e.g. a revised chunk for a few districts).
+    Returns (embedding, number of changed districts, centroid drift).
+    """
+    prev = pd.read_parquet(ASSIGNMENTS).set_index('district_key')
+    keys = feats['district_key'].astype(str)
+    hashes = row_hashes(feats, feature_cols)
+
+    old_hash = prev['row_hash'].reindex(keys).to_numpy()
+    changed = np.asarray(pd.isna(old_hash) | (old_hash != hashes), dtype=bool)
+
+    emb = pd.DataFrame({
+        'pca_1': prev['pca_1'].reindex(keys).to_numpy(),
+        'pca_2': prev['pca_2'].reindex(keys).to_numpy(),
+    })
+    cluster = prev['cluster'].reindex(keys).to_numpy(dtype=np.float64, copy=True)
+
+    scaler, pca, kmeans = artifacts['scaler'], artifacts['pca'], artifacts['kmeans']
+
+    if changed.any():
+        X = feats.loc[changed, feature_cols]
+        emb.loc[changed, ['pca_1', 'pca_2']] = pca.transform(scaler.transform(X))
+        cluster[changed] = kmeans.predict(cluster_space(X, scaler, meta['space']))
+
+    emb['district_key'] = feats['district_key'].to_numpy()
+    feats['cluster'] = cluster.astype(np.int32)
+
+    Z = cluster_space(feats[feature_cols], scaler, meta['space'])
+    drift = centroid_drift(Z, feats['cluster'].to_numpy(), kmeans.cluster_centers_, artifacts['spread'])
+    return emb, int(changed.sum()), drift
+
+
+def run_phase3(partitioned=None, sweep=False, ks=KS, incremental=False):
+    print("\n=== PHASE-3: CLUSTERING & ARCHETYPES ===")
+    start = time.perf_counter()
+
+    # District-level features from the feature store (built from monthly)
+    feats = load_features(DISTRICT, partitioned=partitioned)
 
     # Balanced Filters applied on features
-    feats = filter_features(feats)
+    feats = filter_features(feats).reset_index(drop=True)
 
     # Feature cols for clustering
     feature_cols = [c for c in feats.columns if c.startswith(('mean','std','slope'))]
@@ -30,27 +159,54 @@ def run_phase3():
     # NaN fix for PCA & clustering
     feats[feature_cols] = feats[feature_cols].fillna(0)
 
-    # PCA Embedding (2D)
-    emb, scaler, pca = compute_pca(feats, feature_cols)
+    # Ensure output dir exists
+    os.makedirs(OUT, exist_ok=True)
+
+    # Incremental refresh: assign changed districts to the saved model,
+    # unless the feature schema changed or the centroids drifted too far
+    artifacts, meta = registry.load_model(MODEL) if incremental else (None, None)
+
+    if artifacts is not None and (meta['feature_cols'] != feature_cols or not os.path.exists(ASSIGNMENTS)):
+        print("[INCREMENTAL] feature schema or assignments changed → full refit")
+        artifacts = None
 
-    # Clustering
-    kmeans = KMeans(n_clusters=4, random_state=42, n_init='auto')
-    feats['cluster'] = kmeans.fit_predict(feats[feature_cols])
+    if artifacts is not None:
+        emb, n_changed, drift = assign_incremental(feats, feature_cols, artifacts, meta)
+        print(f"[INCREMENTAL] model v{meta['version']}: {n_changed:,} of {len(feats):,} districts "
+              f"re-assigned, centroid drift {drift:.2f}")
+        if drift > DRIFT_THRESHOLD:
+            print(f"[DRIFT] drift {drift:.2f} > {DRIFT_THRESHOLD} → full refit")
+            artifacts = None
 
-    # Semantic labeling
-    feats['cluster_label'] = feats['cluster'].apply(semantic_label)
+    if artifacts is None:
+        artifacts, meta, emb = fit_clusters(feats, feature_cols, sweep, ks)
+        meta['version'] = registry.save_model(MODEL, artifacts, meta)
+        print(f"[SAVED] {MODEL} model v{meta['version']} → {registry.model_dir(MODEL)}")
+
+    labels = {int(c): name for c, name in meta['labels'].items()}
+    feats['cluster_label'] = feats['cluster'].map(labels)
 
     # Build hierarchy (State → Cluster → District)
     hierarchy = feats.groupby(['state','cluster_label'])['district'].apply(list).reset_index()
 
-    # Ensure output dir exists
-    os.makedirs(OUT, exist_ok=True)
-
     # Save outputs
-    feats.to_parquet(f"{OUT}/district_features.parquet", index=False)
+    storage.write_table(feats, 'clustering/district_features', base=PROC, partitioned=partitioned)
     emb.to_parquet(f"{OUT}/pca_embedding.parquet", index=False)
     hierarchy.to_parquet(f"{OUT}/hierarchy.parquet", index=False)
 
+    pd.DataFrame({
+        'district_key': feats['district_key'].astype(str),
+        'row_hash': row_hashes(feats, feature_cols),
+        'cluster': feats['cluster'].to_numpy(),
+        'pca_1': emb['pca_1'].to_numpy(),
+        'pca_2': emb['pca_2'].to_numpy(),
+    }).to_parquet(ASSIGNMENTS, index=False)
+
+    # "Similar districts" index over the standardized features
+    index_path = NeighborIndex.build(feats, feature_cols, artifacts['scaler']).save()
+    print(f"[SAVED] neighbour index → {index_path}")
+
+    report_phase("phase-3", start)
     print("\n=== PHASE-3 COMPLETED ===")
     print("[INFO] Districts:", len(feats))
     print("[INFO] States:", feats['state'].nunique())
@@ -59,4 +215,18 @@ def run_phase3():
 
 
 if __name__ == "__main__":
-    run_phase3()
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Phase-3 clustering & archetypes")
+    parser.add_argument("--partitioned", action="store_true",
+                        help="write outputs as hive-partitioned (state) parquet datasets")
+    parser.add_argument("--sweep", action="store_true",
+                        help="choose k by a parallel KMeans sweep instead of k=4")
+    parser.add_argument("--ks", type=int, nargs="+", default=list(KS),
+                        help="cluster counts tried by --sweep (default: 2-8)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="assign districts to the saved model instead of refitting; refit only on drift")
+    args = parser.parse_args()
+
+    run_phase3(partitioned=args.partitioned or None, sweep=args.sweep, ks=args.ks,
+               incremental=args.incremental)
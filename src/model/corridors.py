@@ -0,0 +1,217 @@
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from src import config
+from src.data import storage
+from src.data.normalize import get_normalizer
+from src.model.trajectories import blocked_topk, pivot_panel, znorm
+from src.utils import report_phase
+
+PROC = config.PROC
+EDGES = 'corridors/edges'
+ADJACENCY = os.path.join(os.path.dirname(__file__), "..", "data", "state_adjacency.csv")
+
+SIGNAL = 'total_demo'     # demographic updates (address/contact changes)
+LAGS = (1, 2, 3)          # origin change at t vs destination change at t + lag
+TOP_K = 10                # destinations kept per origin, lag and kind
+MIN_CORR = 0.5            # weaker lagged correlations are not corridors
+SURGE_Z = 1.5             # a destination needs one month this far above its mean change
+MIN_MONTHS = 4
+
+# origin movement paired with a destination surge: a surge that moves on
+# (positive corr) or an origin drop mirrored by the destination (negative)
+KINDS = {'surge': 1.0, 'drop': -1.0}
+
+
+def update_changes(M):
+    """
+    Month-over-month change of log(1 + updates); surges and drops are
+    large positive/negative values regardless of district size
+    """
+    return np.diff(np.log1p(M), axis=1)
+
+
+def surge_candidates(D, surge_z=SURGE_Z, min_months=MIN_MONTHS):
+    """
+    Districts with at least one update surge (z-scored change >= surge_z);
+    only these can be corridor destinations
+    """
+    Z, valid = znorm(D, min_months)
+    return valid & (Z.max(axis=1) >= surge_z)
+
+
+def load_adjacency(path=ADJACENCY):
+    """
+    Undirected land borders between canonical state names, as a set of
+    (state_a, state_b) pairs in both directions
+    """
+    adj = pd.read_csv(path)
+    pairs = set(zip(adj['state_a'], adj['state_b']))
+    return pairs | {(b, a) for a, b in pairs}
+
+
+def pair_filter(states_a, states_b, adjacent_only=False, adjacency=None):
+    """
+    allowed(rows) mask for blocked_topk: origin and destination in
+    different states and, with adjacent_only, states sharing a border.
+    Works on state codes, so each block costs one table lookup.
+    """
+    codes, uniques = pd.factorize(pd.concat([pd.Series(states_a), pd.Series(states_b)], ignore_index=True))
+    code_a, code_b = codes[:len(states_a)], codes[len(states_a):]
+
+    ok = ~np.eye(len(uniques), dtype=bool)
+    if adjacent_only:
+        adjacency = load_adjacency() if adjacency is None else adjacency
+        ok &= np.array([[(a, b) in adjacency for b in uniques] for a in uniques], dtype=bool)
+
+    return lambda rows: ok[code_a[rows][:, None], code_b[None, :]]
+
+
+def corridor_edges(keys, states, M, k=TOP_K, lags=LAGS, min_corr=MIN_CORR,
+                   adjacent_only=False, min_months=MIN_MONTHS):
+    """
+    Sparse origin → destination corridors: for each origin, the top-k
+    surge-candidate destinations in other states whose update changes
+    follow the origin's by `lag` months (blocked top-k, no pairwise loop)
+    """
+    D = update_changes(M)
+    T = D.shape[1]
+    dest = np.flatnonzero(surge_candidates(D, min_months=min_months))
+    allowed = pair_filter(states, states[dest], adjacent_only)
+
+    # observed-month mask, so pairs with gaps correlate over shared months
+    O = (~np.isnan(D)).astype(np.float64) if np.isnan(D).any() else None
+
+    tables = []
+    for lag in lags:
+        if T - lag < min_months:
+            continue
+        Za, va = znorm(D[:, :T - lag], min_months)
+        Zb, vb = znorm(D[dest, lag:], min_months)
+        Oa, Ob = (None, None) if O is None else (O[:, :T - lag], O[dest, lag:])
+
+        for kind, sign in KINDS.items():
+            parts = list(blocked_topk(sign * Za, Zb, k, va, vb, allowed=allowed, exclude_self=False,
+                                      Oa=Oa, Ob=Ob, min_months=min_months))
+            if not parts:
+                continue
+            src = np.concatenate([p[0] for p in parts])
+            dst = dest[np.concatenate([p[1] for p in parts])]
+            corr = np.concatenate([p[2] for p in parts])
+
+            keep = corr >= min_corr
+            tables.append(pd.DataFrame({
+                'origin': keys.take(src[keep]),
+                'destination': keys.take(dst[keep]),
+                'origin_state': states[src[keep]],
+                'destination_state': states[dst[keep]],
+                'lag': np.int16(lag),
+                'kind': kind,
+                'corr': (sign * corr[keep]).astype(np.float32),
+                'strength': corr[keep].astype(np.float32),
+            }))
+
+    cols = ['origin', 'destination', 'origin_state', 'destination_state', 'lag', 'kind', 'corr', 'strength']
+    if not tables:
+        return pd.DataFrame(columns=cols + ['rank'])
+
+    # one edge per (origin, destination): its strongest lag/kind
+    edges = pd.concat(tables, ignore_index=True)
+    edges = (edges.sort_values(['origin', 'strength'], ascending=[True, False], kind='stable')
+             .drop_duplicates(['origin', 'destination']))
+    edges['rank'] = edges.groupby('origin').cumcount().add(1).astype(np.int16)
+    return edges[edges['rank'] <= k].reset_index(drop=True)
+
+
+def state_corridors(edges):
+    """
+    Ranked state → state view: number of district corridors and their
+    mean strength per state pair
+    """
+    out = (edges.groupby(['origin_state', 'destination_state'], observed=True)
+           .agg(corridors=('strength', 'size'), mean_strength=('strength', 'mean'),
+                origins=('origin', 'nunique'), destinations=('destination', 'nunique'))
+           .reset_index())
+    return out.sort_values(['corridors', 'mean_strength'], ascending=False).reset_index(drop=True)
+
+
+# ----------------------------
+# query API
+# ----------------------------
+
+def load_corridors(filters=None):
+    return storage.read_table(EDGES, filters=filters, base=PROC)
+
+
+def corridors_from(district_key, k=TOP_K):
+    """
+    Strongest destinations of one origin district
+    """
+    edges = load_corridors([('origin', '==', str(district_key))])
+    return edges.sort_values('rank').head(k).reset_index(drop=True)
+
+
+def corridors_to(district_key, k=TOP_K):
+    """
+    Strongest origins feeding one destination district
+    """
+    edges = load_corridors([('destination', '==', str(district_key))])
+    return edges.sort_values('strength', ascending=False).head(k).reset_index(drop=True)
+
+
+def top_corridors(n=20, origin_state=None, destination_state=None):
+    """
+    Ranked district corridors, optionally between given states
+    """
+    filters = []
+    if origin_state is not None:
+        filters.append(('origin_state', '==', origin_state))
+    if destination_state is not None:
+        filters.append(('destination_state', '==', destination_state))
+    edges = load_corridors(filters or None)
+    return edges.sort_values('strength', ascending=False).head(n).reset_index(drop=True)
+
+
+def run_corridors(k=TOP_K, lags=LAGS, min_corr=MIN_CORR, adjacent_only=False, partitioned=None):
+    print("\n=== MIGRATION CORRIDORS (LAGGED UPDATE CORRELATION) ===")
+    start = time.perf_counter()
+
+    df = storage.read_table('monthly', columns=['district_key', 'state', 'month', SIGNAL], base=PROC)
+    keys, M = pivot_panel(df, 'district_key', SIGNAL)
+
+    # canonical state per district (the adjacency table uses canonical names)
+    norm = get_normalizer()
+    first = df.drop_duplicates('district_key')
+    state_of = pd.Series(first['state'].astype(str).to_numpy(), index=first['district_key'].astype(str))
+    states = np.array([norm.state(s) for s in state_of.reindex(keys)], dtype=object)
+
+    edges = corridor_edges(keys, states, M, k=k, lags=lags, min_corr=min_corr, adjacent_only=adjacent_only)
+    print(f"[CORRIDORS] {len(keys):,} districts × {M.shape[1]} months, lags {list(lags)} "
+          f"→ {len(edges):,} edges between {edges['origin_state'].nunique()} origin states")
+
+    out_path = storage.write_table(edges, EDGES, base=PROC, partitioned=partitioned)
+    print(f"[SAVED] corridor edges → {out_path}")
+
+    print(state_corridors(edges).head(10))
+    report_phase("corridors", start)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Inter-district migration corridors from lagged update changes")
+    parser.add_argument("--k", type=int, default=TOP_K, help="destinations kept per origin")
+    parser.add_argument("--lags", type=int, nargs="+", default=list(LAGS),
+                        help="month lags: origin change at t vs destination at t + lag")
+    parser.add_argument("--min-corr", type=float, default=MIN_CORR)
+    parser.add_argument("--adjacent-only", action="store_true",
+                        help="only corridors between states sharing a border")
+    parser.add_argument("--partitioned", action="store_true",
+                        help="write edges as a hive-partitioned (origin_state) dataset")
+    args = parser.parse_args()
+
+    run_corridors(k=args.k, lags=args.lags, min_corr=args.min_corr, adjacent_only=args.adjacent_only,
+                  partitioned=args.partitioned or None)
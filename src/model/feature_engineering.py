@@ -1,5 +1,5 @@
 import pandas as pd
-from src.model.utils_trends import compute_slope
+from src.model.utils_trends import grouped_ols
 
 
 def engineer_features(month_df):
@@ -21,10 +21,9 @@ def engineer_features(month_df):
         district=('district','first')
     )
 
-    # TREND FEATURES
-    slope_student = compute_slope(month_df, 'district_key', 'month_index', 'student_ratio', 'slope_student_ratio')
-    slope_mov = compute_slope(month_df, 'district_key', 'month_index', 'movement_index', 'slope_movement_index')
-
-    feats = feats.join(slope_student).join(slope_mov)
+    # TREND FEATURES (one grouped least-squares pass for both signals)
+    trends = grouped_ols(month_df, 'district_key', 'month_index', ['student_ratio', 'movement_index'])
+    feats['slope_student_ratio'] = trends['student_ratio_slope'].fillna(0)
+    feats['slope_movement_index'] = trends['movement_index_slope'].fillna(0)
 
     return feats.reset_index()
@@ -0,0 +1,143 @@
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from src import config
+from src.data import storage
+from src.model.feature_engineering import engineer_features
+from src.utils import report_phase
+
+PROC = config.PROC
+
+PANEL = 'features/panel'          # district × month rows with lag/rolling/EWMA/delta columns
+DISTRICT = 'features/district'    # one row per district (means, stds, trend slopes)
+
+# signal columns of monthly.parquet that get time-series features
+SIGNALS = [
+    'movement_index', 'student_ratio', 'adult_ratio', 'total_demo',
+    'bio_student', 'bio_adult', 'pop_adult',
+]
+
+LAGS = (1, 2, 3)              # months back
+WINDOWS = (3, 6)              # trailing windows (months) for mean/std/min/max
+SPANS = (3,)                  # EWMA spans (months)
+ROLL_STATS = ('mean', 'std', 'min', 'max')
+
+
+def feature_names(signals=SIGNALS, lags=LAGS, windows=WINDOWS, spans=SPANS, deltas=True):
+    """
+    Column names build_panel_features adds, in output order
+    """
+    names = []
+    for s in signals:
+        names += [f"{s}_lag{k}" for k in lags]
+        names += [f"{s}_roll{w}_{stat}" for w in windows for stat in ROLL_STATS]
+        names += [f"{s}_ewm{span}" for span in spans]
+        if deltas:
+            names.append(f"{s}_delta")
+    return names
+
+
+def build_panel_features(df, signals=SIGNALS, lags=LAGS, windows=WINDOWS, spans=SPANS, deltas=True):
+    """
+    Lags, trailing rolling mean/std/min/max, EWMAs and month-over-month
+    deltas for every signal column, per district.
+
+    Rows are laid on a complete district × month_index grid, so a missing
+    month counts as a gap (NaN) rather than shifting the series. Each
+    district block starts with NaN padding at least as long as the longest
+    lag/window, so shifts, rolling windows and diffs run once over the whole
+    grid without crossing into the previous district; only the EWMA (which
+    has unbounded memory) needs a groupby.
+    """
+    keys, districts = pd.factorize(df['district_key'].astype(str))
+    t = df['month_index'].to_numpy(dtype=np.int64)
+    pad = max(max(lags, default=1), max(windows, default=1) - 1, 1)
+    block = int(t.max()) + 1 + pad
+    pos = keys * block + pad + t
+
+    grid = np.full((len(districts) * block, len(signals)), np.nan)
+    grid[pos] = df[signals].to_numpy(dtype=np.float64)
+    panel = pd.DataFrame(grid, columns=signals)
+    parts = {}
+
+    for k in lags:
+        parts[f"lag{k}"] = panel.shift(k)
+
+    for w in windows:
+        rolling = panel.rolling(w, min_periods=1)
+        for stat in ROLL_STATS:
+            parts[f"roll{w}_{stat}"] = getattr(rolling, stat)()
+
+    if spans:
+        g = panel.groupby(np.repeat(np.arange(len(districts)), block), sort=False)
+        for span in spans:
+            ewm = g.ewm(span=span).mean()
+            parts[f"ewm{span}"] = ewm.reset_index(level=0, drop=True).sort_index()
+
+    if deltas:
+        parts["delta"] = panel.diff()
+
+    # back to the observed rows, in the input order
+    cols = {}
+    for s in signals:
+        for suffix, frame in parts.items():
+            cols[f"{s}_{suffix}"] = frame[s].to_numpy()[pos]
+
+    feats = pd.DataFrame(cols, index=df.index)
+    return pd.concat([df, feats[feature_names(signals, lags, windows, spans, deltas)]], axis=1)
+
+
+def is_current(name):
+    """
+    True if a feature-store table exists and is newer than monthly
+    """
+    if not storage.exists(name, PROC):
+        return False
+    if not storage.exists('monthly', PROC):
+        return True
+    return os.path.getmtime(storage.table_path(name, PROC)) >= \
+        os.path.getmtime(storage.table_path('monthly', PROC))
+
+
+def load_features(name, columns=None, partitioned=None):
+    """
+    Reads a feature-store table, rebuilding the store first when it is
+    missing or older than monthly.parquet. Concurrent rebuilds are safe:
+    each table is written aside and renamed into place (storage.write_table).
+    """
+    if not is_current(name):
+        run_feature_store(partitioned)
+    return storage.read_table(name, columns=columns, base=PROC)
+
+
+def run_feature_store(partitioned=None):
+    print("\n=== FEATURE STORE: LAGS, ROLLING, EWMA & TRENDS ===")
+    start = time.perf_counter()
+
+    df_month = storage.read_table('monthly', base=PROC)
+
+    # District × month panel features (phase 4)
+    panel = build_panel_features(df_month)
+    out_panel = storage.write_table(panel, PANEL, base=PROC, partitioned=partitioned)
+
+    # District-level structure, volatility and trend features (phase 3)
+    feats = engineer_features(df_month)
+    out_district = storage.write_table(feats, DISTRICT, base=PROC, partitioned=partitioned)
+
+    print(f"[SAVED] panel → {out_panel} ({len(panel):,} rows, {len(feature_names())} feature columns)")
+    print(f"[SAVED] district → {out_district} ({len(feats):,} districts)")
+    report_phase("feature-store", start)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Feature store for phases 3 and 4")
+    parser.add_argument("--partitioned", action="store_true",
+                        help="write tables as hive-partitioned (state) parquet datasets")
+    args = parser.parse_args()
+
+    run_feature_store(partitioned=args.partitioned or None)
@@ -1,125 +1,444 @@
 import os
+import time
+
+import numpy as np
 import pandas as pd
-from sklearn.ensemble import RandomForestRegressor
+from joblib import Parallel, delayed
+from sklearn.base import BaseEstimator, TransformerMixin
+from sklearn.compose import TransformedTargetRegressor
+from sklearn.ensemble import HistGradientBoostingRegressor, RandomForestRegressor
+from sklearn.impute import SimpleImputer
+from sklearn.linear_model import Ridge
 from sklearn.metrics import mean_squared_error
+from sklearn.multioutput import MultiOutputRegressor
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import StandardScaler
+
+from src import config
+from src.data import storage
+from src.model import hierarchy, registry
+from src.model.feature_store import PANEL, feature_names, load_features
+from src.utils import report_phase
 
-PROC = "Dataset/processed"
+PROC = config.PROC
 OUT = f"{PROC}/forecast"
+MODEL = "forecast"
 HORIZON = 3   # predict 3 months ahead
+HORIZONS = (1, 2, 3, 4, 5, 6)   # multi-horizon outlook (HORIZON is always included)
+TARGETS = ['movement_target', 'student_target']
+STRATEGIES = ['separate', 'direct']
+
+RF_PARAMS = dict(n_estimators=400, max_depth=12, min_samples_split=5)
+HGB_PARAMS = dict(max_iter=300, learning_rate=0.05, max_leaf_nodes=31)
+RIDGE_PARAMS = dict(alpha=1.0)
+
+INTERVAL = 0.8          # central prediction interval saved with the forecasts (10th-90th pct)
+BLOCK_ROWS = 512        # rows per block when gathering leaf training targets for the quantiles
+
+# current-month values plus lag/rolling/EWMA/delta history of the two targets
+FEATURE_COLS = [
+    'movement_index',
+    'student_ratio',
+    'bio_student',
+    'bio_adult',
+    'total_demo',
+    'pop_adult',
+    'month_index',
+    'quarter'
+] + feature_names(['movement_index', 'student_ratio'])
 
 
 # ============================
 # SUPERVISED LEARNING TRANSFORM
 # ============================
 
+def target_names(h):
+    return [f"movement_target_{h}m", f"student_target_{h}m"]
+
+
+def add_horizon_targets(df, horizons):
+    """
+    Sorts the panel by district and month and adds movement/student
+    targets y_(t+h) for every horizon. Each horizon is one positional
+    shift of the sorted values, masked where it crosses into the next
+    district (same result as a grouped shift(-h), without a groupby).
+    """
+    df = df.sort_values(['district_key', 'month_index']).reset_index(drop=True)
+    codes = pd.factorize(df['district_key'])[0]
+    values = df[['movement_index', 'student_ratio']].to_numpy(dtype=np.float64)
+    n = len(df)
+
+    for h in horizons:
+        shifted = np.full((n, 2), np.nan)
+        same = codes[h:] == codes[:n - h]
+        shifted[:n - h][same] = values[h:][same]
+        df[target_names(h)] = shifted
+    return df
+
+
 def create_forecast_pairs(df):
     """
     Convert monthly panel to supervised dataset:
     X_t  ->  y_(t+HORIZON)
     """
-    df = df.sort_values(['district_key', 'month_index'])
-
-    df['movement_target'] = df.groupby('district_key')['movement_index'].shift(-HORIZON)
-    df['student_target'] = df.groupby('district_key')['student_ratio'].shift(-HORIZON)
+    df = add_horizon_targets(df, [HORIZON])
+    df = df.rename(columns=dict(zip(target_names(HORIZON), TARGETS)))
 
     # remove last horizon months
     df = df.dropna(subset=['movement_target','student_target'])
     return df
 
 
+def load_panel(partitioned=None):
+    """
+    Feature-store panel restricted to the forecasting features
+    """
+    df = load_features(PANEL, partitioned=partitioned)
+    return df.drop(columns=[c for c in feature_names() if c not in FEATURE_COLS])
+
+
+def load_pairs(partitioned=None):
+    """
+    Supervised (X_t, y_t+HORIZON) frame from the feature-store panel
+    """
+    return create_forecast_pairs(load_panel(partitioned))
+
+
+def make_forest(n_jobs=-1, **params):
+    return RandomForestRegressor(**{**RF_PARAMS, **params}, n_jobs=n_jobs, random_state=42)
+
+
 # ============================
-# MAIN PIPELINE
+# FORECASTING BACKENDS
 # ============================
+# Each backend is one estimator fitted on both TARGETS at once (y is n × 2).
 
-def run_phase4():
-    print("\n=== PHASE-4: DISTRICT FORECASTING (RandomForest, +3 month) ===")
+class DropEmptyColumns(TransformerMixin, BaseEstimator):
+    """
+    Drops features with no observed value at fit time (e.g. lag3 when the
+    training window spans two months); other NaNs pass through
+    """
 
-    df = pd.read_parquet(f"{PROC}/monthly.parquet")
+    def fit(self, X, y=None):
+        self.keep_ = ~np.isnan(np.asarray(X, dtype=np.float64)).all(axis=0)
+        return self
 
-    # build supervised pair
-    df = create_forecast_pairs(df)
+    def transform(self, X):
+        return np.asarray(X, dtype=np.float64)[:, self.keep_]
 
-    # features for X(t)
-    feature_cols = [
-        'movement_index',
-        'student_ratio',
-        'bio_student',
-        'bio_adult',
-        'total_demo',
-        'pop_adult',
-        'month_index',
-        'quarter'
-    ]
 
-    X = df[feature_cols]
-    y_mov = df['movement_target']
-    y_std = df['student_target']
+def make_rf(n_jobs=-1, **params):
+    # one multi-output forest; targets are standardized so the split
+    # criterion weighs movement (thousands) and student ratio (0-1) equally
+    return TransformedTargetRegressor(regressor=make_forest(n_jobs, **params), transformer=StandardScaler())
 
-    # ============================
-    # TRAIN MODELS
-    # ============================
 
-    model_mov = RandomForestRegressor(
-        n_estimators=400,
-        max_depth=12,
-        min_samples_split=5,
-        n_jobs=-1,
-        random_state=42
-    )
-    model_mov.fit(X, y_mov)
-
-    model_std = RandomForestRegressor(
-        n_estimators=400,
-        max_depth=12,
-        min_samples_split=5,
-        n_jobs=-1,
-        random_state=42
+def make_hgb(n_jobs=-1, **params):
+    # gradient boosting is single-output: one model per target
+    hgb = HistGradientBoostingRegressor(**{**HGB_PARAMS, **params}, random_state=42)
+    return make_pipeline(DropEmptyColumns(), MultiOutputRegressor(hgb, n_jobs=n_jobs))
+
+
+def make_linear(n_jobs=-1, **params):
+    # baseline; lag/rolling gaps are imputed since Ridge has no NaN support
+    return make_pipeline(DropEmptyColumns(), SimpleImputer(strategy='median'), StandardScaler(),
+                         Ridge(**{**RIDGE_PARAMS, **params}))
+
+
+BACKENDS = {
+    'rf': make_rf,
+    'hgb': make_hgb,
+    'linear': make_linear,
+}
+
+
+def make_forecaster(backend=None, n_jobs=-1, **params):
+    """
+    Unfitted multi-output forecaster (default backend: config.FORECAST_BACKEND)
+    """
+    backend = backend or config.FORECAST_BACKEND
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown forecast backend: {backend!r} (choose from {', '.join(BACKENDS)})")
+    return BACKENDS[backend](n_jobs=n_jobs, **params)
+
+
+def fit_horizons(df, horizons, backend=None, strategy='separate'):
+    """
+    Forecasters for several horizons from one feature matrix: one model
+    per horizon fitted in parallel processes on the rows where that
+    horizon's targets exist ('separate'), or a single direct multi-output
+    model over all horizon targets ('direct', rows with every target).
+    Returns a list of (horizons, fitted model).
+    """
+    X = df[FEATURE_COLS]
+
+    if strategy == 'direct':
+        cols = [c for h in horizons for c in target_names(h)]
+        rows = df[cols].notna().all(axis=1).to_numpy()
+        return [(list(horizons), fit_forecaster(make_forecaster(backend), X[rows], df.loc[rows, cols]))]
+
+    # horizon-level parallelism replaces the model's own (n_jobs=1 each)
+    parallel = len(horizons) > 1
+    tasks = []
+    for h in horizons:
+        rows = df[target_names(h)].notna().all(axis=1).to_numpy()
+        model = make_forecaster(backend, n_jobs=1 if parallel else -1)
+        tasks.append(delayed(fit_forecaster)(model, X[rows], df.loc[rows, target_names(h)]))
+
+    models = Parallel(n_jobs=-1 if parallel else 1)(tasks)
+    return [([h], model) for h, model in zip(horizons, models)]
+
+
+def predict_horizons(fitted, X):
+    """
+    {horizon: (n × 2) movement/student predictions} from fit_horizons models
+    """
+    out = {}
+    for horizons, model in fitted:
+        pred = model.predict(X)
+        for i, h in enumerate(horizons):
+            out[h] = pred[:, 2 * i:2 * i + 2]
+    return out
+
+
+def leaf_offsets(forest):
+    """
+    Offset of each tree's nodes in the forest's stacked node numbering
+    """
+    counts = [est.tree_.node_count for est in forest.estimators_]
+    return np.cumsum([0] + counts[:-1]), int(np.sum(counts))
+
+
+def record_leaves(model, X, y):
+    """
+    Stores the training rows of every leaf of a fitted rf forecaster
+    (model.leaves_), as quantile regression forests need: row ids grouped
+    by stacked leaf, each leaf's start into them, and the targets in
+    target units.
+    """
+    forest = model.regressor_
+    offsets, n_nodes = leaf_offsets(forest)
+    leaves = (forest.apply(X) + offsets).ravel()
+    order = np.argsort(leaves, kind='stable')
+    model.leaves_ = dict(
+        rows=(order // len(offsets)).astype(np.int32),
+        start=np.searchsorted(leaves[order], np.arange(n_nodes + 1)),
+        y=np.asarray(y, dtype=np.float64),
     )
-    model_std.fit(X, y_std)
+    return model
+
+
+def fit_forecaster(model, X, y):
+    """
+    Fits a forecaster; rf forecasters also keep their training leaves
+    for the quantile intervals
+    """
+    model.fit(X, y)
+    if isinstance(model, TransformedTargetRegressor):
+        record_leaves(model, X, y)
+    return model
+
+
+def forest_quantiles(model, X, quantiles, n_jobs=-1, block_rows=BLOCK_ROWS):
+    """
+    Quantile regression forest: quantiles of the training targets that
+    share a leaf with each row, weighted 1 / (trees × leaf size) per tree,
+    shaped (quantiles × rows × outputs) in target units.
+
+    One forest.apply() plus the tree offsets gives every row's stacked
+    leaves; their training rows are gathered as one flat array per row
+    block, sorted by target rank within each row, and the quantile is
+    where the cumulative weight crosses q. Row blocks are reduced in
+    parallel threads.
+    """
+    forest, leaves_ = model.regressor_, model.leaves_
+    offsets, _ = leaf_offsets(forest)
+    leaves = forest.apply(X) + offsets
+    start, train_rows, y = leaves_['start'], leaves_['rows'], leaves_['y']
+    n_trees, n_train = leaves.shape[1], len(y)
+    rank = np.argsort(np.argsort(y, axis=0, kind='stable'), axis=0)
+
+    def block(lo):
+        first = start[leaves[lo:lo + block_rows]]
+        size = start[leaves[lo:lo + block_rows] + 1] - first
+        counts, sizes = size.sum(axis=1), size.ravel()
+        # every (row, tree) leaf expanded into its training rows
+        pos = np.repeat(first.ravel() - np.cumsum(sizes) + sizes, sizes) + np.arange(sizes.sum())
+        idx = train_rows[pos]
+        w = np.repeat(1.0 / (n_trees * sizes), sizes)
+        row = np.repeat(np.arange(len(counts)), counts)
+        ends = np.cumsum(counts)
+        begins = ends - counts
+
+        out = np.empty((len(quantiles), len(counts), y.shape[1]))
+        for k in range(y.shape[1]):
+            order = np.argsort(row * n_train + rank[idx, k], kind='stable')
+            cum = np.cumsum(w[order])
+            base = np.where(begins > 0, cum[begins - 1], 0.0)
+            for i, q in enumerate(quantiles):
+                at = np.searchsorted(cum, base + q * (cum[ends - 1] - base))
+                out[i, :, k] = y[idx[order[np.clip(at, begins, ends - 1)]], k]
+        return out
+
+    parts = Parallel(n_jobs=n_jobs, prefer='threads')(
+        delayed(block)(lo) for lo in range(0, len(leaves), block_rows))
+    return np.concatenate(parts, axis=1)
+
+
+def predict_intervals(fitted, X, level=INTERVAL):
+    """
+    {horizon: (lower, upper)} central prediction interval at level, each
+    (n × 2) movement/student, from the quantile regression forest of an
+    rf forecaster. Backends without one (hgb, linear) give none.
+    """
+    q = [(1 - level) / 2, (1 + level) / 2]
+    out = {}
+    for horizons, model in fitted:
+        if getattr(model, 'leaves_', None) is None:
+            continue
+        lo, hi = forest_quantiles(model, X, q)
+        for i, h in enumerate(horizons):
+            out[h] = (lo[:, 2 * i:2 * i + 2], hi[:, 2 * i:2 * i + 2])
+    return out
+
+
+def forecast_frame(fitted, X, intervals=True):
+    """
+    pred_{mov,std}_{h}m for every fitted horizon, plus _lo/_hi interval
+    bounds when the backend has them, as a frame aligned with X
+    """
+    out = {}
+    for h, pred in sorted(predict_horizons(fitted, X).items()):
+        out[f"pred_mov_{h}m"] = pred[:, 0]
+        out[f"pred_std_{h}m"] = pred[:, 1]
+
+    if intervals:
+        for h, (lo, hi) in sorted(predict_intervals(fitted, X).items()):
+            for i, m in enumerate(['mov', 'std']):
+                out[f"pred_{m}_{h}m_lo"] = lo[:, i]
+                out[f"pred_{m}_{h}m_hi"] = hi[:, i]
+
+    return pd.DataFrame(out, index=X.index)
+
+
+def feature_schema(X):
+    return {c: str(dtype) for c, dtype in X.dtypes.items()}
+
+
+def model_for(fitted, h):
+    return next(model for horizons, model in fitted if h in horizons)
+
+
+def feature_importances(model):
+    """
+    Impurity importances of a fitted forecaster, or None if the backend has none
+    """
+    if isinstance(model, TransformedTargetRegressor):
+        return model.regressor_.feature_importances_
+    return None
+
+
+# ============================
+# MAIN PIPELINE
+# ============================
+
+def run_phase4(partitioned=None, backend=None, horizons=None, strategy='separate', reconcile='bottom_up',
+               local=None):
+    """
+    Fits the forecaster for HORIZON (default) or for several horizons at
+    once and writes historical (HORIZON) and future predictions; the
+    future table gets pred_mov_{h}m / pred_std_{h}m per horizon, and the
+    hierarchy tables its reconciled state/national totals. With local
+    ('state' or 'cluster'), groups whose own model beats the global one
+    in the backtest get its HORIZON forecast instead.
+    """
+    backend = backend or config.FORECAST_BACKEND
+    horizons = sorted(set(horizons or [HORIZON]) | {HORIZON})
+    print(f"\n=== PHASE-4: DISTRICT FORECASTING ({backend}, multi-output, "
+          f"+{','.join(map(str, horizons))} month) ===")
+    start = time.perf_counter()
+
+    # feature-store panel and every horizon's targets, built once
+    panel = load_panel(partitioned)
+    df = add_horizon_targets(panel, horizons)
+
+    # features for X(t) (lag/rolling gaps are NaN; rf/hgb handle missing values)
+    feature_cols = FEATURE_COLS
 
     # ============================
-    # IN-SAMPLE EVALUATION
+    # TRAIN MODELS (both targets, all horizons)
     # ============================
 
-    pred_mov_hist = model_mov.predict(X)
-    pred_std_hist = model_std.predict(X)
+    t0 = time.perf_counter()
+    fitted = fit_horizons(df, horizons, backend, strategy)
+    fit_s = time.perf_counter() - t0
+    if len(horizons) > 1:
+        print(f"[HORIZONS] {len(fitted)} model(s) ({strategy}) for horizons {horizons}")
 
-    rmse_mov = mean_squared_error(y_mov, pred_mov_hist) ** 0.5
-    rmse_std = mean_squared_error(y_std, pred_std_hist) ** 0.5
+    # ============================
+    # IN-SAMPLE EVALUATION
+    # ============================
 
+    pred_all = predict_horizons(fitted, df[feature_cols])
+    for h in horizons:
+        rows = df[target_names(h)].notna().all(axis=1).to_numpy()
+        y = df.loc[rows, target_names(h)].to_numpy()
+        rmse_mov = mean_squared_error(y[:, 0], pred_all[h][rows, 0]) ** 0.5
+        rmse_std = mean_squared_error(y[:, 1], pred_all[h][rows, 1]) ** 0.5
 
-    print(f"[RMSE] movement_index(t+3m): {rmse_mov:.4f}")
-    print(f"[RMSE] student_ratio(t+3m): {rmse_std:.4f}")
+        print(f"[RMSE] movement_index(t+{h}m): {rmse_mov:.4f}")
+        print(f"[RMSE] student_ratio(t+{h}m): {rmse_std:.4f}")
+    print("[INFO] in-sample errors; out-of-sample: python -m src.model.backtest")
 
     # ============================
     # FEATURE IMPORTANCE
     # ============================
 
-    print("\n[Feature Importance] movement_index +3m")
-    for c, imp in sorted(zip(feature_cols, model_mov.feature_importances_), key=lambda x: -x[1]):
-        print(f"{c:20s} : {imp:.4f}")
-
-    print("\n[Feature Importance] student_ratio +3m")
-    for c, imp in sorted(zip(feature_cols, model_std.feature_importances_), key=lambda x: -x[1]):
-        print(f"{c:20s} : {imp:.4f}")
+    importances = feature_importances(model_for(fitted, HORIZON))
+    if importances is not None:
+        print(f"\n[Feature Importance] movement_index + student_ratio +{HORIZON}m")
+        for c, imp in sorted(zip(feature_cols, importances), key=lambda x: -x[1]):
+            print(f"{c:20s} : {imp:.4f}")
 
     # ============================
-    # SAVE HISTORICAL PREDICTIONS
+    # SAVE HISTORICAL PREDICTIONS (HORIZON)
     # ============================
 
-    df_hist = df.copy()
-    df_hist['pred_mov'] = pred_mov_hist
-    df_hist['pred_std'] = pred_std_hist
+    rows = df[target_names(HORIZON)].notna().all(axis=1).to_numpy()
+    df_hist = df[rows].rename(columns=dict(zip(target_names(HORIZON), TARGETS)))
+    df_hist = df_hist.drop(columns=[c for h in horizons if h != HORIZON for c in target_names(h)])
+    df_hist['pred_mov'] = pred_all[HORIZON][rows, 0]
+    df_hist['pred_std'] = pred_all[HORIZON][rows, 1]
 
     # ============================
-    # FUTURE FORECAST (LATEST MONTH → +3 month)
+    # FUTURE FORECAST (LATEST OBSERVED MONTH → +h months)
     # ============================
 
-    df_future = df.groupby('district_key').tail(1).copy()
+    df_future = df.groupby('district_key').tail(1)
+    df_future = df_future.drop(columns=[c for h in horizons for c in target_names(h)])
     X_final = df_future[feature_cols]
 
-    df_future['pred_mov_3m'] = model_mov.predict(X_final)
-    df_future['pred_std_3m'] = model_std.predict(X_final)
+    # point forecasts plus quantile regression forest intervals (rf backend)
+    preds = forecast_frame(fitted, X_final)
+    df_future = df_future.join(preds)
+    if any(c.endswith('_lo') for c in preds.columns):
+        print(f"[INTERVALS] {INTERVAL:.0%} prediction intervals for {len(X_final):,} districts")
+
+    # per-state / per-cluster models where they beat the global one (HORIZON only)
+    local_meta = None
+    if local:
+        from src.model import local_models
+
+        pairs = df_hist.drop(columns=['pred_mov', 'pred_std'])
+        models, selection, timings, local_s = local_models.local_forecasters(
+            pairs, local, backend, partitioned=partitioned)
+        df_future = local_models.apply_local(df_future, models, local, partitioned)
+        # compared against the global HORIZON model alone (refit if other horizons shared the fit)
+        global_s = fit_s if horizons == [HORIZON] else local_models.global_fit_s(pairs, backend)
+        local_models.report_wall(global_s, local_s, len(models))
+        local_version = local_models.save_local(models, selection, timings, local, backend,
+                                                local_models.MIN_DISTRICTS)
+        local_meta = dict(by=local, version=local_version)
 
     # ============================
     # SAVE ARTIFACTS
@@ -127,14 +446,54 @@ def run_phase4():
 
     os.makedirs(OUT, exist_ok=True)
 
-    df_hist.to_parquet(f"{OUT}/historical_predictions.parquet", index=False)
-    df_future.to_parquet(f"{OUT}/future_forecast.parquet", index=False)
+    # fitted models + feature schema, for scoring without a refit (src.model.serving)
+    meta = dict(
+        backend=backend,
+        strategy=strategy,
+        horizons=horizons,
+        interval=INTERVAL,
+        feature_cols=feature_cols,
+        feature_schema=feature_schema(X_final),
+        outputs=list(preds.columns),
+        local=local_meta,   # forecast_local version applied to future_forecast, if any
+        n_train=int(df[target_names(HORIZON)].notna().all(axis=1).sum()),
+        last_month_index=int(df['month_index'].max()),
+    )
+    version = registry.save_model(MODEL, dict(fitted=fitted), meta)
+    print(f"[SAVED] {MODEL} model v{version} → {registry.model_dir(MODEL)}")
+
+    storage.write_table(df_hist, 'forecast/historical_predictions', base=PROC, partitioned=partitioned)
+    storage.write_table(df_future, 'forecast/future_forecast', base=PROC, partitioned=partitioned)
 
     print(f"[SAVED] historical_predictions → {OUT}/historical_predictions.parquet")
     print(f"[SAVED] future_forecast → {OUT}/future_forecast.parquet")
 
+    # coherent district → state → national forecasts for the state views
+    hierarchy.save_hierarchy(panel, df_future, reconcile, partitioned)
+
+    report_phase("phase-4", start)
     print("\n=== PHASE-4 COMPLETED ===")
 
 
 if __name__ == "__main__":
-    run_phase4()
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Phase-4 district forecasting")
+    parser.add_argument("--partitioned", action="store_true",
+                        help="write outputs as hive-partitioned (state) parquet datasets")
+    parser.add_argument("--backend", choices=list(BACKENDS), default=None,
+                        help="forecasting model (default: $AADHAAR_FORECAST_BACKEND or rf)")
+    parser.add_argument("--horizons", type=int, nargs="*", default=None,
+                        help=f"forecast horizons in months (bare flag: {', '.join(map(str, HORIZONS))}; "
+                             f"default: {HORIZON})")
+    parser.add_argument("--strategy", choices=STRATEGIES, default='separate',
+                        help="multi-horizon training: one model per horizon in parallel, or one direct model")
+    parser.add_argument("--reconcile", choices=hierarchy.METHODS, default='bottom_up',
+                        help="district → state → national reconciliation of the future forecast")
+    parser.add_argument("--local", choices=["state", "cluster"], default=None,
+                        help="also train per-state / per-cluster models and use them where they backtest better")
+    args = parser.parse_args()
+
+    horizons = HORIZONS if args.horizons == [] else args.horizons
+    run_phase4(partitioned=args.partitioned or None, backend=args.backend, horizons=horizons,
+               strategy=args.strategy, reconcile=args.reconcile, local=args.local)
@@ -0,0 +1,224 @@
+import re
+import time
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+from src import config
+from src.data import storage
+from src.utils import report_phase
+
+PROC = config.PROC
+NATIONAL = 'INDIA'
+METHODS = ['bottom_up', 'mint']
+VAR_EPS = 1e-6   # floor for base-forecast error variances (mint)
+
+# additive counts behind the two forecast rates:
+#   total_demo      = movement_index * pop weight
+#   student_updates = student_ratio * total_demo
+COUNTS = ['total_demo', 'student_updates']
+
+
+def population_weight(pop):
+    """
+    Denominator of movement_index: adult population, or 1 where it is
+    missing/0 (movement_index then holds total_demo itself, see phase 2)
+    """
+    pop = np.asarray(pop, dtype=np.float64)
+    return np.where(pop > 0, pop, 1.0)
+
+
+def summing_matrix(states, districts):
+    """
+    Sparse summing matrix S (nodes × districts) of the national → state →
+    district hierarchy and its node table (level, node, state), rows in
+    the order national, states, districts
+    """
+    codes, names = pd.factorize(np.asarray(states), sort=True)
+    n, k = len(codes), len(names)
+
+    rows = np.concatenate([np.zeros(n, dtype=np.int64), 1 + codes, 1 + k + np.arange(n)])
+    cols = np.tile(np.arange(n), 3)
+    S = sp.csr_matrix((np.ones(3 * n), (rows, cols)), shape=(1 + k + n, n))
+
+    nodes = pd.DataFrame({
+        'level': ['national'] + ['state'] * k + ['district'] * n,
+        'node': [NATIONAL, *names, *districts],
+        'state': [None, *names, *states],
+    })
+    return S, nodes
+
+
+def reconcile(base, S, method='bottom_up', var=None):
+    """
+    Coherent forecasts (nodes × k) from base forecasts of every node.
+
+    bottom_up: S @ (district base forecasts).
+    mint: diagonal MinT (WLS) with per-node error variances var, the
+    smallest variance-weighted change that makes all nodes add up:
+    ỹ = ŷ − W Cᵀ (C W Cᵀ)⁻¹ C ŷ for the constraints C = [I | −S_agg].
+    Only an (aggregates × aggregates) system is solved per column.
+    """
+    n_agg = S.shape[0] - S.shape[1]
+    if method == 'bottom_up':
+        return S @ base[n_agg:]
+    if method != 'mint':
+        raise ValueError(f"Unknown reconciliation method: {method} (choose from {', '.join(METHODS)})")
+
+    C = sp.hstack([sp.identity(n_agg, format='csr'), -S[:n_agg]]).tocsr()
+    gap = C @ base
+    out = np.empty_like(base)
+    for j in range(base.shape[1]):
+        CW = C.multiply(np.maximum(var[:, j], VAR_EPS)).tocsr()
+        out[:, j] = base[:, j] - CW.T @ np.linalg.solve((CW @ C.T).toarray(), gap[:, j])
+    return out
+
+
+def persistence_variance(series, h):
+    """
+    Mean squared error of the naive forecast y(t+h) = y(t) for every row
+    of a (nodes × months) count matrix; the MinT variance scale
+    """
+    h = min(h, series.shape[1] - 1)
+    err = series[:, h:] - series[:, :-h]
+    with np.errstate(invalid='ignore'):
+        return np.nanmean(err ** 2, axis=1)
+
+
+def rates(demo, students, weight):
+    """
+    movement_index and student_ratio from (reconciled) counts
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return demo / weight, np.where(demo != 0, students / demo, 0.0)
+
+
+def forecast_horizons(columns):
+    """
+    Horizons (months ahead) present as pred_mov_{h}m columns
+    """
+    return sorted(int(m.group(1)) for c in columns if (m := re.fullmatch(r"pred_mov_(\d+)m", c)))
+
+
+def hierarchy_tables(panel, df_future, method='bottom_up'):
+    """
+    District, state and national forecasts that add up, plus the actual
+    state/national history on the same definitions.
+
+    District rate forecasts become count forecasts (demo updates,
+    student updates), are reconciled through the summing matrix and
+    turned back into rates, so a state's movement_index is its demo
+    updates per adult and its student_ratio its share of student updates.
+    """
+    horizons = forecast_horizons(df_future.columns)
+    df = df_future.sort_values(['state', 'district_key']).reset_index(drop=True)
+    S, nodes = summing_matrix(df['state'].to_numpy(), df['district_key'].to_numpy())
+    n_agg = S.shape[0] - S.shape[1]
+    position = pd.Series(np.arange(len(df)), index=df['district_key'])
+
+    # history: (districts × months) counts in S column order, then every node
+    panel = panel[panel['district_key'].isin(position.index)]
+    panel = panel.assign(weight=population_weight(panel['pop_adult']))
+    wide = {
+        col: panel.pivot_table(index='district_key', columns='month_index', values=col, aggfunc='sum')
+        .reindex(position.index)
+        for col in COUNTS + ['weight']
+    }
+    months = wide['weight'].columns
+    series = {col: S @ wide[col].fillna(0).to_numpy() for col in wide}
+
+    # district forecasts in counts, one column per horizon
+    weight = population_weight(df['pop_adult'])
+    demo = df[[f"pred_mov_{h}m" for h in horizons]].to_numpy() * weight[:, None]
+    students = df[[f"pred_std_{h}m" for h in horizons]].to_numpy() * demo
+    node_weight = S @ weight
+
+    recon = {}
+    for col, bottom in zip(COUNTS, [demo, students]):
+        base = np.empty((S.shape[0], len(horizons)))
+        base[n_agg:] = bottom
+        var = None
+        if method == 'mint':
+            # aggregate base forecasts: persistence of the latest aggregate counts
+            base[:n_agg] = (S[:n_agg] @ df[col].to_numpy())[:, None]
+            var = np.column_stack([persistence_variance(series[col], h) for h in horizons])
+            var = np.where(np.isfinite(var), var, np.nanmax(var, initial=VAR_EPS))
+        recon[col] = reconcile(base, S, method, var)
+
+    out = nodes.assign(pop_adult=node_weight,
+                       total_demo=S @ df['total_demo'].to_numpy(),
+                       student_updates=S @ df['student_updates'].to_numpy())
+    for i, h in enumerate(horizons):
+        mov, std = rates(recon['total_demo'][:, i], recon['student_updates'][:, i], node_weight)
+        out[f"pred_demo_{h}m"] = recon['total_demo'][:, i]
+        out[f"pred_students_{h}m"] = recon['student_updates'][:, i]
+        out[f"pred_mov_{h}m"] = mov
+        out[f"pred_std_{h}m"] = std
+
+    # aggregate actuals per month (districts already have theirs in monthly)
+    labels = panel.groupby('month_index')['month'].first().reindex(months)
+    agg = nodes.iloc[:n_agg]
+    mov, std = rates(series['total_demo'][:n_agg], series['student_updates'][:n_agg], series['weight'][:n_agg])
+    history = pd.DataFrame({
+        'level': np.repeat(agg['level'].to_numpy(), len(months)),
+        'node': np.repeat(agg['node'].to_numpy(), len(months)),
+        'state': np.repeat(agg['state'].to_numpy(), len(months)),
+        'month_index': np.tile(months.to_numpy(), n_agg),
+        'month': np.tile(labels.to_numpy(), n_agg),
+        'pop_adult': series['weight'][:n_agg].ravel(),
+        'total_demo': series['total_demo'][:n_agg].ravel(),
+        'student_updates': series['student_updates'][:n_agg].ravel(),
+        'movement_index': mov.ravel(),
+        'student_ratio': std.ravel(),
+    })
+    return out, history
+
+
+def coherence_error(forecast):
+    """
+    Largest |state sum − national| or |district sum − state| over the
+    reconciled count columns (0 up to float error)
+    """
+    cols = [c for c in forecast.columns if c.startswith(('pred_demo_', 'pred_students_'))]
+    states = forecast[forecast['level'] == 'state'].set_index('node')[cols]
+    districts = forecast[forecast['level'] == 'district'].groupby('state')[cols].sum()
+    national = forecast.loc[forecast['level'] == 'national', cols].to_numpy()
+    return max(np.abs(states.sum().to_numpy() - national).max(),
+               np.abs(districts.reindex(states.index).to_numpy() - states.to_numpy()).max())
+
+
+def save_hierarchy(panel, df_future, method='bottom_up', partitioned=None):
+    forecast, history = hierarchy_tables(panel, df_future, method)
+    n_states = int((forecast['level'] == 'state').sum())
+    print(f"[HIERARCHY] {method}: 1 national, {n_states} states, {len(df_future):,} districts "
+          f"(coherence error {coherence_error(forecast):.2e})")
+
+    storage.write_table(forecast, 'forecast/hierarchy_forecast', base=PROC, partitioned=partitioned)
+    storage.write_table(history, 'forecast/hierarchy_history', base=PROC, partitioned=partitioned)
+    print(f"[SAVED] hierarchy_forecast, hierarchy_history → {PROC}/forecast")
+
+
+def run_hierarchy(method='bottom_up', partitioned=None):
+    """
+    Re-reconciles the saved phase-4 future forecast, e.g. with another method
+    """
+    from src.model.forecast import load_panel
+
+    print(f"\n=== PHASE-4 HIERARCHICAL RECONCILIATION ({method}) ===")
+    start = time.perf_counter()
+    df_future = storage.read_table('forecast/future_forecast', base=PROC)
+    save_hierarchy(load_panel(partitioned), df_future, method, partitioned)
+    report_phase("hierarchy", start)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="District → state → national forecast reconciliation")
+    parser.add_argument("--method", choices=METHODS, default='bottom_up')
+    parser.add_argument("--partitioned", action="store_true",
+                        help="read/write hive-partitioned parquet datasets")
+    args = parser.parse_args()
+
+    run_hierarchy(args.method, args.partitioned or None)
@@ -0,0 +1,267 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+from src import config
+from src.data import storage
+from src.model import registry
+from src.model.backtest import MIN_TRAIN_MONTHS, error_table, walk_forward_folds
+from src.model.forecast import (FEATURE_COLS, HORIZON, TARGETS, fit_forecaster, forecast_frame, load_pairs,
+                                make_forecaster)
+from src.utils import report_phase
+
+PROC = config.PROC
+OUT = f"{PROC}/forecast/local"
+MODEL = "forecast_local"
+GROUPINGS = ['state', 'cluster']
+MIN_DISTRICTS = 15   # smaller groups keep the global model
+GLOBAL = 'global'
+
+FRAME_COLS = list(dict.fromkeys(['district_key', 'group', 'month_index'] + FEATURE_COLS + TARGETS))
+
+
+def assign_groups(df, by, partitioned=None):
+    """
+    Group label per row: the district's state, or its phase-3 cluster
+    (districts without a cluster get None and stay on the global model)
+    """
+    if by == 'state':
+        return df['state'].astype(str)
+    if by != 'cluster':
+        raise ValueError(f"Unknown grouping: {by} (choose from {', '.join(GROUPINGS)})")
+    if not storage.exists('clustering/district_features', base=PROC):
+        raise FileNotFoundError("Per-cluster models need phase-3 labels; run python -m src.model.clustering")
+
+    labels = storage.read_table('clustering/district_features', columns=['district_key', 'cluster'], base=PROC)
+    cluster = labels.set_index('district_key')['cluster']
+    return df['district_key'].map(cluster).map(lambda c: None if pd.isna(c) else f"cluster {int(c)}")
+
+
+# ----------------------------
+# group workers
+# ----------------------------
+
+_PAIRS = None
+
+
+def _init_worker(pairs):
+    # each worker process receives the pairs frame once, not per task
+    global _PAIRS
+    _PAIRS = pairs
+
+
+def fit_group(group, params, fold=None, train_end=None, test_month=None):
+    """
+    Fits one group's forecaster (GLOBAL: every district) on its pairs up
+    to train_end (all pairs when None). With a test_month returns
+    (timing row, predictions of that month), else (timing row, model).
+    """
+    pairs = _PAIRS if group == GLOBAL else _PAIRS[_PAIRS['group'] == group]
+    train = pairs if train_end is None else pairs[pairs['month_index'] <= train_end]
+
+    model = make_forecaster(n_jobs=1, **params)
+    t0 = time.perf_counter()
+    fit_forecaster(model, train[FEATURE_COLS], train[TARGETS])
+    row = dict(group=group, fold=fold, n_train=len(train), fit_s=time.perf_counter() - t0)
+
+    if test_month is None:
+        return row, model
+
+    test = pairs[pairs['month_index'] == test_month]
+    pred = model.predict(test[FEATURE_COLS])
+    preds = pd.concat([
+        test[['district_key', 'group']].assign(model=GLOBAL if group == GLOBAL else 'local', fold=fold,
+                                               target=target, y=test[target].to_numpy(), pred=pred[:, i])
+        for i, target in enumerate(TARGETS)
+    ], ignore_index=True)
+    return row, preds
+
+
+def run_tasks(pool, tasks):
+    if pool is None:
+        return [fit_group(*task) for task in tasks]
+    futures = [pool.submit(fit_group, *task) for task in tasks]
+    return [f.result() for f in as_completed(futures)]
+
+
+def select_models(preds, sizes, min_districts=MIN_DISTRICTS):
+    """
+    Per-group choice between the local and the global model from their
+    backtest RMSE on the group's own districts (the folds both models
+    predicted): local wins when its mean RMSE ratio over the targets is
+    below 1
+    """
+    local = preds[preds['model'] == 'local']
+    both = preds[preds['model'] == GLOBAL].merge(local[['district_key', 'fold', 'target']])
+    err = error_table(pd.concat([both, local], ignore_index=True), ['group', 'model', 'target'])
+    rmse = err.pivot_table(index='group', columns=['model', 'target'], values='rmse')
+
+    out = pd.DataFrame({'districts': sizes})
+    out.index.name = 'group'
+    for model in [GLOBAL, 'local']:
+        for target in TARGETS:
+            out[f"rmse_{model}_{target}"] = rmse[(model, target)] if (model, target) in rmse else np.nan
+    out['score'] = np.mean([out[f"rmse_local_{t}"] / out[f"rmse_global_{t}"] for t in TARGETS], axis=0)
+    out['model'] = np.where(out['score'] < 1, 'local', GLOBAL)
+    out['reason'] = np.select(
+        [out['districts'] < min_districts, out['score'].isna(), out['score'] < 1],
+        ['too few districts', 'no backtest fold', 'lower backtest rmse'], 'global as good or better')
+    return out.reset_index().sort_values('districts', ascending=False, ignore_index=True)
+
+
+def local_forecasters(pairs, by, backend=None, min_districts=MIN_DISTRICTS, min_train_months=MIN_TRAIN_MONTHS,
+                      workers=None, partitioned=None):
+    """
+    Per-group (state or cluster) forecasters for HORIZON. Every group with
+    at least min_districts districts is backtested walk-forward against
+    the global model; the groups where it wins are refit on all pairs.
+    Backtest and final fits run as (group, fold) tasks in a process pool.
+
+    Returns ({group: fitted model}, selection table, timings, local wall s:
+    backtest plus final fits).
+    """
+    params = dict(backend=backend or config.FORECAST_BACKEND)
+    pairs = pairs.assign(group=assign_groups(pairs, by, partitioned).to_numpy())
+    pairs = pairs[FRAME_COLS].reset_index(drop=True)
+
+    sizes = pairs.dropna(subset=['group']).groupby('group')['district_key'].nunique()
+    eligible = list(sizes[sizes >= min_districts].sort_values(ascending=False).index)
+    folds = walk_forward_folds(pairs['month_index'], min_train_months)
+    if not folds:
+        raise ValueError(f"Not enough months for a walk-forward fold "
+                         f"(need {min_train_months} training months + {HORIZON}-month horizon)")
+
+    workers = workers or os.cpu_count() or 1
+    print(f"[LOCAL] {len(eligible)}/{len(sizes)} {by} groups with >= {min_districts} districts; "
+          f"{len(folds)} folds on {workers} workers")
+
+    # largest groups first so the pool's tail is short; a group joins the
+    # folds where it has both training pairs and test rows
+    counts = pd.crosstab(pairs['group'], pairs['month_index'])
+    backtest_tasks = [(g, params, i, train_end, test_month)
+                      for g in [GLOBAL] + eligible for i, (train_end, test_month) in enumerate(folds)
+                      if g == GLOBAL or (counts.loc[g, :train_end].sum() > 0 and counts.loc[g, test_month] > 0)]
+
+    pool = None if workers == 1 else ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                                         initargs=(pairs,))
+    if pool is None:
+        _init_worker(pairs)
+    try:
+        start = time.perf_counter()
+        results = run_tasks(pool, backtest_tasks)
+        backtest_s = time.perf_counter() - start
+
+        preds = pd.concat([p for _, p in results], ignore_index=True)
+        selection = select_models(preds, sizes, min_districts)
+        winners = list(selection.loc[selection['model'] == 'local', 'group'])
+
+        start = time.perf_counter()
+        final = run_tasks(pool, [(g, params) for g in winners])
+        final_s = time.perf_counter() - start
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    timings = pd.DataFrame([row for row, _ in results + final])
+    timings['stage'] = np.where(timings['fold'].isna(), 'final', 'backtest')
+    models = {row['group']: model for row, model in final}
+
+    print(f"[LOCAL] backtest: {len(backtest_tasks)} fits in {backtest_s:.1f}s wall "
+          f"({timings.loc[timings['stage'] == 'backtest', 'fit_s'].sum():.1f}s of fitting)")
+    print(f"[LOCAL] {len(models)} local model(s) selected ({', '.join(winners) or 'none'}); "
+          f"final fits {final_s:.1f}s wall ({timings.loc[timings['stage'] == 'final', 'fit_s'].sum():.1f}s of fitting)")
+    return models, selection, timings, backtest_s + final_s
+
+
+def apply_local(df_future, models, by, partitioned=None):
+    """
+    Replaces the HORIZON forecast (and its interval) of every district in
+    a group with a local model; forecast_model records which model it is
+    """
+    df_future = df_future.copy()
+    groups = assign_groups(df_future, by, partitioned)
+    df_future['forecast_model'] = GLOBAL
+
+    for group, model in models.items():
+        rows = (groups == group).to_numpy()
+        if not rows.any():
+            continue
+        pred = forecast_frame([([HORIZON], model)], df_future.loc[rows, FEATURE_COLS])
+        cols = [c for c in pred.columns if c in df_future.columns]
+        df_future.loc[rows, cols] = pred[cols].to_numpy()
+        df_future.loc[rows, 'forecast_model'] = group
+    return df_future
+
+
+def save_local(models, selection, timings, by, backend, min_districts):
+    os.makedirs(OUT, exist_ok=True)
+    selection.to_parquet(f"{OUT}/selection.parquet", index=False)
+    timings.to_parquet(f"{OUT}/timings.parquet", index=False)
+
+    meta = dict(by=by, backend=backend or config.FORECAST_BACKEND, horizon=HORIZON, min_districts=min_districts,
+                groups=sorted(models), feature_cols=FEATURE_COLS)
+    version = registry.save_model(MODEL, dict(models=models), meta)
+    print(f"[SAVED] selection, timings → {OUT}; {MODEL} model v{version} → {registry.model_dir(MODEL)}")
+    return version
+
+
+def global_fit_s(pairs, backend=None):
+    """
+    Wall time of one global HORIZON fit on all pairs (all cores): the
+    baseline the local models' cost is reported against
+    """
+    t0 = time.perf_counter()
+    fit_forecaster(make_forecaster(backend), pairs[FEATURE_COLS], pairs[TARGETS])
+    return time.perf_counter() - t0
+
+
+def report_wall(global_s, local_s, n_models):
+    ratio = f" ({local_s / global_s:.2f}x)" if global_s else ""
+    print(f"[WALL] global fit (+{HORIZON}m): {global_s:.1f}s | local models (backtest + {n_models} final fits): "
+          f"{local_s:.1f}s{ratio}")
+
+
+def run_local(by='state', backend=None, min_districts=MIN_DISTRICTS, min_train_months=MIN_TRAIN_MONTHS,
+              workers=None, partitioned=None):
+    """
+    Per-group model selection on its own; phase 4 with --local applies
+    the selected models to the future forecast
+    """
+    print(f"\n=== PHASE-4 LOCAL MODELS (PER {by.upper()}) ===")
+    start = time.perf_counter()
+
+    pairs = load_pairs(partitioned)
+
+    # the single global model it is compared against
+    global_s = global_fit_s(pairs, backend)
+
+    models, selection, timings, local_s = local_forecasters(pairs, by, backend, min_districts, min_train_months,
+                                                           workers, partitioned)
+    report_wall(global_s, local_s, len(models))
+    save_local(models, selection, timings, by, backend, min_districts)
+
+    with pd.option_context('display.width', 160, 'display.max_columns', 20):
+        print(selection[selection['reason'] != 'too few districts'][['group', 'districts', 'score', 'model', 'reason']])
+    report_phase("local-models", start)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Per-state / per-cluster forecasters with backtest selection")
+    parser.add_argument("--by", choices=GROUPINGS, default='state')
+    parser.add_argument("--backend", choices=["rf", "hgb", "linear"], default=None,
+                        help="forecasting model (default: $AADHAAR_FORECAST_BACKEND or rf)")
+    parser.add_argument("--min-districts", type=int, default=MIN_DISTRICTS,
+                        help="smaller groups use the global model")
+    parser.add_argument("--min-train-months", type=int, default=MIN_TRAIN_MONTHS)
+    parser.add_argument("--workers", type=int, default=None, help="fit processes (default: CPU count)")
+    parser.add_argument("--partitioned", action="store_true",
+                        help="read/rebuild the feature store as hive-partitioned datasets")
+    args = parser.parse_args()
+
+    run_local(args.by, args.backend, args.min_districts, args.min_train_months, args.workers,
+              args.partitioned or None)
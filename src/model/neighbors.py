@@ -0,0 +1,103 @@
+import os
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.neighbors import NearestNeighbors
+
+from src import config
+
+PROC = config.PROC
+INDEX = f"{PROC}/clustering/neighbors.joblib"
+
+
+class NeighborIndex:
+    """
+    "Similar districts" index over standardized district feature vectors.
+
+    Unfiltered queries use a prebuilt BallTree; queries limited to a state
+    or cluster compute distances to just that subset with NumPy, which is
+    exact and stays in the millisecond range for district-scale subsets.
+    """
+
+    def __init__(self, X, meta):
+        self.X = np.ascontiguousarray(X, dtype=np.float64)
+        self.meta = meta.reset_index(drop=True)
+        self.rows = pd.Series(np.arange(len(self.meta)), index=self.meta['district_key'].astype(str))
+        self.nn = NearestNeighbors(algorithm='ball_tree').fit(self.X)
+
+    @classmethod
+    def build(cls, feats, feature_cols, scaler):
+        """
+        Index from phase-3 district features and its fitted StandardScaler
+        """
+        X = scaler.transform(feats[feature_cols])
+        meta = pd.DataFrame({
+            'district_key': feats['district_key'].astype(str).to_numpy(),
+            'state': feats['state'].astype(str).to_numpy(),
+            'district': feats['district'].astype(str).to_numpy(),
+            'cluster_label': feats['cluster_label'].astype(str).to_numpy(),
+        })
+        return cls(X, meta)
+
+    def save(self, path=INDEX):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.tmp"
+        joblib.dump(self, tmp)
+        os.replace(tmp, path)
+        return path
+
+    @staticmethod
+    def load(path=INDEX):
+        return joblib.load(path)
+
+    def query(self, district_key, k=10, state=None, cluster=None):
+        """
+        Top-k districts most similar to district_key (excluding itself),
+        optionally only within one state and/or cluster label.
+        Returns rank, district, state, cluster label and distance.
+        """
+        if district_key not in self.rows.index:
+            raise KeyError(f"Unknown district_key: {district_key}")
+
+        i = self.rows[district_key]
+        x = self.X[i:i + 1]
+
+        if state is None and cluster is None:
+            n = min(k + 1, len(self.X))
+            dist, idx = self.nn.kneighbors(x, n_neighbors=n)
+            dist, idx = dist[0], idx[0]
+        else:
+            mask = np.ones(len(self.X), dtype=bool)
+            if state is not None:
+                mask &= self.meta['state'].to_numpy() == state
+            if cluster is not None:
+                mask &= self.meta['cluster_label'].to_numpy() == cluster
+
+            idx = np.flatnonzero(mask)
+            dist = np.sqrt(((self.X[idx] - x) ** 2).sum(axis=1))
+            top = np.argsort(dist, kind='stable')[:k + 1]
+            dist, idx = dist[top], idx[top]
+
+        keep = idx != i
+        out = self.meta.iloc[idx[keep][:k]].reset_index(drop=True)
+        out.insert(0, 'rank', np.arange(1, len(out) + 1))
+        out['distance'] = dist[keep][:k]
+        return out
+
+
+_INDEX = None
+
+
+def get_index(path=INDEX):
+    """
+    Process-wide index, loaded once
+    """
+    global _INDEX
+    if _INDEX is None:
+        _INDEX = NeighborIndex.load(path)
+    return _INDEX
+
+
+def similar_districts(district_key, k=10, state=None, cluster=None):
+    return get_index().query(district_key, k=k, state=state, cluster=cluster)
@@ -0,0 +1,84 @@
+import json
+import os
+import platform
+import re
+import shutil
+from datetime import datetime, timezone
+
+import joblib
+import numpy as np
+import sklearn
+
+from src import config
+
+MODELS = os.path.join(config.PROC, "models")
+KEEP = 5   # versions kept per model name
+
+
+def model_dir(name, base=MODELS):
+    return os.path.join(base, name)
+
+
+def list_versions(name, base=MODELS):
+    """
+    Saved version numbers of a model, oldest first
+    """
+    path = model_dir(name, base)
+    if not os.path.isdir(path):
+        return []
+    return sorted(int(m.group(1)) for d in os.listdir(path) if (m := re.fullmatch(r"v(\d+)", d)))
+
+
+def save_model(name, artifacts, meta=None, base=MODELS, keep=KEEP):
+    """
+    Saves a dict of fitted objects as the next version of a model, with a
+    meta.json recording the version, time and library versions.
+    Returns the new version number.
+    """
+    versions = list_versions(name, base)
+    version = versions[-1] + 1 if versions else 1
+    path = os.path.join(model_dir(name, base), f"v{version:04d}")
+    tmp = f"{path}.tmp"
+
+    os.makedirs(tmp, exist_ok=True)
+    joblib.dump(artifacts, os.path.join(tmp, "model.joblib"))
+
+    meta = dict(meta or {})
+    meta.update(
+        name=name,
+        version=version,
+        created=datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        sklearn=sklearn.__version__,
+        numpy=np.__version__,
+        python=platform.python_version(),
+    )
+    with open(os.path.join(tmp, "meta.json"), "w") as fh:
+        json.dump(meta, fh, indent=2, default=str)
+
+    os.replace(tmp, path)
+
+    for old in versions[:max(0, len(versions) + 1 - keep)]:
+        shutil.rmtree(os.path.join(model_dir(name, base), f"v{old:04d}"), ignore_errors=True)
+
+    return version
+
+
+def load_model(name, version=None, base=MODELS):
+    """
+    (artifacts, meta) of a saved model version (default: latest), or
+    (None, None) when nothing is saved
+    """
+    versions = list_versions(name, base)
+    if not versions:
+        return None, None
+
+    version = versions[-1] if version is None else version
+    path = os.path.join(model_dir(name, base), f"v{version:04d}")
+
+    with open(os.path.join(path, "meta.json")) as fh:
+        meta = json.load(fh)
+    if meta.get('sklearn') != sklearn.__version__:
+        print(f"[WARN] {name} v{version} was saved with scikit-learn {meta.get('sklearn')}, "
+              f"running {sklearn.__version__}")
+
+    return joblib.load(os.path.join(path, "model.joblib")), meta
@@ -0,0 +1,227 @@
+import json
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.model.forecast import HORIZON
+from src.model.hierarchy import NATIONAL, forecast_horizons, population_weight
+from src.model.serving import ForecastService
+
+OPS = ['scale', 'shift']
+
+# movement_index is total_demo per adult (population_weight); a rule on
+# either input moves it, unless the rule targets movement_index itself
+DERIVED_INPUTS = ['total_demo', 'pop_adult']
+
+
+def make_rule(column, op, value, states=None, districts=None):
+    """
+    One perturbation: scale (×value) or shift (+value) a feature column for
+    the districts of some states and/or some districts (neither: all)
+    """
+    return dict(column=column, op=op, value=float(value), states=list(states or []),
+                districts=list(districts or []))
+
+
+def describe_rule(rule):
+    target = ', '.join(rule['states'] + rule['districts']) or 'all districts'
+    change = f"×{rule['value']:g}" if rule['op'] == 'scale' else f"{rule['value']:+g}"
+    return f"{rule['column']} {change} ({target})"
+
+
+class ScenarioEngine:
+    """
+    What-if forecasts from the saved phase-4 model. Each scenario is a list
+    of rules applied to every district's latest feature row; the baseline
+    and all scenarios are stacked into one (scenarios × districts) matrix
+    and scored in a single global predict call.
+
+    Rules change the latest month only: lag/rolling/EWMA history keeps its
+    observed values, while the month-over-month _delta of a changed signal
+    and movement_index (from total_demo / pop_adult) follow the rule.
+
+    When phase 4 ran with --local, the per-state / per-cluster models it
+    selected score their groups' HORIZON columns (ForecastService.local),
+    as in future_forecast.
+    """
+
+    def __init__(self, service=None, version=None, intervals=False):
+        self.service = service or ForecastService(version, cache_size=0, intervals=intervals)
+        self.feature_cols = self.service.feature_cols
+        self.col = {c: i for i, c in enumerate(self.feature_cols)}
+        self.keys = self.service.features.index
+        self.states = self.service.states
+        self.base = self.service.X
+        self.local = self.service.local
+
+    def predict(self, X):
+        """
+        (stack, districts, outputs) forecasts of a (stack, districts,
+        features) array in one global predict call, plus one call per
+        local model for its districts' HORIZON columns
+        """
+        s, n, f = X.shape
+        models = np.tile(self.service.row_model, s)
+        return self.service.predict_matrix(X.reshape(-1, f), models).reshape(s, n, -1)
+
+    def check_rule(self, rule):
+        if rule['column'] not in self.col:
+            raise ValueError(f"Unknown feature column: {rule['column']}")
+        if rule['op'] not in OPS:
+            raise ValueError(f"Unknown op: {rule['op']} (choose from {', '.join(OPS)})")
+        unknown = sorted(set(rule['districts']) - set(self.keys))
+        if unknown:
+            raise KeyError(f"Unknown district_key: {', '.join(unknown)}")
+
+    def rows(self, rule):
+        """
+        Districts a rule applies to, as a boolean mask
+        """
+        if not rule['states'] and not rule['districts']:
+            return np.ones(len(self.keys), dtype=bool)
+        return (self.states.isin(rule['states']) | self.keys.isin(rule['districts'])).to_numpy()
+
+    def apply(self, X, rule):
+        """
+        Applies one rule in place to a (districts × features) matrix;
+        returns the rows it touched
+        """
+        rows, c = self.rows(rule), self.col[rule['column']]
+        old = X[rows, c]
+        X[rows, c] = old * rule['value'] if rule['op'] == 'scale' else old + rule['value']
+        self.follow(X, rows, rule['column'], old)
+
+        if rule['column'] in DERIVED_INPUTS and 'movement_index' in self.col:
+            demo = X[rows, self.col['total_demo']]
+            old = X[rows, self.col['movement_index']]
+            X[rows, self.col['movement_index']] = demo / population_weight(X[rows, self.col['pop_adult']])
+            self.follow(X, rows, 'movement_index', old)
+        return rows
+
+    def follow(self, X, rows, column, old):
+        # the latest month-over-month delta moves with the latest value
+        delta = self.col.get(f"{column}_delta")
+        if delta is not None:
+            X[rows, delta] += X[rows, self.col[column]] - old
+
+    def stack(self, scenarios):
+        """
+        (1 + scenarios, districts, features) array, baseline first, and
+        the (scenarios, districts) mask of districts each scenario touched
+        """
+        X = np.repeat(self.base[None], 1 + len(scenarios), axis=0)
+        touched = np.zeros((len(scenarios), len(self.keys)), dtype=bool)
+        for s, rules in enumerate(scenarios, start=1):
+            for rule in rules:
+                self.check_rule(rule)
+                touched[s - 1] |= self.apply(X[s], rule)
+        return X, touched
+
+    def run(self, scenarios):
+        """
+        Scores {name: [rules]} in one batch. Returns one row per scenario ×
+        district: the scenario forecast, the baseline and their delta for
+        every output column, plus the scenario's pop_adult (for state totals).
+        """
+        names = list(scenarios)
+        X, touched = self.stack([scenarios[n] for n in names])
+        n = len(self.keys)
+
+        pred = self.predict(X)
+        base, pred = pred[0], pred[1:]
+
+        out = pd.DataFrame({
+            'scenario': np.repeat(names, n),
+            'district_key': np.tile(self.keys.to_numpy(), len(names)),
+            'state': np.tile(self.states.to_numpy(), len(names)),
+            'affected': touched.ravel(),
+            'pop_adult': X[1:, :, self.col['pop_adult']].ravel(),
+            'pop_adult_base': np.tile(X[0, :, self.col['pop_adult']], len(names)),
+        })
+        for i, c in enumerate(self.service.columns):
+            out[c] = pred[:, :, i].ravel()
+            out[f"{c}_base"] = np.tile(base[:, i], len(names))
+            out[f"{c}_delta"] = out[c] - out[f"{c}_base"]
+        return out
+
+
+def summarize(result, horizon=None):
+    """
+    Scenario effect per state and nationally, aggregated as in the
+    hierarchy tables: movement is demo updates per adult (Σ mov·w / Σ w),
+    student_ratio the student share of demo updates
+    """
+    horizons = forecast_horizons(result.columns)
+    h = horizon or (3 if 3 in horizons else horizons[0])
+    mov, std = f"pred_mov_{h}m", f"pred_std_{h}m"
+
+    rows = []
+    for suffix, pop in [('', 'pop_adult'), ('_base', 'pop_adult_base')]:
+        w = population_weight(result[pop])
+        demo = result[mov + suffix] * w
+        rows.append(pd.DataFrame({'w' + suffix: w, 'demo' + suffix: demo,
+                                  'students' + suffix: result[std + suffix] * demo}))
+    parts = pd.concat([result[['scenario', 'state', 'affected']]] + rows, axis=1)
+
+    by_state = parts.groupby(['scenario', 'state'], sort=False).sum()
+    national = parts.drop(columns='state').groupby('scenario', sort=False).sum()
+    national.index = pd.MultiIndex.from_product([national.index, [NATIONAL]], names=['scenario', 'state'])
+    agg = pd.concat([by_state, national])
+
+    out = pd.DataFrame(index=agg.index)
+    out['districts_affected'] = agg['affected'].astype(int)
+    for suffix in ['', '_base']:
+        out['movement' + suffix] = agg['demo' + suffix] / agg['w' + suffix]
+        out['student_ratio' + suffix] = agg['students' + suffix] / agg['demo' + suffix].replace(0, np.nan)
+    for m in ['movement', 'student_ratio']:
+        out[f"{m}_delta"] = out[m] - out[f"{m}_base"]
+        out[f"{m}_pct"] = 100 * out[f"{m}_delta"] / out[f"{m}_base"].abs().replace(0, np.nan)
+    out.insert(0, 'horizon', h)
+    return out.reset_index()
+
+
+def load_scenarios(path):
+    """
+    {name: [rule, ...]} from a JSON file; rules use make_rule's fields
+    """
+    with open(path) as fh:
+        spec = json.load(fh)
+    return {name: [make_rule(**rule) for rule in rules] for name, rules in spec.items()}
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="What-if forecasts from the saved phase-4 model")
+    parser.add_argument("--spec", default=None, help='JSON file {"name": [{"column", "op", "value", "states"}]}')
+    parser.add_argument("--column", default="pop_adult", help="feature to perturb (without --spec)")
+    parser.add_argument("--op", choices=OPS, default="scale")
+    parser.add_argument("--values", type=float, nargs="+", default=[1.2],
+                        help="one scenario per value (without --spec)")
+    parser.add_argument("--states", nargs="*", default=[])
+    parser.add_argument("--districts", nargs="*", default=[])
+    parser.add_argument("--horizon", type=int, default=None)
+    parser.add_argument("--version", type=int, default=None, help="model version (default: latest)")
+    args = parser.parse_args()
+
+    if args.spec:
+        scenarios = load_scenarios(args.spec)
+    else:
+        rules = [make_rule(args.column, args.op, v, args.states, args.districts) for v in args.values]
+        scenarios = {describe_rule(r): [r] for r in rules}
+
+    engine = ScenarioEngine(version=args.version)
+    if engine.local:
+        print(f"[SCENARIOS] +{HORIZON}m of {len(engine.local)} group(s) from local models: "
+              f"{', '.join(g for g, _, _ in engine.local)}")
+    start = time.perf_counter()
+    result = engine.run(scenarios)
+    wall = time.perf_counter() - start
+    print(f"[SCENARIOS] {len(scenarios)} scenario(s) × {len(engine.keys):,} districts scored in {wall:.2f}s")
+
+    summary = summarize(result, args.horizon)
+    shown = summary[(summary['districts_affected'] > 0) | (summary['state'] == NATIONAL)]
+    with pd.option_context('display.width', 160, 'display.max_columns', 20):
+        print(shown[['scenario', 'state', 'horizon', 'districts_affected', 'movement_base', 'movement_delta',
+                     'movement_pct', 'student_ratio_delta']].to_string(index=False))
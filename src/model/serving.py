@@ -0,0 +1,379 @@
+import json
+import math
+import queue
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+import pandas as pd
+
+from src.model import local_models, registry
+from src.model.forecast import HORIZON, MODEL, forecast_frame, load_panel
+
+CACHE_SIZE = 4096     # feature vectors whose predictions are kept
+MAX_BATCH = 64        # rows per micro-batched model call
+MAX_WAIT_MS = 2.0     # how long a batch waits for more concurrent requests
+HOST, PORT = "127.0.0.1", 8765
+GLOBAL = -1           # model index of rows scored by the global model alone
+
+
+class LRUCache:
+    """
+    Thread-safe LRU map from (model index, feature vector bytes) to its predictions
+    """
+
+    def __init__(self, maxsize=CACHE_SIZE):
+        self.maxsize = maxsize
+        self.data = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def get(self, key):
+        with self.lock:
+            value = self.data.get(key)
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self.data.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        if self.maxsize <= 0:
+            return
+        with self.lock:
+            self.data[key] = value
+            self.data.move_to_end(key)
+            while len(self.data) > self.maxsize:
+                self.data.popitem(last=False)
+
+    def stats(self):
+        return dict(size=len(self.data), maxsize=self.maxsize, hits=self.hits, misses=self.misses)
+
+
+class MicroBatcher:
+    """
+    Turns concurrent single-row requests into one model call: a worker
+    thread takes the first waiting row, then whatever else arrives within
+    max_wait_ms (up to max_batch rows), and resolves each request's Future.
+    predict gets the stacked rows and each row's model index.
+    """
+
+    def __init__(self, predict, max_batch=MAX_BATCH, max_wait_ms=MAX_WAIT_MS):
+        self.predict = predict
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.queue = queue.Queue()
+        self.batches = self.rows = 0
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def submit(self, x, model=GLOBAL):
+        future = Future()
+        self.queue.put((x, model, future))
+        return future
+
+    def _run(self):
+        while True:
+            items = [self.queue.get()]
+            deadline = time.perf_counter() + self.max_wait
+            while len(items) < self.max_batch:
+                timeout = deadline - time.perf_counter()
+                try:
+                    items.append(self.queue.get(timeout=timeout) if timeout > 0 else self.queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            self.batches += 1
+            self.rows += len(items)
+            try:
+                out = self.predict(np.vstack([x for x, _, _ in items]), np.array([m for _, m, _ in items]))
+                for row, (_, _, future) in zip(out, items):
+                    future.set_result(row)
+            except Exception as e:
+                for _, _, future in items:
+                    future.set_exception(e)
+
+
+class ForecastService:
+    """
+    In-process scoring with a saved phase-4 model: loaded once from the
+    registry together with the latest feature row of every district.
+
+    Single-district requests go through the LRU cache and the
+    micro-batcher; batch requests are scored in one model call (cache
+    misses only). Predictions use the future_forecast column names. When
+    phase 4 ran with --local, a district in a group it selected a local
+    model for gets that model's HORIZON columns, as in future_forecast;
+    caller-supplied feature records have no district and use the global
+    model.
+    """
+
+    def __init__(self, version=None, cache_size=CACHE_SIZE, max_batch=MAX_BATCH, max_wait_ms=MAX_WAIT_MS,
+                 intervals=True, partitioned=None):
+        artifacts, meta = registry.load_model(MODEL, version)
+        if artifacts is None:
+            raise FileNotFoundError(f"No saved {MODEL} model; run phase 4 (python -m src.model.forecast)")
+
+        self.fitted = artifacts['fitted']
+        self.meta = meta
+        self.feature_cols = meta['feature_cols']
+        self.intervals = intervals
+        self.columns = [c for c in meta['outputs'] if intervals or not c.endswith(('_lo', '_hi'))]
+
+        # latest observed feature vector per district (feature store)
+        panel = load_panel(partitioned)
+        self.check_schema(panel)
+        latest = panel.sort_values('month_index').groupby('district_key').tail(1)
+        self.features = latest.set_index(latest['district_key'].astype(str))[self.feature_cols]
+        self.X = self.features.to_numpy(dtype=np.float64)
+        self.rows = pd.Series(np.arange(len(self.features)), index=self.features.index)
+        self.states = pd.Series(latest['state'].astype(str).to_numpy(), index=self.features.index)
+
+        # local model index per district row (GLOBAL: none)
+        self.local = self.load_local(partitioned)
+        self.row_model = np.full(len(self.features), GLOBAL)
+        for i, (_, _, mask) in enumerate(self.local):
+            self.row_model[mask] = i
+
+        self.cache = LRUCache(cache_size)
+        self.batcher = MicroBatcher(self.predict_matrix, max_batch, max_wait_ms)
+
+    def check_schema(self, df):
+        missing = [c for c in self.feature_cols if c not in df.columns]
+        if missing:
+            raise ValueError(f"Features missing for {MODEL} v{self.meta['version']}: {', '.join(missing)}")
+
+    def load_local(self, partitioned=None):
+        """
+        [(group, model, district mask)] of the local models phase 4 applied
+        to this version's future_forecast (none without --local)
+        """
+        spec = self.meta.get('local')
+        if not spec:
+            return []
+        if spec['version'] not in registry.list_versions(local_models.MODEL):
+            print(f"[WARN] {local_models.MODEL} v{spec['version']} is no longer saved; "
+                  f"the global model scores every district")
+            return []
+
+        artifacts, _ = registry.load_model(local_models.MODEL, spec['version'])
+        frame = pd.DataFrame({'state': self.states.to_numpy(), 'district_key': self.features.index.to_numpy()})
+        groups = local_models.assign_groups(frame, spec['by'], partitioned).to_numpy()
+        return [(g, model, groups == g) for g, model in artifacts['models'].items() if (groups == g).any()]
+
+    def predict_matrix(self, X, models=None):
+        """
+        One global model call on an (n × features) matrix → (n × outputs)
+        array, plus one call per local model (models: each row's index
+        into self.local, GLOBAL for none) for its rows' HORIZON columns
+        """
+        frame = pd.DataFrame(X, columns=self.feature_cols)
+        out = forecast_frame(self.fitted, frame, self.intervals)[self.columns].to_numpy(copy=True)
+        if models is None:
+            return out
+
+        for m in np.unique(models[models != GLOBAL]):
+            rows = models == m
+            local = forecast_frame([([HORIZON], self.local[m][1])], frame[rows], self.intervals)
+            cols = [c for c in local.columns if c in self.columns]
+            out[np.ix_(rows, [self.columns.index(c) for c in cols])] = local[cols].to_numpy()
+        return out
+
+    def predict_rows(self, X, models=None):
+        """
+        Batch scoring of a feature matrix (models as in predict_matrix);
+        cached vectors are not re-scored
+        """
+        X = np.ascontiguousarray(X, dtype=np.float64)
+        models = np.full(len(X), GLOBAL) if models is None else np.asarray(models)
+        keys = [(int(m), x.tobytes()) for m, x in zip(models, X)]
+        out = np.empty((len(X), len(self.columns)))
+
+        miss = []
+        for i, key in enumerate(keys):
+            cached = self.cache.get(key)
+            if cached is None:
+                miss.append(i)
+            else:
+                out[i] = cached
+
+        if miss:
+            pred = self.predict_matrix(X[miss], models[miss])
+            out[miss] = pred
+            for i, row in zip(miss, pred):
+                self.cache.put(keys[i], row)
+        return out
+
+    def predict_one(self, x, model=GLOBAL):
+        """
+        Single feature vector: cache, else a slot in the next micro-batch
+        """
+        x = np.asarray(x, dtype=np.float64)
+        key = (int(model), x.tobytes())
+        row = self.cache.get(key)
+        if row is None:
+            row = self.batcher.submit(x, model).result()
+            self.cache.put(key, row)
+        return row
+
+    def district_rows(self, district_keys):
+        unknown = [k for k in district_keys if k not in self.rows.index]
+        if unknown:
+            raise KeyError(f"Unknown district_key: {', '.join(unknown)}")
+        return self.rows[district_keys].to_numpy()
+
+    def predict_district(self, district_key):
+        i = self.district_rows([district_key])[0]
+        row = self.predict_one(self.X[i], self.row_model[i])
+        return dict(district_key=district_key, **dict(zip(self.columns, row)))
+
+    def predict_districts(self, district_keys):
+        rows = self.district_rows(district_keys)
+        out = pd.DataFrame(self.predict_rows(self.X[rows], self.row_model[rows]), columns=self.columns)
+        out.insert(0, 'district_key', district_keys)
+        return out
+
+    def predict_features(self, records):
+        """
+        Batch scoring of caller-supplied feature records (dicts) with the
+        global model; missing schema columns are an error, unknown keys
+        are ignored
+        """
+        df = pd.DataFrame.from_records(records)
+        self.check_schema(df)
+        return pd.DataFrame(self.predict_rows(df[self.feature_cols].to_numpy(dtype=np.float64)),
+                            columns=self.columns)
+
+    def info(self):
+        return dict(
+            model=MODEL,
+            version=self.meta['version'],
+            backend=self.meta['backend'],
+            horizons=self.meta['horizons'],
+            created=self.meta['created'],
+            feature_schema=self.meta['feature_schema'],
+            outputs=self.columns,
+            districts=len(self.features),
+            local={g: int(mask.sum()) for g, _, mask in self.local},
+            cache=self.cache.stats(),
+            batches=self.batcher.batches,
+            batched_rows=self.batcher.rows,
+        )
+
+
+# ----------------------------
+# HTTP front end
+# ----------------------------
+
+def to_json(obj):
+    # NaN is not valid JSON
+    if isinstance(obj, float) and math.isnan(obj):
+        return None
+    if isinstance(obj, dict):
+        return {k: to_json(v) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [to_json(v) for v in obj]
+    return obj
+
+
+def make_handler(service):
+    class Handler(BaseHTTPRequestHandler):
+        """
+        GET  /health
+        GET  /predict?district=KEY[&district=KEY...]
+        POST /predict  {"districts": [...]} or {"features": [{col: value, ...}, ...]}
+        """
+
+        def send(self, status, body):
+            data = json.dumps(to_json(body)).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def answer(self, fn):
+            try:
+                self.send(200, fn())
+            except KeyError as e:
+                self.send(404, dict(error=str(e.args[0])))
+            except (ValueError, TypeError) as e:
+                self.send(400, dict(error=str(e)))
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path == "/health":
+                return self.answer(service.info)
+            if url.path != "/predict":
+                return self.send(404, dict(error=f"Unknown path: {url.path}"))
+
+            keys = parse_qs(url.query).get('district', [])
+            if not keys:
+                return self.send(400, dict(error="district parameter required"))
+            if len(keys) == 1:
+                return self.answer(lambda: service.predict_district(keys[0]))
+            return self.answer(lambda: service.predict_districts(keys).to_dict('records'))
+
+        def do_POST(self):
+            if urlparse(self.path).path != "/predict":
+                return self.send(404, dict(error=f"Unknown path: {self.path}"))
+            try:
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            except json.JSONDecodeError as e:
+                return self.send(400, dict(error=f"Invalid JSON: {e}"))
+
+            if 'districts' in body:
+                return self.answer(lambda: service.predict_districts(list(body['districts'])).to_dict('records'))
+            if 'features' in body:
+                return self.answer(lambda: service.predict_features(body['features']).to_dict('records'))
+            return self.send(400, dict(error="body needs 'districts' or 'features'"))
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+class ForecastHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128   # listen backlog; the default 5 drops bursts of concurrent clients
+
+
+def make_server(service, host=HOST, port=PORT):
+    """
+    Threaded HTTP server around a service (port 0 picks a free port);
+    concurrent requests meet in the service's micro-batcher
+    """
+    return ForecastHTTPServer((host, port), make_handler(service))
+
+
+def serve(host=HOST, port=PORT, version=None, cache_size=CACHE_SIZE, max_batch=MAX_BATCH, max_wait_ms=MAX_WAIT_MS):
+    service = ForecastService(version, cache_size, max_batch, max_wait_ms)
+    server = make_server(service, host, port)
+    print(f"[SERVE] {MODEL} v{service.meta['version']} ({service.meta['backend']}), "
+          f"{len(service.features):,} districts → http://{host}:{server.server_port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Local prediction service for the saved phase-4 model")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--version", type=int, default=None, help="model version (default: latest)")
+    parser.add_argument("--cache-size", type=int, default=CACHE_SIZE)
+    parser.add_argument("--max-batch", type=int, default=MAX_BATCH)
+    parser.add_argument("--max-wait-ms", type=float, default=MAX_WAIT_MS)
+    args = parser.parse_args()
+
+    serve(args.host, args.port, args.version, args.cache_size, args.max_batch, args.max_wait_ms)
@@ -0,0 +1,242 @@
+import time
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+from src import config
+from src.data import storage
+from src.data.dates import month_codes
+from src.utils import report_phase
+
+PROC = config.PROC
+
+SIGNALS = ['movement_index', 'student_ratio']
+TOP_K = 20
+MIN_MONTHS = 4            # observed months a series needs to be compared
+BLOCK_BYTES = 64 << 20    # size of one block of the (rows × all) score matrix
+VAR_EPS = 1e-9            # overlap variance below which a pair has no correlation
+
+# table and key column per level; the pincode table has counts only, so
+# its signals are derived with the phase-2 formulas
+LEVELS = {
+    'district': dict(table='monthly', key='district_key', edges='trajectories/district_edges'),
+    'pincode': dict(table='pincode_monthly', key='pincode', edges='trajectories/pincode_edges'),
+}
+
+
+def pincode_signals(df):
+    """
+    Pincode × month movement_index / student_ratio. pincode_monthly is
+    keyed on (district_key, pincode) and a pincode can span districts, so
+    its counts are summed per (pincode, month) first: one series per pincode.
+    """
+    counts = df.select_dtypes('number').columns.difference(['pincode', 'month'])
+    df = df.groupby(['pincode', 'month'], as_index=False, observed=True)[list(counts)].sum()
+    total = df['student_updates'] + df['adult_updates']
+    df['student_ratio'] = df['student_updates'] / total.replace(0, np.nan)
+    df['movement_index'] = (total / df['pop_adult'].replace(0, np.nan)).fillna(total)
+    return df
+
+
+def pivot_panel(df, key_col, value_col):
+    """
+    key × month matrix (NaN where a key misses a month; one row per key and
+    month expected). Columns are the
+    months observed anywhere in the table, in order (the dense month_index
+    of phase 2), so lags count observed months.
+    """
+    keys, uniques = pd.factorize(df[key_col].astype(str))
+    months, t = np.unique(month_codes(df['month']), return_inverse=True)
+
+    if pd.Index(keys * len(months) + t).has_duplicates:
+        raise ValueError(f"{key_col} has several rows in one month; aggregate before pivot_panel")
+
+    M = np.full((len(uniques), len(months)), np.nan)
+    M[keys, t] = df[value_col].to_numpy(dtype=np.float64)
+    return pd.Index(uniques, name=key_col), M
+
+
+def znorm(M, min_months=MIN_MONTHS):
+    """
+    Row-wise z-normalization that ignores NaN; missing months become 0
+    (the row mean). Returns (Z, valid) where invalid rows (too few
+    observations or constant) are all zero.
+    """
+    n = np.sum(~np.isnan(M), axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = np.nanmean(np.where(n[:, None] > 0, M, 0), axis=1)
+        Z = M - mean[:, None]
+        std = np.sqrt(np.nansum(Z * Z, axis=1) / n)
+        Z = np.nan_to_num(Z / std[:, None])
+
+    valid = (n >= min_months) & (std > 0)
+    Z[~valid] = 0
+    return Z, valid
+
+
+def lagged_pair(M, lag=0, min_months=MIN_MONTHS):
+    """
+    z-normalized (source, target) segments for correlating x(t) with
+    y(t + lag): source months [0, T-lag), target months [lag, T), and
+    their observed masks (None when the panel has no gaps)
+    """
+    T = M.shape[1]
+    Za, va = znorm(M[:, :T - lag], min_months)
+    Zb, vb = znorm(M[:, lag:], min_months)
+    if not np.isnan(M).any():
+        return Za, Zb, va, vb, None, None
+    O = (~np.isnan(M)).astype(np.float64)
+    return Za, Zb, va, vb, O[:, :T - lag], O[:, lag:]
+
+
+def overlap_corr(Za, Zb, Oa, Ob, min_months=MIN_MONTHS):
+    """
+    Pearson correlation of every (a, b) pair over the months both series
+    observe (Za/Zb are 0 where missing, Oa/Ob the observed masks), from
+    per-pair overlap counts, sums and sums of squares as matrix products.
+    Pairs sharing fewer than min_months months, or constant on them, get -inf.
+    """
+    n = Oa @ Ob.T
+    sx, sy = Za @ Ob.T, Oa @ Zb.T
+    with np.errstate(invalid='ignore', divide='ignore'):
+        cov = Za @ Zb.T - sx * sy / n
+        var = ((Za * Za) @ Ob.T - sx * sx / n) * (Oa @ (Zb * Zb).T - sy * sy / n)
+        S = np.clip(cov / np.sqrt(var), -1, 1)
+    S[~((n >= min_months) & (var > VAR_EPS))] = -np.inf
+    return S
+
+
+def blocked_topk(Za, Zb, k=TOP_K, valid_a=None, valid_b=None, allowed=None, exclude_self=True,
+                 block_bytes=BLOCK_BYTES, Oa=None, Ob=None, min_months=MIN_MONTHS):
+    """
+    Top-k Pearson correlations of every row of Za against all rows of Zb
+    (both z-normalized over the same months) via block matrix products, so
+    at most a few (block × n) score matrices are in memory. With observed
+    masks Oa/Ob each pair is correlated over the months both observe
+    (overlap_corr); without them every month counts.
+
+    allowed(rows) may return a boolean (len(rows) × n) mask of candidate
+    pairs (e.g. state filters). Yields (source rows, target rows, corr)
+    per block as flat arrays, sorted by source then descending corr.
+    """
+    n_a, n_b = len(Za), len(Zb)
+    T = Za.shape[1]
+    valid_a = np.ones(n_a, bool) if valid_a is None else valid_a
+    valid_b = np.ones(n_b, bool) if valid_b is None else valid_b
+    per_pair = 8 if Oa is None else 6 * 8   # overlap_corr keeps ~6 score-sized arrays
+    block = max(1, int(block_bytes // (per_pair * max(n_b, 1))))
+    k = min(k, n_b)
+
+    for lo in range(0, n_a, block):
+        rows = np.arange(lo, min(lo + block, n_a))
+        rows = rows[valid_a[rows]]
+        if len(rows) == 0 or k == 0:
+            continue
+
+        if Oa is None:
+            S = Za[rows] @ Zb.T / T
+        else:
+            S = overlap_corr(Za[rows], Zb, Oa[rows], Ob, min_months)
+        S[:, ~valid_b] = -np.inf
+        if exclude_self:
+            S[np.arange(len(rows)), rows] = -np.inf
+        if allowed is not None:
+            S[~allowed(rows)] = -np.inf
+
+        top = np.argpartition(-S, k - 1, axis=1)[:, :k]
+        corr = np.take_along_axis(S, top, axis=1)
+        order = np.argsort(-corr, axis=1, kind='stable')
+        top = np.take_along_axis(top, order, axis=1)
+        corr = np.take_along_axis(corr, order, axis=1)
+
+        keep = np.isfinite(corr)
+        src = np.broadcast_to(rows[:, None], top.shape)
+        yield src[keep], top[keep], corr[keep]
+
+
+def topk_edges(keys, M, k=TOP_K, lag=0, min_months=MIN_MONTHS):
+    """
+    Sparse top-k trajectory neighbours (source, target, corr, rank) of every series
+    """
+    Za, Zb, va, vb, Oa, Ob = lagged_pair(M, lag, min_months)
+    parts = list(blocked_topk(Za, Zb, k, va, vb, Oa=Oa, Ob=Ob, min_months=min_months))
+
+    if not parts:
+        return pd.DataFrame(columns=['source', 'target', 'corr', 'rank'])
+
+    src = np.concatenate([p[0] for p in parts])
+    dst = np.concatenate([p[1] for p in parts])
+    corr = np.concatenate([p[2] for p in parts])
+
+    # rank within each source (rows arrive grouped by source, best first)
+    starts = np.r_[0, np.flatnonzero(np.diff(src)) + 1]
+    rank = np.arange(len(src)) - np.repeat(starts, np.diff(np.r_[starts, len(src)])) + 1
+
+    return pd.DataFrame({
+        'source': keys.take(src),
+        'target': keys.take(dst),
+        'corr': corr.astype(np.float32),
+        'rank': rank.astype(np.int16),
+    })
+
+
+def edge_matrix(edges, keys):
+    """
+    scipy CSR matrix (sources × targets) of an edge table's correlations
+    """
+    pos = pd.Series(np.arange(len(keys)), index=keys)
+    return sp.csr_matrix(
+        (edges['corr'].to_numpy(), (pos[edges['source']].to_numpy(), pos[edges['target']].to_numpy())),
+        shape=(len(keys), len(keys)),
+    )
+
+
+def similar_trajectories(key, signal='movement_index', lag=0, level='district', k=TOP_K):
+    """
+    Stored top-k co-moving series for one district (or pincode)
+    """
+    filters = [('signal', '==', signal), ('lag', '==', lag), ('source', '==', str(key))]
+    edges = storage.read_table(LEVELS[level]['edges'], filters=filters, base=PROC)
+    return edges.sort_values('rank').head(k).reset_index(drop=True)
+
+
+def run_trajectories(level='district', k=TOP_K, lags=(0,), partitioned=None):
+    print("\n=== TRAJECTORY SIMILARITY (TOP-K CORRELATION) ===")
+    start = time.perf_counter()
+
+    spec = LEVELS[level]
+    df = storage.read_table(spec['table'], base=PROC)
+    if level == 'pincode':
+        df = pincode_signals(df)
+
+    tables = []
+    for signal in SIGNALS:
+        keys, M = pivot_panel(df, spec['key'], signal)
+        for lag in lags:
+            edges = topk_edges(keys, M, k=k, lag=lag)
+            edges.insert(0, 'signal', signal)
+            edges.insert(1, 'lag', np.int16(lag))
+            tables.append(edges)
+            print(f"[TRAJ] {signal} lag {lag}: {len(keys):,} series × {M.shape[1]} months "
+                  f"→ {len(edges):,} edges")
+
+    edges = pd.concat(tables, ignore_index=True)
+    out_path = storage.write_table(edges, spec['edges'], base=PROC, partitioned=partitioned)
+    print(f"[SAVED] trajectory edges → {out_path}")
+    report_phase("trajectories", start)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Top-k trajectory correlation between districts/pincodes")
+    parser.add_argument("--level", choices=list(LEVELS), default="district")
+    parser.add_argument("--k", type=int, default=TOP_K, help="neighbours kept per series")
+    parser.add_argument("--lags", type=int, nargs="+", default=[0],
+                        help="month lags: source x(t) vs target y(t + lag)")
+    parser.add_argument("--partitioned", action="store_true",
+                        help="write edges as a hive-partitioned (signal) dataset")
+    args = parser.parse_args()
+
+    run_trajectories(level=args.level, k=args.k, lags=args.lags, partitioned=args.partitioned or None)
@@ -1,8 +1,54 @@
-def semantic_label(cluster_id):
-    mapping = {
-        0: "Metro Absorption Hubs",
-        1: "Student Migration Hubs",
-        2: "Economic Origin Belts",
-        3: "Stable Districts"
-    }
-    return mapping.get(cluster_id, "Unknown")
+import numpy as np
+import pandas as pd
+from scipy.optimize import linear_sum_assignment
+
+# Archetype → signed weights on standardized district features. A cluster's
+# score for an archetype is its centroid profile (mean z-score per feature)
+# dotted with these weights.
+ARCHETYPES = {
+    "Metro Absorption Hubs": {'mean_movement_index': 1.0, 'mean_total_demo': 1.0, 'mean_bio_adult': 0.5},
+    "Student Migration Hubs": {'mean_student_ratio': 1.0, 'slope_student_ratio': 0.5, 'mean_bio_student': 0.25},
+    "Economic Origin Belts": {'mean_adult_ratio': 1.0, 'slope_movement_index': -0.5, 'mean_total_demo': -0.5},
+    "Stable Districts": {'mean_movement_index': -1.0, 'std_movement_index': -1.0, 'std_total_demo': -0.5},
+}
+
+
+def centroid_profiles(df, feature_cols, cluster_col='cluster'):
+    """
+    Mean z-score of every feature per cluster (independent of the scale
+    the clustering itself was fitted on)
+    """
+    X = df[feature_cols]
+    z = (X - X.mean()) / X.std(ddof=0).replace(0, 1)
+    return z.groupby(df[cluster_col].to_numpy()).mean()
+
+
+def archetype_scores(profiles):
+    """
+    clusters × archetypes score matrix from centroid profiles
+    """
+    weights = pd.DataFrame(ARCHETYPES).T.reindex(columns=profiles.columns).fillna(0)
+    return profiles @ weights.T
+
+
+def label_clusters(df, feature_cols, cluster_col='cluster'):
+    """
+    Cluster id → archetype name, matched one-to-one on centroid
+    characteristics (Hungarian assignment on archetype scores), so refits
+    that permute cluster ids keep the same names. With more clusters than
+    archetypes the extra ones take their best-scoring name with a suffix.
+    """
+    scores = archetype_scores(centroid_profiles(df, feature_cols, cluster_col))
+    rows, cols = linear_sum_assignment(scores.to_numpy(), maximize=True)
+
+    names, clusters = list(scores.columns), scores.index.tolist()
+    mapping = {clusters[r]: names[c] for r, c in zip(rows, cols)}
+    counts = {name: 1 for name in mapping.values()}
+
+    for cluster in clusters:
+        if cluster not in mapping:
+            name = names[int(np.argmax(scores.loc[cluster].to_numpy()))]
+            counts[name] = counts.get(name, 0) + 1
+            mapping[cluster] = f"{name} ({counts[name]})"
+
+    return mapping
@@ -0,0 +1,73 @@
+import time
+
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+from sklearn.cluster import KMeans, MiniBatchKMeans
+from sklearn.metrics import davies_bouldin_score, silhouette_score
+
+KS = range(2, 9)              # cluster counts tried
+SEEDS = (0, 1, 2)             # random restarts per k
+SILHOUETTE_SAMPLE = 5_000     # rows scored by silhouette (O(n²) in the sample)
+MINIBATCH_ROWS = 50_000       # above this, MiniBatchKMeans instead of KMeans
+
+
+def make_kmeans(k, seed, n_rows):
+    if n_rows > MINIBATCH_ROWS:
+        return MiniBatchKMeans(n_clusters=k, random_state=seed, batch_size=4096, n_init=3)
+    return KMeans(n_clusters=k, random_state=seed, n_init='auto')
+
+
+def fit_score(X, k, seed, sample):
+    """
+    Fits one (k, seed) run and scores it: silhouette on the shared row
+    sample, Davies-Bouldin on all rows (O(n·k))
+    """
+    start = time.perf_counter()
+    model = make_kmeans(k, seed, len(X)).fit(X)
+    labels = model.labels_
+
+    sil = silhouette_score(X[sample], labels[sample]) if len(np.unique(labels[sample])) > 1 else -1.0
+    db = davies_bouldin_score(X, labels)
+
+    return dict(
+        k=k, seed=seed,
+        silhouette=float(sil),
+        davies_bouldin=float(db),
+        inertia=float(model.inertia_),
+        fit_s=round(time.perf_counter() - start, 3),
+    ), model
+
+
+def select_k(scores):
+    """
+    k with the best combined rank of mean silhouette (higher is better)
+    and mean Davies-Bouldin (lower is better) over seeds; silhouette
+    breaks ties
+    """
+    by_k = scores.groupby('k')[['silhouette', 'davies_bouldin']].mean()
+    rank = by_k['silhouette'].rank(ascending=False) + by_k['davies_bouldin'].rank(ascending=True)
+    return int(pd.DataFrame({'rank': rank, 'sil': -by_k['silhouette']}).sort_values(['rank', 'sil']).index[0])
+
+
+def sweep_kmeans(X, ks=KS, seeds=SEEDS, n_jobs=-1, random_state=42):
+    """
+    Fits every (k, seed) in parallel with joblib and picks k automatically.
+    Returns (best model, scores frame with a `selected` flag); the best
+    model is the highest-silhouette seed of the selected k.
+    """
+    X = np.ascontiguousarray(X, dtype=np.float64)
+    rng = np.random.default_rng(random_state)
+    sample = rng.choice(len(X), size=min(SILHOUETTE_SAMPLE, len(X)), replace=False)
+
+    runs = Parallel(n_jobs=n_jobs)(
+        delayed(fit_score)(X, k, seed, sample)
+        for k in ks for seed in seeds if k < len(X)
+    )
+
+    scores = pd.DataFrame([r for r, _ in runs])
+    best_k = select_k(scores)
+
+    best = scores[scores['k'] == best_k]['silhouette'].idxmax()
+    scores['selected'] = scores.index == best
+    return runs[best][1], scores
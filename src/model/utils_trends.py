@@ -1,19 +1,63 @@
 import numpy as np
 import pandas as pd
 
+
+def _group_sum(codes, values, n_groups):
+    return np.bincount(codes, weights=values, minlength=n_groups)
+
+
+def grouped_ols(df, group_col, x_col, y_cols):
+    """
+    Least-squares line y = intercept + slope * x per group, for every column
+    in y_cols at once. Closed form from grouped (centered) sums, so the cost
+    is O(rows) with no Python loop per group. Rows where x or y is NaN are
+    skipped per column; slope/intercept/R² are NaN for groups with fewer than
+    two points or constant x (R² also when y is constant).
+
+    Returns a frame indexed by group with {y}_slope, {y}_intercept, {y}_r2
+    and {y}_n columns.
+    """
+    y_cols = [y_cols] if isinstance(y_cols, str) else list(y_cols)
+    codes, groups = pd.factorize(df[group_col], sort=True)
+    n_groups = len(groups)
+
+    x_all = df[x_col].to_numpy(dtype=np.float64)
+    out = {}
+
+    for y_col in y_cols:
+        y = df[y_col].to_numpy(dtype=np.float64)
+        valid = (codes >= 0) & ~np.isnan(x_all) & ~np.isnan(y)
+        g, x, y = codes[valid], x_all[valid], y[valid]
+
+        n = np.bincount(g, minlength=n_groups).astype(np.float64)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean_x = _group_sum(g, x, n_groups) / n
+            mean_y = _group_sum(g, y, n_groups) / n
+
+            # second pass on centered values keeps the sums well conditioned
+            dx = x - mean_x[g]
+            dy = y - mean_y[g]
+            sxx = _group_sum(g, dx * dx, n_groups)
+            sxy = _group_sum(g, dx * dy, n_groups)
+            syy = _group_sum(g, dy * dy, n_groups)
+
+            fit = (n >= 2) & (sxx > 0)
+            slope = np.where(fit, sxy / sxx, np.nan)
+            intercept = np.where(fit, mean_y - slope * mean_x, np.nan)
+            r2 = np.where(fit & (syy > 0), sxy * sxy / (sxx * syy), np.nan)
+
+        out[f"{y_col}_slope"] = slope
+        out[f"{y_col}_intercept"] = intercept
+        out[f"{y_col}_r2"] = r2
+        out[f"{y_col}_n"] = n.astype(np.int64)
+
+    index = pd.Index(groups, name=group_col)
+    return pd.DataFrame(out, index=index)
+
+
 def compute_slope(df, group_col, x_col, y_col, out_col):
     """
-    Computes slope of y over x per group using np.polyfit
+    Slope of y over x per group (0 where it cannot be fitted)
     """
-    slopes = {}
-
-    for key, sub in df.groupby(group_col):
-        if sub[y_col].notna().sum() >= 2:
-            x = sub[x_col].values
-            y = sub[y_col].values
-            slope = np.polyfit(x, y, 1)[0]
-        else:
-            slope = 0
-        slopes[key] = slope
-
-    return pd.Series(slopes, name=out_col)
+    trends = grouped_ols(df, group_col, x_col, y_col)
+    return trends[f"{y_col}_slope"].fillna(0).rename(out_col)
@@ -0,0 +1,390 @@
+import ast
+import hashlib
+import importlib
+import importlib.util
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import datetime, timezone
+
+from src import utils
+from src.data.manifest import fingerprint, load_manifest, save_manifest
+
+SRC_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Phase DAG. inputs/outputs are path templates ({raw}, {proc}, {aliases},
+# {adjacency}); files and directories (partitioned tables) are content-hashed. `params`
+# are the run options that change a phase's outputs and go into its key.
+# The run module and every src module it imports are hashed too (code_modules),
+# so editing any code a phase uses re-runs it.
+PHASES = {
+    'phase1': dict(
+        run="src.data.preprocess_phase1:run_phase1",
+        deps=[],
+        inputs=["{raw}", "{aliases}"],
+        outputs=["{proc}/enrolment.parquet", "{proc}/demographic.parquet", "{proc}/biometric.parquet",
+                 "{proc}/phase1_manifest.json"],
+        params=['partitioned'],
+    ),
+    'phase2': dict(
+        run="src.data.preprocess_phase2:run_phase2",
+        deps=['phase1'],
+        inputs=["{raw}", "{aliases}",
+                "{proc}/enrolment.parquet", "{proc}/demographic.parquet", "{proc}/biometric.parquet",
+                "{proc}/phase1_manifest.json"],
+        outputs=["{proc}/monthly.parquet"],
+        params=['source', 'partitioned', 'pincode'],
+    ),
+    'features': dict(
+        run="src.model.feature_store:run_feature_store",
+        deps=['phase2'],
+        inputs=["{proc}/monthly.parquet"],
+        outputs=["{proc}/features/panel.parquet", "{proc}/features/district.parquet"],
+        params=['partitioned'],
+    ),
+    'trajectories': dict(
+        run="src.model.trajectories:run_trajectories",
+        deps=['phase2'],
+        inputs=["{proc}/monthly.parquet"],
+        outputs=["{proc}/trajectories/district_edges.parquet"],
+        params=['partitioned'],
+    ),
+    'corridors': dict(
+        run="src.model.corridors:run_corridors",
+        deps=['phase2'],
+        inputs=["{proc}/monthly.parquet", "{adjacency}"],
+        outputs=["{proc}/corridors/edges.parquet"],
+        params=['partitioned'],
+    ),
+    'phase3': dict(
+        run="src.model.clustering:run_phase3",
+        deps=['features'],
+        inputs=["{proc}/features/district.parquet"],
+        outputs=["{proc}/clustering/district_features.parquet",
+                 "{proc}/clustering/pca_embedding.parquet", "{proc}/clustering/hierarchy.parquet",
+                 "{proc}/clustering/neighbors.joblib"],
+        params=['partitioned', 'sweep'],
+    ),
+    'phase4': dict(
+        run="src.model.forecast:run_phase4",
+        deps=['features'],
+        inputs=["{proc}/features/panel.parquet"],
+        outputs=["{proc}/forecast/historical_predictions.parquet", "{proc}/forecast/future_forecast.parquet",
+                 "{proc}/forecast/hierarchy_forecast.parquet", "{proc}/forecast/hierarchy_history.parquet"],
+        params=['partitioned', 'backend', 'horizons', 'strategy', 'reconcile', 'local'],
+    ),
+}
+
+# run options accepted by each phase's run function (max_memory and
+# incremental only change how a phase runs, so they are not hashed)
+RUN_ARGS = {
+    'phase1': ['partitioned', 'max_memory'],
+    'phase2': ['source', 'partitioned', 'max_memory', 'pincode'],
+    'features': ['partitioned'],
+    'trajectories': ['partitioned'],
+    'corridors': ['partitioned'],
+    'phase3': ['partitioned', 'sweep', 'incremental'],
+    'phase4': ['partitioned', 'backend', 'horizons', 'strategy', 'reconcile', 'local'],
+}
+
+
+def expand(template, config):
+    return os.path.normpath(template.format(
+        raw=config.RAW,
+        proc=config.PROC,
+        aliases=os.path.join(os.path.dirname(__file__), "data", "name_aliases.csv"),
+        adjacency=os.path.join(os.path.dirname(__file__), "data", "state_adjacency.csv"),
+    ))
+
+
+def phase_deps(name, params):
+    deps = list(PHASES[name]['deps'])
+    if name == 'phase4' and params.get('local') == 'cluster':
+        deps.append('phase3')   # per-cluster models need the phase-3 labels
+    return deps
+
+
+def phase_inputs(name, params):
+    inputs = list(PHASES[name]['inputs'])
+    if name == 'phase4' and params.get('local') == 'cluster':
+        inputs.append("{proc}/clustering/district_features.parquet")
+    return inputs
+
+
+def phase_outputs(name, params, config):
+    outputs = [expand(t, config) for t in PHASES[name]['outputs']]
+    if name == 'phase2' and params.get('pincode'):
+        outputs.append(expand("{proc}/pincode_monthly.parquet", config))
+    return outputs
+
+
+def hash_path(path, cache):
+    """
+    Content hash of a file or directory tree (None if missing). File
+    hashes are reused from cache while size and mtime are unchanged.
+    """
+    if not os.path.exists(path):
+        return None
+
+    files = [path]
+    if os.path.isdir(path):
+        files = sorted(
+            os.path.join(root, f)
+            for root, _, names in os.walk(path) for f in names
+            if not f.endswith(".tmp")
+        )
+
+    h = hashlib.sha1()
+    for f in files:
+        fp, _ = fingerprint(f, cache.get(f))
+        cache[f] = fp
+        h.update(os.path.relpath(f, path).encode())
+        h.update(fp['sha1'].encode())
+    return h.hexdigest()
+
+
+def module_file(name):
+    """
+    Source file of a src module or package, None if name is not one (e.g.
+    a function imported with `from src.x import name`)
+    """
+    path = os.path.join(SRC_ROOT, *name.split('.'))
+    for f in [path + ".py", os.path.join(path, "__init__.py")]:
+        if os.path.isfile(f):
+            return f
+    return None
+
+
+def code_modules(entry):
+    """
+    entry and every src module it imports, directly or through other src
+    modules, found by parsing import statements (function-level imports
+    included) rather than importing anything
+    """
+    seen, todo = {}, [entry]
+    while todo:
+        name = todo.pop()
+        path = module_file(name)
+        if name in seen or path is None:
+            continue
+        seen[name] = path
+        package = name if path.endswith("__init__.py") else name.rpartition('.')[0]
+        with open(path, "rb") as fh:
+            tree = ast.parse(fh.read(), filename=path)
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                todo += [a.name for a in node.names]
+            elif isinstance(node, ast.ImportFrom):
+                base = importlib.util.resolve_name('.' * node.level + (node.module or ''), package) \
+                    if node.level else node.module
+                todo += [base] + [f"{base}.{a.name}" for a in node.names]
+        todo = [m for m in todo if m == 'src' or m.startswith('src.')]
+    return seen
+
+
+def code_hash(modules):
+    h = hashlib.sha1()
+    for m, path in sorted(modules.items()):
+        h.update(m.encode())
+        with open(path, "rb") as fh:
+            h.update(fh.read())
+    return h.hexdigest()
+
+
+def phase_key(name, params, config, cache):
+    """
+    Hash of a phase's code, input contents and output-affecting params,
+    plus the per-input hashes recorded in the run manifest
+    """
+    spec = PHASES[name]
+    inputs = {expand(t, config): hash_path(expand(t, config), cache) for t in phase_inputs(name, params)}
+    key_params = {p: params.get(p) for p in spec['params']}
+
+    payload = json.dumps(
+        {'code': code_hash(code_modules(spec['run'].split(':')[0])), 'inputs': inputs, 'params': key_params},
+        sort_keys=True,
+    )
+    return hashlib.sha1(payload.encode()).hexdigest(), inputs
+
+
+def up_to_date(state, key, outputs, cache):
+    if not state or state.get('key') != key:
+        return False
+    recorded = state.get('outputs', {})
+    return all(p in recorded and hash_path(p, cache) == recorded[p] for p in outputs)
+
+
+_PHASES_RUN = 0   # phases run so far by this worker process
+
+
+def run_phase(name, kwargs, data_root):
+    """
+    Runs one phase in a worker process and returns its wall time. Workers
+    are reused, so the peak RSS is reset first to report this phase's own.
+    """
+    global _PHASES_RUN
+    os.environ["AADHAAR_DATA_ROOT"] = data_root
+    if not utils.reset_peak_rss() and _PHASES_RUN:
+        utils.PEAK_IS_PHASE = False
+    _PHASES_RUN += 1
+    module, func = PHASES[name]['run'].split(":")
+
+    start = time.perf_counter()
+    getattr(importlib.import_module(module), func)(**kwargs)
+    return time.perf_counter() - start
+
+
+def run_pipeline(phases=None, force=False, workers=2, **params):
+    """
+    Runs the selected phases (default: all) in dependency order, skipping
+    phases whose key and outputs match the run manifest. Phases whose
+    dependencies are done run concurrently (phase 3 and 4) in separate
+    processes. Dependencies outside the selection are not run.
+    """
+    from src import config
+    from src.data import storage
+
+    # resolve env defaults so $AADHAAR_PARTITIONED / $AADHAAR_FORECAST_BACKEND are part of the key
+    if params.get('partitioned') is None:
+        params['partitioned'] = storage.PARTITIONED
+    if params.get('backend') is None:
+        params['backend'] = config.FORECAST_BACKEND
+
+    manifest_path = os.path.join(config.PROC, "pipeline_manifest.json")
+    manifest = load_manifest(manifest_path)
+    cache = manifest.setdefault('files', {})
+    states = manifest.setdefault('phases', {})
+
+    selected = list(phases or PHASES)
+    pending = {n: [d for d in phase_deps(n, params) if d in selected] for n in selected}
+    status, running = {}, {}
+
+    print("\n=== PIPELINE ===")
+    print(f"[PIPELINE] data root: {config.DATA_ROOT} | phases: {', '.join(selected)}")
+    start = time.perf_counter()
+    started = datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+    with ProcessPoolExecutor(max_workers=workers) as ex:
+        while pending or running:
+            for name in [n for n, deps in pending.items() if all(status.get(d) for d in deps)]:
+                deps = pending.pop(name)
+
+                if any(status[d] == "failed" for d in deps):
+                    status[name] = "failed"
+                    print(f"[SKIP] {name}: dependency failed")
+                    continue
+
+                key, inputs = phase_key(name, params, config, cache)
+                outputs = phase_outputs(name, params, config)
+
+                if not force and up_to_date(states.get(name), key, outputs, cache):
+                    status[name] = "skipped"
+                    print(f"[CACHED] {name}: inputs and params unchanged")
+                    continue
+
+                kwargs = {a: params.get(a) for a in RUN_ARGS[name]}
+                print(f"[RUN] {name}")
+                future = ex.submit(run_phase, name, kwargs, config.DATA_ROOT)
+                running[future] = (name, key, inputs, outputs)
+
+            if not running:
+                continue
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name, key, inputs, outputs = running.pop(future)
+                try:
+                    wall = future.result()
+                except Exception as e:
+                    status[name] = "failed"
+                    print(f"[FAILED] {name}: {e!r}")
+                    continue
+
+                status[name] = "ran"
+                states[name] = dict(
+                    key=key,
+                    params={p: params.get(p) for p in PHASES[name]['params']},
+                    inputs=inputs,
+                    outputs={p: hash_path(p, cache) for p in outputs},
+                    wall_s=round(wall, 2),
+                    finished=datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                )
+                print(f"[DONE] {name} ({wall:.1f}s)")
+
+    wall = time.perf_counter() - start
+    manifest['last_run'] = dict(
+        started=started,
+        data_root=config.DATA_ROOT,
+        params=params,
+        force=force,
+        status=status,
+        wall_s=round(wall, 2),
+    )
+    save_manifest(manifest, manifest_path)
+
+    print("\n=== PIPELINE SUMMARY ===")
+    for name in selected:
+        print(f"{name}: {status.get(name, 'not run')}")
+    print(f"[PERF] pipeline: {wall:.1f}s wall")
+    print(f"[SAVED] run manifest → {manifest_path}")
+    return status
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description="Run the phase 1-4 pipeline with artifact caching")
+    parser.add_argument("phases", nargs="*", metavar="phase",
+                        help=f"phases to run: {', '.join(PHASES)} (default: all)")
+    parser.add_argument("--data-root", default=None,
+                        help="directory holding raw/ and processed/ (default: $AADHAAR_DATA_ROOT or Dataset)")
+    parser.add_argument("--force", action="store_true", help="re-run phases even when up to date")
+    parser.add_argument("--workers", type=int, default=2, help="phases run concurrently")
+    parser.add_argument("--source", choices=["auto", "parquet", "raw"], default="auto",
+                        help="phase-2 input (see preprocess_phase2)")
+    parser.add_argument("--partitioned", action="store_true",
+                        help="write hive-partitioned parquet datasets")
+    parser.add_argument("--pincode", action="store_true", help="phase 2 also writes pincode_monthly")
+    parser.add_argument("--sweep", action="store_true", help="phase 3 picks k by a KMeans sweep")
+    parser.add_argument("--incremental", action="store_true",
+                        help="phase 3 assigns districts to the saved model instead of refitting")
+    parser.add_argument("--backend", choices=["rf", "hgb", "linear"], default=None,
+                        help="phase-4 forecasting model (default: $AADHAAR_FORECAST_BACKEND or rf)")
+    parser.add_argument("--horizons", type=int, nargs="*", default=None,
+                        help="phase 4 forecasts these horizons in months (bare flag: 1-6; default: 3)")
+    parser.add_argument("--horizon-strategy", dest="strategy", choices=["separate", "direct"],
+                        default="separate", help="multi-horizon training in phase 4")
+    parser.add_argument("--reconcile", choices=["bottom_up", "mint"], default="bottom_up",
+                        help="phase-4 district → state → national reconciliation")
+    parser.add_argument("--local", choices=["state", "cluster"], default=None,
+                        help="phase 4 also trains per-state / per-cluster models (cluster waits for phase 3)")
+    parser.add_argument("--max-memory", default=None, help="memory budget for phases 1-2, e.g. 2G")
+    args = parser.parse_args()
+
+    unknown = set(args.phases) - set(PHASES)
+    if unknown:
+        parser.error(f"unknown phase(s): {', '.join(sorted(unknown))}")
+
+    # must be set before src.config is imported
+    if args.data_root:
+        os.environ["AADHAAR_DATA_ROOT"] = args.data_root
+
+    status = run_pipeline(
+        phases=args.phases or None,
+        force=args.force,
+        workers=args.workers,
+        source=args.source,
+        partitioned=args.partitioned or None,
+        pincode=args.pincode,
+        sweep=args.sweep,
+        incremental=args.incremental,
+        backend=args.backend,
+        horizons=list(range(1, 7)) if args.horizons == [] else args.horizons,
+        strategy=args.strategy,
+        reconcile=args.reconcile,
+        local=args.local,
+        max_memory=args.max_memory,
+    )
+    sys.exit(1 if "failed" in status.values() else 0)
@@ -0,0 +1,48 @@
+import sys
+import time
+
+try:
+    import resource
+except ImportError:   # Windows
+    resource = None
+
+# False once a process that ran an earlier phase could not reset its peak:
+# peak_rss_mb() then spans those phases too
+PEAK_IS_PHASE = True
+
+
+def reset_peak_rss():
+    """
+    Resets the peak RSS to the current RSS (Linux >= 4.0), so a phase run
+    in a reused worker process measures its own peak. Returns False where
+    the peak cannot be reset.
+    """
+    try:
+        with open("/proc/self/clear_refs", "w") as fh:
+            fh.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def peak_label():
+    return "peak RSS" if PEAK_IS_PHASE else "worker lifetime peak RSS"
+
+
+def peak_rss_mb():
+    """
+    Peak resident set size of the current process in MB (nan if unavailable),
+    since process start or the last reset_peak_rss()
+    """
+    if resource is None:
+        return float('nan')
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS, kilobytes on Linux
+    return rss / (1 << 20) if sys.platform == "darwin" else rss / 1024
+
+
+def report_phase(name, start):
+    """
+    Prints wall time since start (time.perf_counter) and peak RSS
+    """
+    print(f"[PERF] {name}: {time.perf_counter() - start:.1f}s wall, {peak_label()} {peak_rss_mb():,.0f} MB")
@@ -0,0 +1,10 @@
+import pandas as pd
+
+from src.data.accumulator import MonthlyAccumulator
+
+
+def test_attrs_skip_rows_with_a_missing_key():
+    df = pd.DataFrame({'district_key': [None, 'A', 'B'], 'state': ['X', 'SA', 'SB'],
+                       'month': [202501] * 3, 'count': [1, 2, 3]})
+    out = MonthlyAccumulator('district_key', ['count'], attr_cols=['state']).add(df).to_frame()
+    assert out.set_index('district_key')['state'].to_dict() == {'A': 'SA', 'B': 'SB'}
@@ -0,0 +1,26 @@
+import numpy as np
+
+from src.model.forecast import fit_forecaster, forest_quantiles, make_rf
+
+
+def test_forest_quantiles_weight_leaf_training_targets():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(300, 4))
+    y = np.c_[X[:, 0] + rng.normal(size=300), rng.random(300)]
+    model = fit_forecaster(make_rf(n_jobs=1, n_estimators=20, max_depth=4), X, y)
+
+    X_new = rng.normal(size=(7, 4))
+    got = forest_quantiles(model, X_new, [0.1, 0.5, 0.9], n_jobs=1, block_rows=3)
+
+    # each tree spreads weight 1 / trees evenly over the training rows in the row's leaf
+    forest = model.regressor_
+    leaves, train_leaves = forest.apply(X_new), forest.apply(X)
+    same = leaves[:, None, :] == train_leaves[None, :, :]
+    W = (same / same.sum(axis=1, keepdims=True)).mean(axis=2)
+    for k in range(2):
+        order = np.argsort(y[:, k])
+        cum = np.cumsum(W[:, order], axis=1)
+        for i, q in enumerate([0.1, 0.5, 0.9]):
+            expected = y[order[np.argmax(cum >= q * cum[:, -1:], axis=1)], k]
+            assert np.allclose(got[i, :, k], expected)
+    assert (got[0] <= got[2]).all()
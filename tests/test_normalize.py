@@ -0,0 +1,20 @@
+import pandas as pd
+
+from src.data.normalize import NameNormalizer
+
+
+def raw_frame(districts):
+    return pd.DataFrame({'state': 'Bihar', 'district': districts})
+
+
+def test_primed_spelling_is_order_independent(tmp_path):
+    # two spellings of one variant, met in opposite orders
+    frames = [raw_frame(['East Champaran']), raw_frame(['EastChamparan'])]
+    names = []
+    for order in [frames, frames[::-1]]:
+        normalizer = NameNormalizer(cache_path=str(tmp_path / "cache.json"))
+        normalizer.prime(order)
+        names.append([normalizer.normalize(f.copy())['district_key'].astype(str).iloc[0] for f in order])
+
+    assert names[0] == names[1][::-1]
+    assert set(names[0]) == {'BIHAR_EAST CHAMPARAN'}
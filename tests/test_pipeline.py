@@ -0,0 +1,8 @@
+from src.pipeline import PHASES, code_modules
+
+
+def test_phase_code_includes_transitive_src_imports():
+    modules = code_modules(PHASES['phase3']['run'].split(':')[0])
+    # relative imports, `from src.x import name` and imports of imports
+    assert {'src.model.utils_pca', 'src.model.registry', 'src.model.utils_trends', 'src.data.storage'} <= set(modules)
+    assert not any(m.startswith('src.model.forecast') for m in modules)
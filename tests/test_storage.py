@@ -0,0 +1,24 @@
+import pandas as pd
+import pytest
+
+from src.data import storage
+
+
+def category_batch(n, start=0):
+    names = [f"D{i:04d}" for i in range(start, start + n)]
+    return pd.DataFrame({'district_key': pd.Categorical(names), 'part': 'a', 'value': range(n)})
+
+
+@pytest.mark.parametrize("partitioned", [False, True])
+def test_table_writer_grows_past_int8_categories(tmp_path, monkeypatch, partitioned):
+    monkeypatch.setitem(storage.LAYOUTS, 'test/categories', dict(partition_cols=['part'], sort_by=['district_key']))
+    # the first batch fits an int8 dictionary index, the second does not
+    first, second = category_batch(100), category_batch(223, start=100)
+
+    with storage.TableWriter('test/categories', base=str(tmp_path), partitioned=partitioned) as writer:
+        writer.write(first)
+        writer.write(second)
+
+    df = storage.read_table('test/categories', base=str(tmp_path))
+    assert len(df) == len(first) + len(second)
+    assert set(df['district_key'].astype(str)) == set(first['district_key']) | set(second['district_key'])
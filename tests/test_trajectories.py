@@ -0,0 +1,39 @@
+import numpy as np
+import pandas as pd
+
+from src.model.trajectories import MIN_MONTHS, blocked_topk, lagged_pair, pincode_signals, pivot_panel
+
+
+def test_topk_correlation_uses_each_pairs_overlapping_months():
+    rng = np.random.default_rng(0)
+    M = rng.normal(size=(40, 12)).cumsum(axis=1)
+    M[rng.random(M.shape) < 0.3] = np.nan
+
+    Za, Zb, va, vb, Oa, Ob = lagged_pair(M)
+    parts = list(blocked_topk(Za, Zb, 5, va, vb, block_bytes=4096, Oa=Oa, Ob=Ob))
+    src, dst, corr = (np.concatenate([p[i] for p in parts]) for i in range(3))
+
+    # pandas correlates each pair over the months both series observe
+    ref = pd.DataFrame(M.T).corr(min_periods=MIN_MONTHS).to_numpy()
+    assert np.allclose(corr, ref[src, dst])
+
+    # each source's first neighbour is its best valid match
+    first = np.r_[True, src[1:] != src[:-1]]
+    candidates = np.where(np.eye(len(M), dtype=bool) | ~vb, np.nan, ref)
+    assert np.allclose(corr[first], np.nanmax(candidates, axis=1)[src[first]])
+
+
+def test_pincode_series_sums_districts_sharing_a_pincode():
+    # pincode 100001 sits in two districts in both months
+    df = pd.DataFrame({
+        'district_key': ['S_A', 'S_B', 'S_A', 'S_B', 'S_A'],
+        'pincode': [100001, 100001, 100001, 100001, 100002],
+        'month': [202501, 202501, 202502, 202502, 202501],
+        'student_updates': [1, 3, 2, 2, 5],
+        'adult_updates': [4, 12, 6, 10, 5],
+        'pop_adult': [10, 10, 20, 0, 0],
+    })
+    keys, M = pivot_panel(pincode_signals(df), 'pincode', 'movement_index')
+    row = M[keys.get_loc('100001')]
+    assert np.allclose(row, [(5 + 15) / 20, (8 + 12) / 20])
+    assert pivot_panel(pincode_signals(df), 'pincode', 'student_ratio')[1][keys.get_loc('100001'), 0] == 4 / 20